@@ -2,6 +2,9 @@ from langchain_core.messages import HumanMessage
 from langgraph.prebuilt import create_react_agent
 from app.schemas.workout import ExerciseResponse
 from app.schemas.agent import AgentResponse
+from app.services.metrics import record_parse_failure
+from app.logging_config import log_payload
+import logging
 import re
 import json
 
@@ -213,18 +216,18 @@ Remember: Return ONLY the JSON object, no markdown formatting or explanation.
     
     structured_result = await structured_llm.ainvoke([HumanMessage(content=structure_prompt)])
     results = structured_result
-    print("Raw results:", results.content)
+    log_payload("Raw results (nutrition agent)", results.content)
     
     # Clean the JSON content to remove markdown formatting
     cleaned_content = clean_json_content(results.content)
-    print("Cleaned content:", cleaned_content)
     
     try:
         results = json.loads(cleaned_content)
         return results
     except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Content causing error: {cleaned_content}")
+        record_parse_failure("agent_nutrition")
+        logging.error("JSON decode error (nutrition agent): %s", e)
+        log_payload("Content causing error (nutrition agent)", cleaned_content, error=True)
         # Fallback: return a basic structure
         return {
             "text": "Sorry, there was an error processing the nutrition response. Please try again.",
@@ -0,0 +1,25 @@
+# app/config.py
+
+"""
+Environment loading for the API process.
+
+``.env`` is read once, when this module is first imported: the current
+directory first, then ``../.env``, then the repository root. Values that are
+already set in the environment are never overridden.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for _env_path in (".env", os.path.join("..", ".env"), os.path.join(REPO_ROOT, ".env")):
+    if os.path.exists(_env_path):
+        load_dotenv(_env_path)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+SERP_API_KEY = os.getenv("SERP_API_KEY")
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL") or "http://localhost:8001/mcp/"
+# Point the Gemini clients somewhere else, e.g. the local stand-in in benchmarks/fake_gemini.py
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
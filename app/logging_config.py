@@ -0,0 +1,131 @@
+# app/logging_config.py
+
+"""
+Structured logging for the API process.
+
+``configure_logging()`` writes one JSON object per record (``LOG_FORMAT=text``
+keeps plain lines for local runs). Every record carries the id of the request
+that produced it; ``extra={...}`` fields are added as top-level keys.
+
+Model prompts and responses are several KB each, so they are never logged
+whole on the hot path. ``log_payload`` logs one only when the request was
+sampled (``LOG_PAYLOAD_SAMPLE_RATE``, decided from the request id so a sampled
+request logs all of its payloads) or when it explains an error. The text is
+truncated to ``LOG_PAYLOAD_MAX_BYTES`` and only rendered if the record is
+actually emitted.
+"""
+
+import json
+import logging
+import os
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_PAYLOAD_MAX_BYTES = int(os.getenv("LOG_PAYLOAD_MAX_BYTES", "2048"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+
+request_id_var = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def truncate(text: str, max_bytes: int = None) -> str:
+    """Cut ``text`` to at most ``max_bytes`` UTF-8 bytes, noting how much was dropped."""
+    max_bytes = LOG_PAYLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    kept = encoded[:max_bytes].decode("utf-8", errors="ignore")
+    return f"{kept}... [{len(encoded) - len(kept.encode('utf-8'))} more bytes]"
+
+
+class Payload:
+    """A log argument that is converted to text and truncated only when the record is formatted."""
+
+    __slots__ = ("value", "max_bytes")
+
+    def __init__(self, value, max_bytes: int = None):
+        self.value = value
+        self.max_bytes = max_bytes
+
+    def __str__(self):
+        return truncate(self.value if isinstance(self.value, str) else str(self.value), self.max_bytes)
+
+
+def payload_sampled(request_id: str = None, rate: float = None) -> bool:
+    """Whether payloads of this request are logged; the same request id always gets the same answer."""
+    rate = LOG_PAYLOAD_SAMPLE_RATE if rate is None else rate
+    if rate <= 0:
+        return False
+    if rate >= 1:
+        return True
+    request_id = request_id or request_id_var.get()
+    if request_id is None:
+        return False
+    return zlib.crc32(request_id.encode()) % 10_000 < rate * 10_000
+
+
+def log_payload(label: str, payload, error: bool = False, logger: logging.Logger = None):
+    """
+    Log a (possibly large) model prompt or response, truncated.
+
+    Args:
+        label: What the payload is, e.g. "Raw Gemini response (workout plan)"
+        payload: The text or object to log; converted with ``str()`` only if emitted
+        error: Log at ERROR regardless of sampling, because the payload explains a failure
+        logger: Defaults to the root logger
+    """
+    if not error and not payload_sampled():
+        return
+    logger = logger or logging.getLogger()
+    size = len(payload) if isinstance(payload, (str, bytes)) else None
+    logger.log(logging.ERROR if error else logging.INFO, "%s: %s", label, Payload(payload),
+               extra={"payload_bytes": size} if size is not None else None)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None):
+    """Install the request-id aware handler on the root logger (replacing any existing handlers)."""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.addFilter(RequestIdFilter())
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
@@ -1,30 +1,67 @@
 # app/main.py
 
-import logging
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from dotenv import load_dotenv
-from app.routers import meals, workouts, nutrition, recommendations, agent
+from app import config  # noqa: F401  Loads .env before anything reads the environment
+from app.logging_config import configure_logging
+from app.routers import meals, workouts, nutrition, recommendations, agent, coach, jobs, ops, health, metrics
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.services.bulkheads import shutdown_bulkheads
+from app.services.warmup import WARMUP_ENABLED, readiness
 
-# Load environment variables from .env file
-load_dotenv('../.env')
+# Configure logging: JSON records tagged with the request id
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm clients in the background: /healthz answers right away, /readyz once warm
+    warmup = None
+    if WARMUP_ENABLED:
+        warmup = asyncio.create_task(readiness.run())
+    else:
+        readiness.skip()
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    shutdown_bulkheads()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 
 # Initialize the FastAPI app
 app = FastAPI(
     title="Fitness Tribe API",
     description="An AI-powered fitness application for coaches and athletes.",
     version="1.0.0",
-    
+    lifespan=lifespan,
 )
 
+# Reject overload early with 429s instead of queueing without bound
+app.add_middleware(AdmissionMiddleware)
+# Added after admission so it runs first: retries attached to in-flight work take no admission slot
+app.add_middleware(IdempotencyMiddleware)
+# Profiles requests that carry the profiling token; inside metrics so it can report stage timings
+app.add_middleware(ProfilingMiddleware)
+# Outside the rest, so latency and Server-Timing cover 429s and replays as clients see them
+app.add_middleware(MetricsMiddleware)
+# Outermost of all, so every log line of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers for different endpoints
 app.include_router(meals.router, prefix="/meals", tags=["meals"])
 app.include_router(workouts.router, prefix="/workout-plans", tags=["workout"])
 app.include_router(nutrition.router, prefix="/nutrition-plans", tags=["nutrition"])
 app.include_router(recommendations.router, prefix="/recommendations", tags=["recommendations"])
 app.include_router(agent.router, prefix="/agent", tags=["agent"])
+app.include_router(coach.router, prefix="/coach", tags=["coach"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+app.include_router(ops.router, prefix="/ops", tags=["ops"])
+app.include_router(health.router, tags=["health"])
+app.include_router(metrics.router, tags=["metrics"])
 
 # Define a root endpoint
 @app.get("/")
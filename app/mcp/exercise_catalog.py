@@ -0,0 +1,185 @@
+"""
+Versioned, hot-reloadable exercise catalog.
+
+A catalog snapshot bundles an ``ExerciseStore`` with the indexes the tools
+query. Snapshots are immutable: a reload builds a complete new snapshot in
+a background thread and then swaps a single reference, so a query that has
+already taken a snapshot keeps a consistent view until it finishes and
+never waits on the rebuild. Old snapshots are released once no query
+references them.
+
+The data file is polled every ``EXERCISE_CATALOG_POLL_SECONDS`` (default
+30, ``0`` disables polling); a reload can also be requested explicitly.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from exercise_store import default_source_path, open_store
+
+MAX_TARGET_RESULTS = 20
+
+
+class CatalogSnapshot:
+    """One immutable generation of the exercise catalog and its indexes."""
+
+    def __init__(self, store, generation: int):
+        self.store = store
+        self.generation = generation
+        self.version = store.source["sha256"][:12]
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+
+        target_index = {}
+        for row, muscles in enumerate(store.columns["targetMuscles"]):
+            for muscle in {tm.lower() for tm in muscles}:
+                target_index.setdefault(muscle, []).append(row)
+        self.target_index = {muscle: tuple(rows) for muscle, rows in target_index.items()}
+
+        self.facts = {
+            "targetMuscles": frozenset(self.target_index),
+            "equipment": frozenset(eq.lower() for row in store.columns["equipments"] for eq in row),
+            "bodyParts": frozenset(bp.lower() for row in store.columns["bodyParts"] for bp in row),
+        }
+
+    def exercises_by_target(self, target_muscle: str, limit: int = MAX_TARGET_RESULTS) -> list:
+        rows = self.target_index.get(target_muscle.lower(), ())[:limit]
+        return [self.store.record(row) for row in rows]
+
+
+class ExerciseCatalog:
+    """Holds the current snapshot and reloads it when the data file changes."""
+
+    def __init__(self, source_path: Path = None, poll_interval: float = None):
+        self.source_path = Path(source_path) if source_path else default_source_path()
+        if poll_interval is None:
+            poll_interval = float(os.getenv("EXERCISE_CATALOG_POLL_SECONDS", "30"))
+        self.poll_interval = poll_interval
+
+        self._snapshot = None
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller = None
+
+        self.reload_count = 0
+        self.last_reload_seconds = None
+        self.last_error = None
+
+    def current(self) -> CatalogSnapshot:
+        """Return the active snapshot, loading the first one on demand."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build(generation=1)
+                    self.start_polling()
+                snapshot = self._snapshot
+        return snapshot
+
+    def loaded_snapshot(self) -> CatalogSnapshot | None:
+        """Return the active snapshot without loading one."""
+        return self._snapshot
+
+    def _build(self, generation: int) -> CatalogSnapshot:
+        started = time.perf_counter()
+        snapshot = CatalogSnapshot(open_store(self.source_path), generation)
+        self.last_reload_seconds = round(time.perf_counter() - started, 4)
+        return snapshot
+
+    def is_stale(self) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None or not self.source_path.exists():
+            return False
+        stat = self.source_path.stat()
+        source = snapshot.store.source
+        return (stat.st_size, stat.st_mtime_ns) != (source["size"], source["mtime_ns"])
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Rebuild the catalog in the calling thread and swap it in.
+
+        Args:
+            force: Rebuild even if the data file looks unchanged
+
+        Returns:
+            True if a new snapshot was installed
+        """
+        if self._snapshot is None:
+            self.current()
+            return True
+        # Only one rebuild at a time; readers are never blocked by it
+        with self._reload_lock:
+            if not force and not self.is_stale():
+                return False
+            try:
+                snapshot = self._build(generation=self._snapshot.generation + 1)
+            except Exception as e:
+                self.last_error = str(e)
+                logging.error(f"Exercise catalog reload failed, keeping version {self._snapshot.version}: {e}")
+                return False
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self.reload_count += 1
+            self.last_error = None
+            logging.info(f"Exercise catalog reloaded: {previous.version} -> {snapshot.version}")
+            return True
+
+    def reload_in_background(self, force: bool = False) -> threading.Thread:
+        thread = threading.Thread(target=self.reload, kwargs={"force": force},
+                                  name="exercise-catalog-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def start_polling(self):
+        if self.poll_interval <= 0 or self._poller is not None:
+            return
+        self._poller = threading.Thread(target=self._poll, name="exercise-catalog-poll", daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        self._stop.set()
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.is_stale():
+                    self.reload()
+            except Exception as e:
+                logging.error(f"Exercise catalog poll failed: {e}")
+
+    def stats(self) -> dict:
+        """Report the loaded snapshot; never loads one, so it is safe to call from async routes."""
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "catalog_version": snapshot.version if snapshot else None,
+            "generation": snapshot.generation if snapshot else 0,
+            "exercise_count": len(snapshot.store) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "reload_count": self.reload_count,
+            "last_reload_seconds": self.last_reload_seconds,
+            "last_error": self.last_error,
+            "poll_interval_seconds": self.poll_interval,
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> ExerciseCatalog:
+    """Return the process-wide catalog (its data is still loaded lazily)."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ExerciseCatalog()
+    return _catalog
+
+
+def current_catalog() -> CatalogSnapshot:
+    return get_catalog().current()
@@ -0,0 +1,223 @@
+"""
+Compact, lazily loaded store for the exercise dataset.
+
+The raw ``exercises.json`` is converted once into a packed artifact
+(``exercises.pack``) that sits next to it:
+
+    MAGIC | header length (uint32 LE) | JSON header | instruction text blob
+
+The header holds the light columns (ids, names, gif urls) and the tag
+columns (target muscles, body parts, equipment, secondary muscles) encoded
+as indices into a single de-duplicated string table. The instruction text,
+which is the bulk of the dataset, stays in the blob and is sliced out of a
+memory map only when an exercise is actually returned.
+
+Run this module directly to (re)build the artifact ahead of deployment:
+
+    python app/mcp/exercise_store.py
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+MAGIC = b"EXPACK01"
+FORMAT_VERSION = 1
+STEP_SEPARATOR = "\x1f"
+
+TAG_COLUMNS = ("targetMuscles", "bodyParts", "equipments", "secondaryMuscles")
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def default_source_path() -> Path:
+    """Resolve the exercise JSON path independently of the working directory."""
+    env_path = os.getenv("EXERCISES_DATA_PATH")
+    return Path(env_path).resolve() if env_path else DATA_DIR / "exercises.json"
+
+
+def artifact_path_for(source_path: Path) -> Path:
+    return source_path.with_suffix(".pack")
+
+
+def _source_signature(source_path: Path) -> dict:
+    stat = source_path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_artifact(source_path: Path = None, artifact_path: Path = None) -> Path:
+    """
+    Convert the exercise JSON into the packed artifact.
+
+    Args:
+        source_path: Path to ``exercises.json`` (defaults to the bundled file)
+        artifact_path: Where to write the artifact (defaults to ``<source>.pack``)
+
+    Returns:
+        The path of the written artifact
+    """
+    source_path = Path(source_path) if source_path else default_source_path()
+    artifact_path = Path(artifact_path) if artifact_path else artifact_path_for(source_path)
+
+    raw = source_path.read_bytes()
+    exercises = json.loads(raw)
+
+    strings = []
+    string_ids = {}
+
+    def intern_id(value):
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    columns = {name: [] for name in TAG_COLUMNS}
+    blob = bytearray()
+    offsets = [0]
+    for exercise in exercises:
+        for name in TAG_COLUMNS:
+            columns[name].append([intern_id(tag) for tag in exercise.get(name, [])])
+        blob += STEP_SEPARATOR.join(exercise.get("instructions", [])).encode("utf-8")
+        offsets.append(len(blob))
+
+    header = {
+        "version": FORMAT_VERSION,
+        "source": {**_source_signature(source_path), "sha256": hashlib.sha256(raw).hexdigest()},
+        "ids": [exercise["exerciseId"] for exercise in exercises],
+        "names": [exercise.get("name", "") for exercise in exercises],
+        "gif_urls": [exercise.get("gifUrl", "") for exercise in exercises],
+        "strings": strings,
+        "columns": columns,
+        "offsets": offsets,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    # Write to a temporary file and rename so readers never see a partial artifact
+    artifact_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=artifact_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(MAGIC)
+            file.write(struct.pack("<I", len(header_bytes)))
+            file.write(header_bytes)
+            file.write(blob)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, artifact_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return artifact_path
+
+
+def _read_header(artifact_path: Path):
+    with open(artifact_path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            return None, 0
+        (header_len,) = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(header_len))
+    return header, len(MAGIC) + 4 + header_len
+
+
+def _is_fresh(header, source_path: Path) -> bool:
+    if not header or header.get("version") != FORMAT_VERSION:
+        return False
+    if not source_path.exists():
+        # Deployed without the JSON: the artifact is the source of truth
+        return True
+    signature = _source_signature(source_path)
+    return all(header["source"].get(key) == value for key, value in signature.items())
+
+
+class ExerciseStore:
+    """
+    Read-only, column-oriented view of the exercise dataset.
+
+    Tag strings are interned once and shared by every exercise that uses
+    them; instructions are decoded from the memory-mapped artifact on demand.
+    """
+
+    def __init__(self, artifact_path: Path):
+        header, blob_start = _read_header(artifact_path)
+        if header is None:
+            raise ValueError(f"{artifact_path} is not an exercise artifact")
+
+        self.artifact_path = Path(artifact_path)
+        self.source = header["source"]
+        self.ids = tuple(header["ids"])
+        self.names = tuple(header["names"])
+        self.gif_urls = tuple(header["gif_urls"])
+
+        strings = [sys.intern(value) for value in header["strings"]]
+        self.columns = {
+            name: tuple(tuple(strings[i] for i in row) for row in header["columns"][name])
+            for name in TAG_COLUMNS
+        }
+        self._offsets = header["offsets"]
+        self._blob_start = blob_start
+        self._row_by_id = {exercise_id: row for row, exercise_id in enumerate(self.ids)}
+
+        with open(artifact_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, exercise_id):
+        return self._row_by_id.get(exercise_id)
+
+    def instructions(self, row: int) -> list:
+        start = self._blob_start + self._offsets[row]
+        end = self._blob_start + self._offsets[row + 1]
+        if start == end:
+            return []
+        return self._mmap[start:end].decode("utf-8").split(STEP_SEPARATOR)
+
+    def record(self, row: int) -> dict:
+        """Materialize one exercise in the same shape as ``exercises.json``."""
+        return {
+            "exerciseId": self.ids[row],
+            "name": self.names[row],
+            "gifUrl": self.gif_urls[row],
+            "targetMuscles": list(self.columns["targetMuscles"][row]),
+            "bodyParts": list(self.columns["bodyParts"][row]),
+            "equipments": list(self.columns["equipments"][row]),
+            "secondaryMuscles": list(self.columns["secondaryMuscles"][row]),
+            "instructions": self.instructions(row),
+        }
+
+    def get(self, exercise_id):
+        row = self._row_by_id.get(exercise_id)
+        return None if row is None else self.record(row)
+
+    def close(self):
+        self._mmap.close()
+
+
+def open_store(source_path: Path = None) -> ExerciseStore:
+    """
+    Open the packed artifact for ``source_path``, rebuilding it first if it
+    is missing or older than the JSON. Falls back to a temporary directory
+    when the data directory is read-only.
+    """
+    source_path = Path(source_path) if source_path else default_source_path()
+    artifact_path = artifact_path_for(source_path)
+
+    header = _read_header(artifact_path)[0] if artifact_path.exists() else None
+    if not _is_fresh(header, source_path):
+        try:
+            build_artifact(source_path, artifact_path)
+        except OSError:
+            artifact_path = Path(tempfile.gettempdir()) / artifact_path.name
+            build_artifact(source_path, artifact_path)
+    return ExerciseStore(artifact_path)
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else default_source_path()
+    path = build_artifact(source)
+    print(f"Wrote {path} ({path.stat().st_size} bytes) from {source}")
@@ -0,0 +1,444 @@
+"""
+In-memory stand-in for the Firestore clients used by the MCP tools.
+
+Implements the subset of the ``google.cloud.firestore`` sync and async
+client APIs that ``mcp_utils`` and ``rollups`` rely on: nested
+collection/document references, ``where`` (``FieldFilter`` or positional),
+``order_by`` (including ``__name__``), ``limit``, ``start_at``/``start_after``,
+``select``, ``get``/``stream``, ``get_all``, batched writes and
+``on_snapshot`` listeners. Ordering follows Firestore's rule that a query
+ordered by a field skips documents that do not have it.
+
+Every read is counted (documents and approximate bytes returned), and an
+optional per-call latency can be injected so tool timings resemble a
+networked backend.
+
+    store = FakeStore(read_latency=0.02)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+
+Setting ``FIRESTORE_BACKEND=memory`` makes ``mcp_utils`` use a process-wide
+store on its own.
+"""
+
+import asyncio
+import copy
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+DESCENDING = "DESCENDING"
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+_MISSING = object()
+
+
+def _get_field(data: dict, field_path: str):
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_field(data: dict, field_path: str, value):
+    parts = field_path.split(".")
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    data[parts[-1]] = value
+
+
+def _order_value(doc_id: str, data: dict, field_path: str):
+    # "__name__" orders by document id, as in Firestore
+    return doc_id if field_path == "__name__" else _get_field(data, field_path)
+
+
+def _compare(op: str, left, right) -> bool:
+    try:
+        return _OPERATORS[op](left, right)
+    except TypeError:
+        # Values of different types never match a range filter in Firestore
+        return False
+
+
+class _SortKey:
+    """Orders values like Firestore within a type; mismatched types fall back to the type name."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        try:
+            return self.value < other.value
+        except TypeError:
+            return type(self.value).__name__ < type(other.value).__name__
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class FakeStore:
+    """Shared document storage behind the fake sync and async clients."""
+
+    def __init__(self, read_latency: float = 0.0):
+        self.read_latency = read_latency
+        self._collections = {}  # collection path -> {doc_id: (data, update_time)}
+        self._listeners = []  # (path, is_collection, callback)
+        self._lock = threading.RLock()
+        self.reads = 0
+        self.read_bytes = 0
+        self.writes = 0
+
+    def client(self):
+        return FakeFirestore(self)
+
+    def async_client(self):
+        return FakeAsyncFirestore(self)
+
+    def reset_stats(self):
+        self.reads = self.read_bytes = self.writes = 0
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "read_bytes": self.read_bytes, "writes": self.writes}
+
+    # Storage
+
+    def _write(self, path: str, data):
+        collection_path, doc_id = path.rsplit("/", 1)
+        with self._lock:
+            documents = self._collections.setdefault(collection_path, {})
+            if data is None:
+                documents.pop(doc_id, None)
+            else:
+                documents[doc_id] = (copy.deepcopy(data), datetime.now(timezone.utc))
+            self.writes += 1
+            listeners = [callback for target, is_collection, callback in self._listeners
+                         if target == (collection_path if is_collection else path)]
+        for callback in listeners:
+            callback()
+
+    def _read(self, path: str):
+        collection_path, doc_id = path.rsplit("/", 1)
+        with self._lock:
+            return self._collections.get(collection_path, {}).get(doc_id)
+
+    def _documents(self, collection_path: str):
+        with self._lock:
+            return list(self._collections.get(collection_path, {}).items())
+
+    def _child_documents(self, collection_path: str):
+        """IDs of documents that exist or have subcollections, like list_documents()."""
+        with self._lock:
+            ids = set(self._collections.get(collection_path, {}))
+            prefix = collection_path + "/"
+            for path in self._collections:
+                if path.startswith(prefix):
+                    ids.add(path[len(prefix):].split("/", 1)[0])
+        return sorted(ids)
+
+    def _count_read(self, snapshots):
+        self.reads += max(len(snapshots), 1)
+        self.read_bytes += sum(len(json.dumps(s._data, default=str)) for s in snapshots if s.exists)
+
+    def _delay(self):
+        if self.read_latency:
+            time.sleep(self.read_latency)
+
+    async def _delay_async(self):
+        if self.read_latency:
+            await asyncio.sleep(self.read_latency)
+
+    def _listen(self, path: str, is_collection: bool, on_change):
+        entry = (path, is_collection, on_change)
+        with self._lock:
+            self._listeners.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._listeners:
+                    self._listeners.remove(entry)
+        return unsubscribe
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data, update_time=None, fields=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        if data is not None and fields:
+            projected = {}
+            for field in fields:
+                value = _get_field(data, field)
+                if value is not _MISSING:
+                    _set_field(projected, field, value)
+            data = projected
+        self._data = data
+        self.update_time = update_time
+        self.create_time = update_time
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self.exists else None
+
+    def get(self, field_path: str):
+        value = _get_field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class Watch:
+    def __init__(self, unsubscribe):
+        self._unsubscribe = unsubscribe
+
+    def unsubscribe(self):
+        self._unsubscribe()
+
+
+class DocumentReference:
+    def __init__(self, store: FakeStore, path: str, is_async: bool = False):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+        self._is_async = is_async
+
+    def collection(self, name: str):
+        return CollectionReference(self._store, f"{self.path}/{name}", self._is_async)
+
+    def _snapshot(self):
+        stored = self._store._read(self.path)
+        if stored is None:
+            return DocumentSnapshot(self, None)
+        return DocumentSnapshot(self, stored[0], stored[1])
+
+    def get(self):
+        if self._is_async:
+            return self._get_async()
+        self._store._delay()
+        snapshot = self._snapshot()
+        self._store._count_read([snapshot])
+        return snapshot
+
+    async def _get_async(self):
+        await self._store._delay_async()
+        snapshot = self._snapshot()
+        self._store._count_read([snapshot])
+        return snapshot
+
+    def set(self, data: dict, merge: bool = False):
+        if merge:
+            stored = self._store._read(self.path)
+            data = {**(stored[0] if stored else {}), **data}
+        self._store._write(self.path, data)
+
+    def delete(self):
+        self._store._write(self.path, None)
+
+    def on_snapshot(self, callback):
+        def notify():
+            snapshot = self._snapshot()
+            callback([snapshot], [], datetime.now(timezone.utc))
+        notify()
+        return Watch(self._store._listen(self.path, False, notify))
+
+
+class Query:
+    def __init__(self, store: FakeStore, collection_path: str, is_async: bool = False, filters=(),
+                 orders=(), limit_count=None, cursor=None, cursor_inclusive=False, fields=None):
+        self._store = store
+        self._collection_path = collection_path
+        self._is_async = is_async
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_count
+        self._cursor = cursor
+        self._cursor_inclusive = cursor_inclusive
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = {
+            "filters": self._filters, "orders": self._orders, "limit_count": self._limit,
+            "cursor": self._cursor, "cursor_inclusive": self._cursor_inclusive, "fields": self._fields,
+        }
+        state.update(changes)
+        return Query(self._store, self._collection_path, self._is_async, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING"):
+        return self._copy(orders=self._orders + ((field_path, direction == DESCENDING),))
+
+    def limit(self, count: int):
+        return self._copy(limit_count=count)
+
+    def start_at(self, values: dict):
+        return self._copy(cursor=dict(values), cursor_inclusive=True)
+
+    def start_after(self, values: dict):
+        return self._copy(cursor=dict(values), cursor_inclusive=False)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def _run(self):
+        documents = self._store._documents(self._collection_path)
+        rows = []
+        for doc_id, (data, update_time) in documents:
+            if any(_order_value(doc_id, data, field) is _MISSING for field, _ in self._orders):
+                continue
+            values = [(_get_field(data, field), op, value) for field, op, value in self._filters]
+            if not all(actual is not _MISSING and _compare(op, actual, value) for actual, op, value in values):
+                continue
+            rows.append((doc_id, data, update_time))
+
+        for field, descending in reversed(self._orders):
+            rows.sort(key=lambda row: _SortKey(_order_value(row[0], row[1], field)), reverse=descending)
+
+        if self._cursor is not None and self._orders:
+            rows = [row for row in rows if self._after_cursor(row)]
+
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        snapshots = [
+            DocumentSnapshot(DocumentReference(self._store, f"{self._collection_path}/{doc_id}", self._is_async),
+                             data, update_time, self._fields)
+            for doc_id, data, update_time in rows
+        ]
+        self._store._count_read(snapshots)
+        return snapshots
+
+    def _after_cursor(self, row) -> bool:
+        """Whether a row sorts after the cursor (or at it, for start_at), comparing the ordered fields in turn."""
+        for field, descending in self._orders:
+            if field not in self._cursor:
+                break
+            boundary = self._cursor[field]
+            if field == "__name__" and not isinstance(boundary, str):
+                boundary = boundary.id
+            value = _SortKey(_order_value(row[0], row[1], field))
+            if value == _SortKey(boundary):
+                continue
+            return value < _SortKey(boundary) if descending else _SortKey(boundary) < value
+        return self._cursor_inclusive
+
+    def get(self):
+        if self._is_async:
+            return self._get_async()
+        self._store._delay()
+        return self._run()
+
+    async def _get_async(self):
+        await self._store._delay_async()
+        return self._run()
+
+    def stream(self):
+        if self._is_async:
+            return self._stream_async()
+        self._store._delay()
+        return iter(self._run())
+
+    async def _stream_async(self):
+        await self._store._delay_async()
+        for snapshot in self._run():
+            yield snapshot
+
+    def on_snapshot(self, callback):
+        def notify():
+            callback(self._run(), [], datetime.now(timezone.utc))
+        notify()
+        return Watch(self._store._listen(self._collection_path, True, notify))
+
+
+class CollectionReference(Query):
+    def __init__(self, store: FakeStore, path: str, is_async: bool = False):
+        super().__init__(store, path, is_async)
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: str):
+        return DocumentReference(self._store, f"{self.path}/{document_id}", self._is_async)
+
+    def list_documents(self):
+        return [self.document(doc_id) for doc_id in self._store._child_documents(self.path)]
+
+
+class FakeBatch:
+    # Firestore rejects larger batches
+    MAX_WRITES = 500
+
+    def __init__(self):
+        self._operations = []
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self._operations.append((reference, data, merge))
+
+    def commit(self):
+        if len(self._operations) > self.MAX_WRITES:
+            raise ValueError(f"maximum {self.MAX_WRITES} writes allowed per request")
+        for reference, data, merge in self._operations:
+            reference.set(data, merge=merge)
+        self._operations = []
+
+
+class FakeFirestore:
+    """Sync client over a FakeStore."""
+
+    _is_async = False
+
+    def __init__(self, store: FakeStore):
+        self.store = store
+
+    def collection(self, name: str):
+        return CollectionReference(self.store, name, self._is_async)
+
+    def batch(self):
+        return FakeBatch()
+
+    def get_all(self, references):
+        self.store._delay()
+        snapshots = [reference._snapshot() for reference in references]
+        self.store._count_read(snapshots)
+        return iter(snapshots)
+
+
+class FakeAsyncFirestore(FakeFirestore):
+    """Async client over a FakeStore."""
+
+    _is_async = True
+
+    async def get_all(self, references):
+        await self.store._delay_async()
+        snapshots = [reference._snapshot() for reference in references]
+        self.store._count_read(snapshots)
+        for snapshot in snapshots:
+            yield snapshot
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store() -> FakeStore:
+    """Process-wide store used when FIRESTORE_BACKEND=memory."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = FakeStore()
+    return _default_store
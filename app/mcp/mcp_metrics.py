@@ -0,0 +1,121 @@
+"""
+Prometheus metrics for the MCP server, served at ``/metrics``.
+
+Firestore latency is recorded per user-data kind where ``_cached`` calls
+through to Firestore. User cache hits and misses are read from
+``user_cache.stats()`` at scrape time, so lookups pay nothing extra. The
+active exercise catalog version and its reload counters are read the same
+way.
+"""
+
+import functools
+import inspect
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# A registry of its own: the MCP server runs as a separate process
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream services",
+    ["upstream", "operation", "outcome"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+
+
+def timed_firestore(operation: str):
+    """Record a (sync or async) Firestore read function's latency under ``operation``."""
+    def decorator(func):
+        def observe(started, outcome):
+            UPSTREAM_LATENCY.labels("firestore", operation, outcome).observe(time.perf_counter() - started)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started, outcome = time.perf_counter(), "error"
+                try:
+                    result = await func(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    observe(started, outcome)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started, outcome = time.perf_counter(), "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                observe(started, outcome)
+        return wrapper
+    return decorator
+
+
+class UserCacheCollector:
+    """Exports ``cache_requests_total`` and ``cache_hit_ratio`` per data kind from a ``UserDataCache``."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        requests = CounterMetricFamily("cache_requests", "Cache lookups by result", labels=["cache", "result"])
+        ratios = GaugeMetricFamily("cache_hit_ratio", "Hits over lookups since start", labels=["cache"])
+        for kind, counts in self.cache.stats()["by_kind"].items():
+            cache = f"user_data.{kind}"
+            requests.add_metric([cache, "hit"], counts["hits"])
+            requests.add_metric([cache, "miss"], counts["misses"])
+            lookups = counts["hits"] + counts["misses"]
+            if lookups:
+                ratios.add_metric([cache], counts["hits"] / lookups)
+        yield requests
+        yield ratios
+
+
+def register_user_cache(cache):
+    REGISTRY.register(UserCacheCollector(cache))
+
+
+class ExerciseCatalogCollector:
+    """Exports the active exercise catalog version, generation and reload counters."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        # Scraping must not trigger the first (expensive) catalog load
+        snapshot = self.catalog.loaded_snapshot()
+        if snapshot is None:
+            return
+        info = GaugeMetricFamily("exercise_catalog_info", "Active exercise catalog version", labels=["version"])
+        info.add_metric([snapshot.version], 1)
+        yield info
+        yield GaugeMetricFamily(
+            "exercise_catalog_generation", "Generation of the active exercise catalog", value=snapshot.generation,
+        )
+        yield GaugeMetricFamily(
+            "exercise_catalog_exercises", "Exercises in the active catalog", value=len(snapshot.store),
+        )
+        yield CounterMetricFamily(
+            "exercise_catalog_reloads", "Exercise catalog reloads since start", value=self.catalog.reload_count,
+        )
+
+
+def register_exercise_catalog(catalog):
+    REGISTRY.register(ExerciseCatalogCollector(catalog))
+
+
+def render_metrics():
+    """Return (body, content type) for the ``/metrics`` route."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
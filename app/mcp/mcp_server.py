@@ -1,19 +1,41 @@
 from typing import Any
 from fastmcp import FastMCP
 import asyncio
+import hmac
 import json
+import logging
+import os
 import requests
 from mcp_utils import *
+from exercise_catalog import get_catalog
+from rollups import get_user_rollups_async
+from mcp_metrics import register_exercise_catalog, render_metrics
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
 import uvicorn
 # Initialize FastMCP server
 mcp = FastMCP("Ghiraas MCP")
 
+MAX_PAGE_SIZE = 50
+
+# The /admin routes are only served when a token is configured, and require it in X-Admin-Token
+MCP_ADMIN_TOKEN = os.getenv("MCP_ADMIN_TOKEN")
+
+
+def _page_size(limit: int) -> int:
+    """Keep tool pages bounded no matter what the agent asks for."""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
 @mcp.tool()
 def get_exercise_by_target(target: str) -> Any:
     """
     Fetch exercise data from the external API based on the target muscle group.
     """
-    return get_exercises_by_target_muscle(target)
+    snapshot = get_catalog().current()
+    return {
+        "catalog_version": snapshot.version,
+        "exercises": get_exercises_by_target_muscle(target, snapshot),
+    }
 
 @mcp.tool()
 def list_available_facts() -> Any:
@@ -23,44 +45,190 @@ def list_available_facts() -> Any:
     return list_facts()
 
 @mcp.tool()
-def get_user_profile_tool(user_id: str) -> Any:
+async def get_user_profile_tool(user_id: str) -> Any:
     """
     Retrieve user profile information from Firestore.
     """
-    return get_user_profile(user_id)
+    return await get_user_profile_async(user_id)
+
+@mcp.tool()
+async def get_user_recent_workouts_tool(user_id: str, limit: int = 10, cursor: str | None = None,
+                                        since: str | None = None) -> Any:
+    """
+    Retrieve user's completed workouts from Firestore, ordered from newest to oldest, one page at a time.
+    
+    Args:
+        user_id: The ID of the user
+        limit: Maximum number of workouts in this page (default: 10, at most 50)
+        cursor: The next_cursor returned by the previous call, to fetch older workouts
+        since: Only return workouts that ended after this ISO-8601 timestamp
+    
+    Returns:
+        {"workouts": [...], "next_cursor": <token for the next page or null>}
+    """
+    return await get_user_workouts_page_async(user_id, _page_size(limit), cursor, since)
 
 @mcp.tool()
-def get_user_recent_workouts_tool(user_id: str, limit: int = 10) -> Any:
+async def get_user_sleep_sessions_tool(user_id: str, limit: int = 10, cursor: str | None = None,
+                                       since: str | None = None) -> Any:
     """
-    Retrieve user's most recent completed workouts from Firestore, ordered from newest to oldest.
+    Retrieve user's sleep logging data from Firestore, ordered by creation time from newest to oldest,
+    one page at a time.
     
     Args:
         user_id: The ID of the user
-        limit: Maximum number of workouts to retrieve (default: 10)
+        limit: Maximum number of sleep sessions in this page (default: 10, at most 50)
+        cursor: The next_cursor returned by the previous call, to fetch older sessions
+        since: Only return sessions created after this ISO-8601 timestamp
+    
+    Returns:
+        {"sleep_sessions": [...], "next_cursor": <token for the next page or null>}
+    """
+    return await get_user_sleep_sessions_page_async(user_id, _page_size(limit), cursor, since)
+
+@mcp.tool()
+async def get_user_food_log_by_days_tool(user_id: str, limit_days: int = 7) -> Any:
+    """
+    Retrieve user's logged food data from Firestore for the last N days, grouped by day.
+    Each day includes its entries and its total calories, protein, carbohydrates and fat.
+    
+    Args:
+        user_id: The ID of the user
+        limit_days: Number of days to retrieve, today included (default: 7)
     """
-    return get_user_recent_workouts(user_id, limit)
+    return await get_user_food_log_by_days_async(user_id, limit_days)
 
 @mcp.tool()
-def get_user_sleep_sessions_tool(user_id: str, limit: int = 10) -> Any:
+async def get_training_volume_summary_tool(user_id: str, weeks: int = 4) -> Any:
     """
-    Retrieve user's sleep logging data from Firestore, ordered by creation time from newest to oldest.
+    Summarize the user's completed workouts as weekly set counts per target muscle group.
+    Prefer this over raw workouts for questions about training volume, balance or consistency.
     
     Args:
         user_id: The ID of the user
-        limit: Maximum number of sleep sessions to retrieve (default: 10)
+        weeks: Number of weeks to cover, the current week included (default: 4, at most 26)
     """
-    return get_user_sleep_sessions(user_id, limit)
+    return await get_training_volume_summary_async(user_id, weeks)
 
 @mcp.tool()
-def get_user_food_log_by_days_tool(user_id: str, limit_days: int = 7) -> Any:
+async def get_sleep_summary_tool(user_id: str, days: int = 30, window: int = 7) -> Any:
     """
-    Retrieve user's logged food data from Firestore, grouped by days using createdAt field.
+    Summarize the user's sleep: mean duration and quality, rolling means over the last `window`
+    sessions, trends per week and the number of nights under 7 hours.
+    Prefer this over raw sleep sessions for questions about sleep patterns or trends.
     
     Args:
         user_id: The ID of the user
-        limit_days: Maximum number of days to retrieve (default: 7)
+        days: Number of days to cover (default: 30)
+        window: Rolling window size in sessions (default: 7)
+    """
+    return await get_sleep_summary_async(user_id, days, window)
+
+@mcp.tool()
+async def get_nutrition_adherence_summary_tool(user_id: str, days: int = 14, calorie_target: float | None = None,
+                                               protein_target: float | None = None,
+                                               carbohydrates_target: float | None = None,
+                                               fat_target: float | None = None) -> Any:
     """
-    return get_user_food_log_by_days(user_id, limit_days)
+    Summarize the user's daily calorie and macro intake, and adherence to the given daily targets
+    (within 10% counts as on target). Targets are optional; derive them from the profile when needed.
+    
+    Args:
+        user_id: The ID of the user
+        days: Number of days to cover, today included (default: 14)
+        calorie_target: Daily calorie target (kcal)
+        protein_target: Daily protein target (g)
+        carbohydrates_target: Daily carbohydrates target (g)
+        fat_target: Daily fat target (g)
+    """
+    targets = {
+        'calories': calorie_target,
+        'protein': protein_target,
+        'carbohydrates': carbohydrates_target,
+        'fat': fat_target,
+    }
+    return await get_nutrition_adherence_summary_async(user_id, days, targets)
+
+@mcp.tool()
+async def get_user_rollups_tool(user_id: str, days: int = 7, weeks: int = 4) -> Any:
+    """
+    Read the user's precomputed daily and weekly summaries: workouts (count, exercises, sets),
+    sleep (sessions, total hours, quality sum/count) and nutrition (entries, calories, protein,
+    carbohydrates, fat). This is the cheapest way to answer questions about recent totals.
+    
+    Args:
+        user_id: The ID of the user
+        days: Number of daily summaries, today included (default: 7)
+        weeks: Number of weekly summaries, the current week included (default: 4)
+    """
+    return await get_user_rollups_async(user_id, days, weeks)
+
+@mcp.tool()
+async def get_roster_overview_tool(user_ids: list[str], workouts_limit: int = 5) -> Any:
+    """
+    Retrieve the profiles and most recent completed workouts of several users (a coach's roster)
+    in one batched call. Use this instead of calling the single-user tools once per athlete.
+    
+    Args:
+        user_ids: The IDs of the users (at most 200)
+        workouts_limit: Maximum number of recent workouts per user (default: 5, at most 50)
+    
+    Returns:
+        {"profiles": {user_id: profile}, "recent_workouts": {user_id: [...]},
+         "errors": {user_id: {"profile" | "recent_workouts": message}}}
+    """
+    return await get_roster_overview_async(user_ids, _page_size(workouts_limit))
+
+def _admin_denied(request: Request) -> JSONResponse | None:
+    """Return an error response unless the request carries the admin token."""
+    if not MCP_ADMIN_TOKEN:
+        return JSONResponse({"detail": "Admin routes are not enabled"}, status_code=404)
+    token = request.headers.get("x-admin-token")
+    if not token or not hmac.compare_digest(token.encode(), MCP_ADMIN_TOKEN.encode()):
+        return JSONResponse({"detail": "Invalid admin token"}, status_code=403)
+    return None
+
+@mcp.custom_route("/admin/exercise-catalog", methods=["GET"])
+async def exercise_catalog_stats(request: Request) -> JSONResponse:
+    """Report the active exercise catalog version and reload statistics."""
+    if denied := _admin_denied(request):
+        return denied
+    return JSONResponse(get_catalog().stats())
+
+@mcp.custom_route("/admin/exercise-catalog/reload", methods=["POST"])
+async def reload_exercise_catalog(request: Request) -> JSONResponse:
+    """Rebuild the exercise catalog in the background and swap it in when ready."""
+    if denied := _admin_denied(request):
+        return denied
+    force = request.query_params.get("force", "false").lower() == "true"
+    get_catalog().reload_in_background(force=force)
+    return JSONResponse({"status": "reloading", **get_catalog().stats()}, status_code=202)
+
+@mcp.custom_route("/admin/user-cache", methods=["GET"])
+async def user_cache_stats(request: Request) -> JSONResponse:
+    """Report hit/miss counters and memory use of the per-user data cache."""
+    if denied := _admin_denied(request):
+        return denied
+    return JSONResponse(user_cache.stats())
+
+register_exercise_catalog(get_catalog())
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> Response:
+    """Prometheus metrics: Firestore latency, user cache hit ratios and the exercise catalog version."""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
 if __name__ == "__main__":
+    # Create the Firestore clients once at startup rather than on the first tool call
+    try:
+        initialize_firebase()
+        initialize_firebase_async()
+    except Exception as e:
+        logging.warning(f"Firebase not initialized at startup, will retry on first use: {e}")
+    # Build the exercise indexes before the first tool call needs them
+    try:
+        get_catalog().current()
+    except Exception as e:
+        logging.warning(f"Exercise catalog not loaded at startup, will retry on first use: {e}")
     mcp.run(transport="http", host="0.0.0.0", port=8000)
\ No newline at end of file
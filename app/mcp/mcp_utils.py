@@ -1,40 +1,643 @@
-import json
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
+import asyncio
+import base64
+import functools
+import inspect
+import json
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from google.cloud.firestore_v1.base_query import FieldFilter
+from pathlib import Path
+from collections.abc import Mapping, Sequence
+from exercise_catalog import current_catalog
+from mcp_metrics import register_user_cache, timed_firestore
+
+
+class _ExerciseList(Sequence):
+    """List-like view over the current catalog; exercises are materialized on access."""
+
+    def __len__(self):
+        return len(current_catalog().store)
+
+    def __getitem__(self, index):
+        store = current_catalog().store
+        if isinstance(index, slice):
+            return [store.record(row) for row in range(len(store))[index]]
+        return store.record(range(len(store))[index])
+
+
+class _ExerciseMap(Mapping):
+    """Dict-like view keyed by ``exerciseId``."""
+
+    def __getitem__(self, exercise_id):
+        exercise = current_catalog().store.get(exercise_id)
+        if exercise is None:
+            raise KeyError(exercise_id)
+        return exercise
+
+    def __contains__(self, exercise_id):
+        return current_catalog().store.row_of(exercise_id) is not None
+
+    def __iter__(self):
+        return iter(current_catalog().store.ids)
+
+    def __len__(self):
+        return len(current_catalog().store)
+
+
+# Nothing is read from disk until one of these is first used
+EXERCISES = _ExerciseList()
+EXERCISE_MAP = _ExerciseMap()
+
+
+FIREBASE_CREDENTIALS_FILE = 'ghiras-454ed-firebase-adminsdk-fbsvc-88ab2174dc.json'
+
+# "firestore" (default) or "memory" for the in-memory stand-in in fake_firestore.py
+FIRESTORE_BACKEND = os.getenv("FIRESTORE_BACKEND", "firestore").lower()
+
+_db = None
+_async_db = None
+_firebase_lock = threading.Lock()
+
 
-def _load_data(file_path):
+def _firebase_credentials_path():
+    """Resolve the service-account file: FIREBASE_CREDENTIALS_PATH, the app directory, then /etc/secrets."""
+    candidates = [
+        os.getenv("FIREBASE_CREDENTIALS_PATH"),
+        str(Path(__file__).resolve().parent.parent / FIREBASE_CREDENTIALS_FILE),
+        f'/etc/secrets/{FIREBASE_CREDENTIALS_FILE}',
+    ]
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"Firebase credentials not found in any of: {[c for c in candidates if c]}")
+
+
+def _ensure_firebase_app():
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(_firebase_credentials_path()))
+
+
+def initialize_firebase():
+    """Return the process-wide Firestore client, initializing Firebase on first use"""
+    global _db
+    if _db is None:
+        with _firebase_lock:
+            if _db is None:
+                if FIRESTORE_BACKEND == "memory":
+                    from fake_firestore import default_store
+                    _db = default_store().client()
+                else:
+                    _ensure_firebase_app()
+                    _db = firestore.client()
+    return _db
+
+
+def initialize_firebase_async():
+    """Return the process-wide async Firestore client, initializing Firebase on first use"""
+    global _async_db
+    if _async_db is None:
+        with _firebase_lock:
+            if _async_db is None:
+                if FIRESTORE_BACKEND == "memory":
+                    from fake_firestore import default_store
+                    _async_db = default_store().async_client()
+                else:
+                    _ensure_firebase_app()
+                    _async_db = firestore_async.client()
+    return _async_db
+
+
+def use_firestore_clients(db, async_db):
     """
-    Load the exercise data from the JSON file path.
+    Route every Firestore read and write through the given clients, e.g. an
+    in-memory ``FakeStore`` for tests and benchmarks. Cached tool results
+    from the previous backend are dropped.
+    
+    Args:
+        db: Sync client (``firestore.client()`` compatible)
+        async_db: Async client (``firestore_async.client()`` compatible)
     """
-    with open(file_path, "r") as file:
-        data = json.load(file)
-    return data
+    global _db, _async_db
+    with _firebase_lock:
+        _db, _async_db = db, async_db
+    user_cache.clear()
 
-EXERCISES = _load_data("app/data/exercises.json")
-EXERCISE_MAP = {exercise["exerciseId"]: exercise for exercise in EXERCISES}
 
+def _profile_ref(db, user_id: str):
+    return (db.collection('users')
+            .document(user_id)
+            .collection('profile')
+            .document('data')
+            .collection('personal_info')
+            .document('current'))
 
-def initialize_firebase():
-    """Initialize Firebase Admin SDK if not already initialized"""
-    if not firebase_admin._apps:
-        # Try to get Firebase credentials from environment or service account file
+
+def _workouts_ref(db, user_id: str):
+    return (db.collection('users')
+            .document(user_id)
+            .collection('exercise')
+            .document('data')
+            .collection('completed_workouts'))
+
+
+def _sleep_sessions_ref(db, user_id: str):
+    return (db.collection('users')
+            .document(user_id)
+            .collection('sleep')
+            .document('data')
+            .collection('sleep_sessions'))
+
+
+def _food_log_ref(db, user_id: str):
+    return (db.collection('users')
+            .document(user_id)
+            .collection('nutrition')
+            .document('data')
+            .collection('food_log_entries'))
+
+
+def _require_user_id(user_id: str):
+    if not user_id or not user_id.strip():
+        raise ValueError("User ID cannot be empty")
+
+
+def _format_profile(user_id: str, profile_doc):
+    if not profile_doc.exists:
+        return None
+    profile_data = profile_doc.to_dict()
+
+    # Add metadata
+    profile_data['user_id'] = user_id
+    profile_data['last_updated'] = profile_doc.update_time.isoformat() if profile_doc.update_time else None
+    return profile_data
+
+
+def _format_workout(doc):
+    workout_data = doc.to_dict()
+    workout_data['workout_id'] = doc.id
+    workout_data['document_path'] = doc.reference.path
+
+    # Add formatted timestamps if they exist
+    if 'endTime' in workout_data and workout_data['endTime']:
+        workout_data['endTime_formatted'] = workout_data['endTime']
+        # Also add a more readable format
         try:
-            cred_path = 'app/ghiras-454ed-firebase-adminsdk-fbsvc-88ab2174dc.json'
-        
-            cred = credentials.Certificate(cred_path)
+            dt = datetime.fromisoformat(workout_data['endTime'].replace('Z', '+00:00'))
+            workout_data['endTime_readable'] = dt.strftime("%B %d, %Y at %I:%M %p")
+        except (AttributeError, ValueError):
+            workout_data['endTime_readable'] = workout_data['endTime']
+    return workout_data
 
-            firebase_admin.initialize_app(cred)
-        except:
-            cred_path = '/etc/secrets/ghiras-454ed-firebase-adminsdk-fbsvc-88ab2174dc.json'
-        
-            cred = credentials.Certificate(cred_path)
 
-            firebase_admin.initialize_app(cred)
+def _format_sleep_session(doc):
+    session_data = doc.to_dict()
 
-    
-    return firestore.client()
+    # Only include specified fields
+    filtered_session = {
+        'session_id': doc.id,
+        'mood': session_data.get('mood'),
+        'sleepQuality': session_data.get('sleepQuality'),
+        'totalDuration_hours': None
+    }
+
+    # Convert totalDuration from milliseconds to hours
+    total_duration_ms = session_data.get('totalDuration')
+    if total_duration_ms is not None:
+        try:
+            # Convert milliseconds to hours (1 hour = 3,600,000 ms)
+            filtered_session['totalDuration_hours'] = round(total_duration_ms / 3600000, 2)
+        except (ValueError, TypeError):
+            filtered_session['totalDuration_hours'] = None
+
+    # Add formatted timestamps if they exist
+    if 'createdAt' in session_data and session_data['createdAt']:
+        try:
+            if hasattr(session_data['createdAt'], 'isoformat'):
+                # If it's a Firestore timestamp
+                filtered_session['createdAt_formatted'] = session_data['createdAt'].isoformat()
+                filtered_session['createdAt_readable'] = session_data['createdAt'].strftime("%B %d, %Y at %I:%M %p")
+            else:
+                # If it's a string timestamp
+                dt = datetime.fromisoformat(str(session_data['createdAt']).replace('Z', '+00:00'))
+                filtered_session['createdAt_formatted'] = session_data['createdAt']
+                filtered_session['createdAt_readable'] = dt.strftime("%B %d, %Y at %I:%M %p")
+        except Exception:
+            filtered_session['createdAt_formatted'] = str(session_data['createdAt'])
+            filtered_session['createdAt_readable'] = str(session_data['createdAt'])
+    return filtered_session
+
+
+FOOD_LOG_FIELDS = [
+    'foodName',
+    'mealType',
+    'servingSize',
+    'createdAt',
+    'nutritionInfo.calories',
+    'nutritionInfo.protein',
+    'nutritionInfo.carbohydrates',
+    'nutritionInfo.fat',
+]
+FOOD_LOG_NUTRIENTS = ('calories', 'protein', 'carbohydrates', 'fat')
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _FoodLogAccumulator:
+    """Groups streamed food log documents by day and sums their nutrients in one pass."""
+
+    def __init__(self):
+        self.food_by_days = {}
+        self.day_index = []
+        self.nutrients = []
+
+    def add(self, doc):
+        food_data = doc.to_dict()
+
+        # Extract date from createdAt (a Firestore timestamp, or an ISO string on older entries)
+        created_at = food_data.get('createdAt')
+        created = _parse_datetime(created_at) if created_at else None
+        if created is None:
+            # Skip entries without a usable timestamp
+            return
+        date_key = created.date().isoformat()
+
+        # Add essential food entry data
+        nutrition_info = food_data.get('nutritionInfo') or {}
+        food_entry = {
+            'entry_id': doc.id,
+            'food_name': food_data.get('foodName'),
+            'type': food_data.get('mealType'),
+            'quantity': food_data.get('servingSize'),
+            'calories': nutrition_info.get('calories', 0),
+            'protein': nutrition_info.get('protein', 0),
+            'carbohydrates': nutrition_info.get('carbohydrates', 0),
+            'fat': nutrition_info.get('fat', 0),
+            'createdAt': str(created_at)
+        }
+
+        if date_key not in self.food_by_days:
+            self.food_by_days[date_key] = []
+        self.food_by_days[date_key].append(food_entry)
+        self.day_index.append(date_key)
+        self.nutrients.append([_as_number(food_entry[name]) for name in FOOD_LOG_NUTRIENTS])
+
+    def result(self):
+        """Return {date: {"entries": [...], "totals": {...}}}, newest day first."""
+        if not self.day_index:
+            return {}
+        days, inverse = np.unique(np.array(self.day_index), return_inverse=True)
+        totals = np.zeros((len(days), len(FOOD_LOG_NUTRIENTS)))
+        np.add.at(totals, inverse, np.array(self.nutrients))
+
+        result = {}
+        for i in range(len(days) - 1, -1, -1):
+            date_key = str(days[i])
+            result[date_key] = {
+                'entries': self.food_by_days[date_key],
+                'totals': {name: round(float(value), 1) for name, value in zip(FOOD_LOG_NUTRIENTS, totals[i])},
+            }
+        return result
+
+
+def _food_log_cutoff(limit_days: int):
+    """Start of the oldest day in the window: midnight UTC, limit_days - 1 days ago."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=max(limit_days, 1) - 1)
 
+
+# Cursor pagination for the history collections. A cursor is an opaque
+# base64 token holding the ordering field value and the document id of the
+# last document of a page; the next page starts after that pair, so
+# documents sharing a timestamp across a page boundary are neither skipped
+# nor repeated. Timestamps are tagged so they are restored as datetimes
+# rather than compared as strings.
+
+def encode_cursor(field: str, value, doc_id: str = None) -> str:
+    if isinstance(value, datetime):
+        payload = {'f': field, 't': 'ts', 'v': value.isoformat()}
+    else:
+        payload = {'f': field, 't': 'raw', 'v': value}
+    if doc_id is not None:
+        payload['id'] = doc_id
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, field: str):
+    """Return (ordering field value, document id); the id is None for cursors issued without one."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['f'] != field:
+            raise ValueError(f"cursor was issued for {payload['f']}")
+        value = datetime.fromisoformat(payload['v']) if payload['t'] == 'ts' else payload['v']
+        return value, payload.get('id')
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def _since_value(field: str, since: str):
+    """Convert an ISO-8601 ``since`` to the type stored in ``field``."""
+    try:
+        parsed = datetime.fromisoformat(since.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid since timestamp: {since!r}")
+    if field == 'endTime':
+        # endTime is stored as an ISO string, e.g. "2025-09-07T21:46:08.859144"
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None).isoformat() if parsed.tzinfo else since
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _history_query(ref, field: str, limit: int, cursor: str = None, since: str = None):
+    # The document id breaks ties between documents with the same ordering value
+    query = (ref.order_by(field, direction=firestore.Query.DESCENDING)
+             .order_by('__name__', direction=firestore.Query.DESCENDING))
+    if since:
+        query = query.where(filter=FieldFilter(field, '>', _since_value(field, since)))
+    if cursor:
+        value, doc_id = decode_cursor(cursor, field)
+        position = {field: value}
+        if doc_id is not None:
+            position['__name__'] = ref.document(doc_id)
+        query = query.start_after(position)
+    return query.limit(limit)
+
+
+def _history_page(docs, field: str, formatter, items_key: str, page_size: int):
+    docs = list(docs)
+    next_cursor = None
+    # A full page may have more behind it; the last page can come back empty
+    if docs and len(docs) == page_size:
+        next_cursor = encode_cursor(field, docs[-1].get(field), docs[-1].id)
+    return {items_key: [formatter(doc) for doc in docs], 'next_cursor': next_cursor}
+
+
+def _workouts_query(db, user_id: str, limit: int, cursor: str = None, since: str = None):
+    # Query workouts ordered by endTime (newest first)
+    # endTime format: "2025-09-07T21:46:08.859144"
+    return _history_query(_workouts_ref(db, user_id), 'endTime', limit, cursor, since)
+
+
+def _sleep_sessions_query(db, user_id: str, limit: int, cursor: str = None, since: str = None):
+    # Query sleep sessions ordered by createdAt (newest first)
+    return _history_query(_sleep_sessions_ref(db, user_id), 'createdAt', limit, cursor, since)
+
+
+def _food_log_queries(db, user_id: str, limit_days: int):
+    # Only the entries inside the requested window, newest first, with just the projected fields.
+    # createdAt is written as a Firestore timestamp, but older entries hold an ISO-8601 string.
+    # A range filter only matches values of its own type, so those need a second query bounded
+    # by the cutoff day as a string (an ISO timestamp on that day sorts after it).
+    cutoff = _food_log_cutoff(limit_days)
+    return [
+        (_food_log_ref(db, user_id)
+         .where(filter=FieldFilter('createdAt', '>=', bound))
+         .order_by('createdAt', direction=firestore.Query.DESCENDING)
+         .select(FOOD_LOG_FIELDS))
+        for bound in (cutoff, cutoff.date().isoformat())
+    ]
+
+
+# Per-user read-through cache.
+#
+# One agent conversation often calls the same user-data tool several times;
+# results are cached per (user, kind, arguments) with a TTL per kind and a
+# byte budget enforced with LRU eviction. While a user has cached data,
+# Firestore snapshot listeners on their profile document and on the newest
+# document of each history collection drop that kind as soon as it changes,
+# so the TTL only bounds staleness for edits to older documents.
+
+USER_CACHE_TTL_SECONDS = {
+    'profile': 300,
+    'workouts': 120,
+    'sleep': 120,
+    'food_log': 60,
+}
+USER_CACHE_ORDER_FIELDS = {
+    'workouts': (_workouts_ref, 'endTime'),
+    'sleep': (_sleep_sessions_ref, 'createdAt'),
+    'food_log': (_food_log_ref, 'createdAt'),
+}
+
+
+class UserDataCache:
+    """Bounded TTL + LRU cache of user-data tool results, keyed by user."""
+
+    def __init__(self, max_bytes: int, max_watched_users: int, ttls: dict = None, listen: bool = True):
+        self.max_bytes = max_bytes
+        self.max_watched_users = max_watched_users
+        self.ttls = ttls or USER_CACHE_TTL_SECONDS
+        self.listen = listen
+
+        self._entries = OrderedDict()  # (user_id, kind, args) -> (expires_at, size, value)
+        self._user_entries = {}  # user_id -> number of cached entries
+        self._watches = OrderedDict()  # user_id -> list of snapshot watches
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.stats_by_kind = {kind: {'hits': 0, 'misses': 0} for kind in self.ttls}
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, kind: str, args: tuple):
+        """Return (True, value) on a fresh hit, (False, None) otherwise."""
+        key = (user_id, kind, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.stats_by_kind[kind]['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats_by_kind[kind]['hits'] += 1
+            return True, entry[2]
+
+    def put(self, user_id: str, kind: str, args: tuple, value):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        key = (user_id, kind, args)
+        released = []
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttls[kind], size, value)
+            self._user_entries[user_id] = self._user_entries.get(user_id, 0) + 1
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted_key = next(iter(self._entries))
+                self._remove(evicted_key)
+                self.evictions += 1
+                evicted_user = evicted_key[0]
+                if evicted_user not in self._user_entries and evicted_user in self._watches:
+                    released.extend(self._watches.pop(evicted_user))
+            needs_watch = self.listen and user_id in self._user_entries and user_id not in self._watches
+            if needs_watch:
+                self._watches[user_id] = []
+                while len(self._watches) > self.max_watched_users:
+                    released.extend(self._watches.popitem(last=False)[1])
+            elif user_id in self._watches:
+                self._watches.move_to_end(user_id)
+        self._unsubscribe(released)
+        if needs_watch:
+            self._watch(user_id)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+        user_id = key[0]
+        self._user_entries[user_id] -= 1
+        if not self._user_entries[user_id]:
+            del self._user_entries[user_id]
+
+    def invalidate(self, user_id: str, kind: str = None):
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == user_id and (kind is None or key[1] == kind)]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_entries.clear()
+            self.bytes = 0
+            released = [watch for watches in self._watches.values() for watch in watches]
+            self._watches.clear()
+        self._unsubscribe(released)
+
+    def _watch(self, user_id: str):
+        """Attach snapshot listeners that invalidate this user's cached data when it changes."""
+        try:
+            db = initialize_firebase()
+            targets = [('profile', _profile_ref(db, user_id))]
+            for kind, (ref_builder, field) in USER_CACHE_ORDER_FIELDS.items():
+                targets.append((kind, ref_builder(db, user_id)
+                                .order_by(field, direction=firestore.Query.DESCENDING).limit(1)))
+            watches = [target.on_snapshot(self._listener(user_id, kind)) for kind, target in targets]
+        except Exception as e:
+            logging.warning(f"Snapshot listeners unavailable for user {user_id}, relying on TTLs: {e}")
+            return
+        with self._lock:
+            if user_id in self._watches:
+                self._watches[user_id] = watches
+                return
+        # The user was evicted while the listeners were being attached
+        self._unsubscribe(watches)
+
+    def _listener(self, user_id: str, kind: str):
+        initial = [True]
+
+        def on_change(*_):
+            # The first callback delivers the current state, not a change
+            if initial[0]:
+                initial[0] = False
+                return
+            self.invalidate(user_id, kind)
+
+        return on_change
+
+    @staticmethod
+    def _unsubscribe(watches):
+        for watch in watches:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                logging.warning(f"Failed to stop snapshot listener: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = sum(kind['hits'] for kind in self.stats_by_kind.values())
+            misses = sum(kind['misses'] for kind in self.stats_by_kind.values())
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'users': len(self._user_entries),
+                'watched_users': len(self._watches),
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'by_kind': {kind: dict(counts) for kind, counts in self.stats_by_kind.items()},
+            }
+
+
+user_cache = UserDataCache(
+    max_bytes=int(os.getenv("USER_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    max_watched_users=int(os.getenv("USER_CACHE_MAX_WATCHED_USERS", "100")),
+    listen=os.getenv("USER_CACHE_LISTENERS", "true").lower() == "true",
+)
+USER_CACHE_ENABLED = os.getenv("USER_CACHE_ENABLED", "true").lower() == "true"
+register_user_cache(user_cache)
+
+
+def _cached(kind: str):
+    """Serve a user-data getter (sync or async) through ``user_cache``."""
+    def decorator(func):
+        signature = inspect.signature(func)
+        load = timed_firestore(kind)(func)
+
+        def cache_key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = list(bound.arguments.values())
+            return values[0], tuple(values[1:])
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not USER_CACHE_ENABLED:
+                    return await load(*args, **kwargs)
+                user_id, key = cache_key(*args, **kwargs)
+                hit, value = user_cache.get(user_id, kind, key)
+                if not hit:
+                    value = await load(*args, **kwargs)
+                    user_cache.put(user_id, kind, key, value)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not USER_CACHE_ENABLED:
+                return load(*args, **kwargs)
+            user_id, key = cache_key(*args, **kwargs)
+            hit, value = user_cache.get(user_id, kind, key)
+            if not hit:
+                value = load(*args, **kwargs)
+                user_cache.put(user_id, kind, key, value)
+            return value
+        return wrapper
+    return decorator
+
+
+@_cached('profile')
 def get_user_profile(user_id: str):
     """
     Retrieve user profile information from Firestore.
@@ -49,110 +652,94 @@ def get_user_profile(user_id: str):
         Exception: If there's an error accessing Firestore
     """
     try:
-        # Initialize Firebase
         db = initialize_firebase()
-        
-        # Get the profile document
-        profile_ref = (db.collection('users')
-                      .document(user_id)
-                      .collection('profile')
-                      .document('data')
-                      .collection('personal_info')
-                      .document('current'))
-        
-        profile_doc = profile_ref.get()
-        
-        if profile_doc.exists:
-            profile_data = profile_doc.to_dict()
-            
-            # Add metadata
-            profile_data['user_id'] = user_id
-            profile_data['last_updated'] = profile_doc.update_time.isoformat() if profile_doc.update_time else None
-            
-            return profile_data
-        else:
-            return None
-            
+        return _format_profile(user_id, _profile_ref(db, user_id).get())
     except Exception as e:
         raise Exception(f"Error retrieving profile for user {user_id}: {str(e)}")
 
-def list_facts():
-    target_muscles = set()
-    equipment = set()
-    body_parts = set()
-    for exercise in EXERCISES:
-        target_muscles.update([tnm.lower() for tnm in exercise["targetMuscles"]])
-        equipment.update([eq.lower() for eq in exercise["equipments"]])
-        body_parts.update([bp.lower() for bp in exercise["bodyParts"]])
+def list_facts(snapshot=None):
+    snapshot = snapshot or current_catalog()
     return {
-        "targetMuscles": target_muscles,
-        "equipment": equipment,
-        "bodyParts": body_parts,
+        "catalog_version": snapshot.version,
+        "targetMuscles": set(snapshot.facts["targetMuscles"]),
+        "equipment": set(snapshot.facts["equipment"]),
+        "bodyParts": set(snapshot.facts["bodyParts"]),
     }
 
-def get_exercise_by_id(exercise_id):
-    return EXERCISE_MAP.get(exercise_id)
+def get_exercise_by_id(exercise_id, snapshot=None):
+    snapshot = snapshot or current_catalog()
+    return snapshot.store.get(exercise_id)
 
-def get_exercises_by_target_muscle(target_muscle):
-    target_muscle = target_muscle.lower()
-    return [ex for ex in EXERCISES if target_muscle in [tm.lower() for tm in ex["targetMuscles"]]][:20]
+def get_exercises_by_target_muscle(target_muscle, snapshot=None):
+    snapshot = snapshot or current_catalog()
+    return snapshot.exercises_by_target(target_muscle)
 
-def get_user_recent_workouts(user_id: str, limit: int = 10):
+@_cached('workouts')
+def get_user_workouts_page(user_id: str, page_size: int = 10, cursor: str = None, since: str = None):
     """
-    Retrieve user's most recent completed workouts from Firestore.
+    Retrieve one page of the user's completed workouts, newest first.
     
     Args:
         user_id: The ID of the user
-        limit: Maximum number of workouts to retrieve (default: 10)
+        page_size: Maximum number of workouts in the page (default: 10)
+        cursor: ``next_cursor`` from the previous page, to continue after it
+        since: Only return workouts that ended after this ISO-8601 timestamp
         
     Returns:
-        List of workout documents ordered from newest to oldest
+        Dict with the page under "workouts" and the token for the following page
+        under "next_cursor" (None when there is nothing more)
         
     Raises:
         Exception: If there's an error accessing Firestore
     """
     try:
-        # Initialize Firebase
         db = initialize_firebase()
+        docs = _workouts_query(db, user_id, page_size, cursor, since).get()
+        return _history_page(docs, 'endTime', _format_workout, 'workouts', page_size)
+    except Exception as e:
+        raise Exception(f"Error retrieving workouts for user {user_id}: {str(e)}")
+
+def get_user_recent_workouts(user_id: str, limit: int = 10):
+    """
+    Retrieve user's most recent completed workouts from Firestore.
+    
+    Args:
+        user_id: The ID of the user
+        limit: Maximum number of workouts to retrieve (default: 10)
         
-        # Get the completed workouts collection reference
-        workouts_ref = (db.collection('users')
-                       .document(user_id)
-                       .collection('exercise')
-                       .document('data')
-                       .collection('completed_workouts'))
-        
-        # Query workouts ordered by endTime (newest first)
-        # endTime format: "2025-09-07T21:46:08.859144"
-        query = workouts_ref.order_by('endTime', direction=firestore.Query.DESCENDING).limit(limit)
+    Returns:
+        List of workout documents ordered from newest to oldest
         
-        # Execute the query
-        workout_docs = query.get()
+    Raises:
+        Exception: If there's an error accessing Firestore
+    """
+    return get_user_workouts_page(user_id, limit)['workouts']
+
+@_cached('sleep')
+def get_user_sleep_sessions_page(user_id: str, page_size: int = 10, cursor: str = None, since: str = None):
+    """
+    Retrieve one page of the user's sleep sessions, newest first.
+    
+    Args:
+        user_id: The ID of the user
+        page_size: Maximum number of sleep sessions in the page (default: 10)
+        cursor: ``next_cursor`` from the previous page, to continue after it
+        since: Only return sessions created after this ISO-8601 timestamp
         
-        workouts = []
-        for doc in workout_docs:
-            workout_data = doc.to_dict()
-            workout_data['workout_id'] = doc.id
-            workout_data['document_path'] = doc.reference.path
-            
-            # Add formatted timestamps if they exist
-            if 'endTime' in workout_data and workout_data['endTime']:
-                workout_data['endTime_formatted'] = workout_data['endTime']
-                # Also add a more readable format
-                try:
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(workout_data['endTime'].replace('Z', '+00:00'))
-                    workout_data['endTime_readable'] = dt.strftime("%B %d, %Y at %I:%M %p")
-                except:
-                    workout_data['endTime_readable'] = workout_data['endTime']
-            
-            workouts.append(workout_data)
+    Returns:
+        Dict with the page under "sleep_sessions" and the token for the following
+        page under "next_cursor" (None when there is nothing more)
         
-        return workouts
-    
-            
-    except Exception:
-        raise Exception(f"Error retrieving workouts for user {user_id}:")
+    Raises:
+        Exception: If there's an error accessing Firestore
+    """
+    try:
+        _require_user_id(user_id)
+        db = initialize_firebase()
+        docs = _sleep_sessions_query(db, user_id, page_size, cursor, since).get()
+        return _history_page(docs, 'createdAt', _format_sleep_session, 'sleep_sessions', page_size)
+    except Exception as e:
+        raise Exception(f"Error retrieving sleep sessions for user {user_id}: {str(e)}.")
 
 def get_user_sleep_sessions(user_id: str, limit: int = 10):
     """
@@ -168,157 +755,449 @@ def get_user_sleep_sessions(user_id: str, limit: int = 10):
     Raises:
         Exception: If there's an error accessing Firestore
     """
-    try:
-        if not user_id or not user_id.strip():
-            raise ValueError("User ID cannot be empty")
-        
-        # Initialize Firebase
-        db = initialize_firebase()
-        
-        # Get the sleep sessions collection reference
-        sleep_sessions_ref = (db.collection('users')
-                             .document(user_id)
-                             .collection('sleep')
-                             .document('data')
-                             .collection('sleep_sessions'))
-        
-        # Query sleep sessions ordered by createdAt (newest first)
-        query = sleep_sessions_ref.order_by('createdAt', direction=firestore.Query.DESCENDING).limit(limit)
-        
-        # Execute the query
-        session_docs = query.get()
-        
-        sleep_sessions = []
-        for doc in session_docs:
-            session_data = doc.to_dict()
-            
-            # Only include specified fields
-            filtered_session = {
-                'session_id': doc.id,
-                'mood': session_data.get('mood'),
-                'sleepQuality': session_data.get('sleepQuality'),
-                'totalDuration_hours': None
-            }
-            
-            # Convert totalDuration from milliseconds to hours
-            total_duration_ms = session_data.get('totalDuration')
-            if total_duration_ms is not None:
-                try:
-                    # Convert milliseconds to hours (1 hour = 3,600,000 ms)
-                    filtered_session['totalDuration_hours'] = round(total_duration_ms / 3600000, 2)
-                except (ValueError, TypeError):
-                    filtered_session['totalDuration_hours'] = None
-            
-            # Add formatted timestamps if they exist
-            if 'createdAt' in session_data and session_data['createdAt']:
-                try:
-                    from datetime import datetime
-                    if hasattr(session_data['createdAt'], 'isoformat'):
-                        # If it's a Firestore timestamp
-                        filtered_session['createdAt_formatted'] = session_data['createdAt'].isoformat()
-                        filtered_session['createdAt_readable'] = session_data['createdAt'].strftime("%B %d, %Y at %I:%M %p")
-                    else:
-                        # If it's a string timestamp
-                        dt = datetime.fromisoformat(str(session_data['createdAt']).replace('Z', '+00:00'))
-                        filtered_session['createdAt_formatted'] = session_data['createdAt']
-                        filtered_session['createdAt_readable'] = dt.strftime("%B %d, %Y at %I:%M %p")
-                except Exception as e:
-                    filtered_session['createdAt_formatted'] = str(session_data['createdAt'])
-                    filtered_session['createdAt_readable'] = str(session_data['createdAt'])
-            
-            sleep_sessions.append(filtered_session)
-        
-        return sleep_sessions
-        
-            
-    except Exception as e:
-        raise Exception(f"Error retrieving sleep sessions for user {user_id}: {str(e)}.")
+    return get_user_sleep_sessions_page(user_id, limit)['sleep_sessions']
 
+@_cached('food_log')
 def get_user_food_log_by_days(user_id: str, limit_days: int = 7):
     """
-    Retrieve user's logged food data from Firestore, grouped by days using createdAt field.
+    Retrieve user's logged food data from Firestore for the last ``limit_days`` days
+    (today included), grouped by days using createdAt field.
     
     Args:
         user_id: The ID of the user
-        limit_days: Maximum number of days to retrieve (default: 7)
+        limit_days: Number of days to retrieve (default: 7)
         
     Returns:
-        Dict with dates as keys and list of food entries as values, ordered from newest to oldest
+        Dict with dates as keys, ordered from newest to oldest. Each value holds the
+        day's food entries under "entries" and the summed calories, protein,
+        carbohydrates and fat under "totals"
         
     Raises:
         Exception: If there's an error accessing Firestore
     """
     try:
-        if not user_id or not user_id.strip():
-            raise ValueError("User ID cannot be empty")
-        
-        # Initialize Firebase
+        _require_user_id(user_id)
         db = initialize_firebase()
+        accumulator = _FoodLogAccumulator()
+        for query in _food_log_queries(db, user_id, limit_days):
+            for doc in query.stream():
+                accumulator.add(doc)
+        return accumulator.result()
+    except Exception as e:
+        raise Exception(f"Error retrieving food log for user {user_id}: {str(e)}")
+
+
+# Async variants used by the MCP tools so a slow Firestore read does not
+# block other agent sessions served by the same event loop.
+
+@_cached('profile')
+async def get_user_profile_async(user_id: str):
+    """Async variant of get_user_profile."""
+    try:
+        db = initialize_firebase_async()
+        return _format_profile(user_id, await _profile_ref(db, user_id).get())
+    except Exception as e:
+        raise Exception(f"Error retrieving profile for user {user_id}: {str(e)}")
+
+@_cached('workouts')
+async def get_user_workouts_page_async(user_id: str, page_size: int = 10, cursor: str = None, since: str = None):
+    """Async variant of get_user_workouts_page."""
+    try:
+        db = initialize_firebase_async()
+        docs = await _workouts_query(db, user_id, page_size, cursor, since).get()
+        return _history_page(docs, 'endTime', _format_workout, 'workouts', page_size)
+    except Exception as e:
+        raise Exception(f"Error retrieving workouts for user {user_id}: {str(e)}")
+
+async def get_user_recent_workouts_async(user_id: str, limit: int = 10):
+    """Async variant of get_user_recent_workouts."""
+    return (await get_user_workouts_page_async(user_id, limit))['workouts']
+
+@_cached('sleep')
+async def get_user_sleep_sessions_page_async(user_id: str, page_size: int = 10, cursor: str = None, since: str = None):
+    """Async variant of get_user_sleep_sessions_page."""
+    try:
+        _require_user_id(user_id)
+        db = initialize_firebase_async()
+        docs = await _sleep_sessions_query(db, user_id, page_size, cursor, since).get()
+        return _history_page(docs, 'createdAt', _format_sleep_session, 'sleep_sessions', page_size)
+    except Exception as e:
+        raise Exception(f"Error retrieving sleep sessions for user {user_id}: {str(e)}.")
+
+async def get_user_sleep_sessions_async(user_id: str, limit: int = 10):
+    """Async variant of get_user_sleep_sessions."""
+    return (await get_user_sleep_sessions_page_async(user_id, limit))['sleep_sessions']
+
+@_cached('food_log')
+async def get_user_food_log_by_days_async(user_id: str, limit_days: int = 7):
+    """Async variant of get_user_food_log_by_days."""
+    try:
+        _require_user_id(user_id)
+        db = initialize_firebase_async()
+        accumulator = _FoodLogAccumulator()
+        for query in _food_log_queries(db, user_id, limit_days):
+            async for doc in query.stream():
+                accumulator.add(doc)
+        return accumulator.result()
+    except Exception as e:
+        raise Exception(f"Error retrieving food log for user {user_id}: {str(e)}")
+
+
+# Analytics summaries.
+#
+# These answer "how has my training/sleep/eating been going" with a few
+# hundred bytes of numbers instead of the raw documents. The summarizers are
+# pure functions over the formatted tool payloads; the *_summary_async
+# functions fetch the window and summarize it.
+
+ANALYTICS_MAX_DOCUMENTS = 500
+SLEEP_QUALITY_SCORES = {'poor': 1, 'fair': 2, 'good': 3, 'great': 4, 'excellent': 4}
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _workout_set_count(exercise) -> int:
+    """Completed sets of one logged exercise; ``sets`` may be a count or a list of set records."""
+    sets = exercise.get('sets')
+    if isinstance(sets, list):
+        return sum(1 for s in sets
+                   if not isinstance(s, dict) or s.get('completed', s.get('isCompleted', True)))
+    try:
+        return int(sets or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _linear_trend(x, y):
+    """Least-squares slope of y over x, or None without two distinct x values."""
+    if len(x) < 2 or np.ptp(x) == 0:
+        return None
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def _rounded(value, digits=2):
+    return None if value is None else round(float(value), digits)
+
+
+def summarize_training_volume(workouts, weeks: int = 4, today=None, top_muscles: int = 8) -> dict:
+    """
+    Weekly completed sets per target muscle group, joining logged exercises against EXERCISE_MAP.
+
+    Args:
+        workouts: Workout dicts as returned by get_user_recent_workouts
+        weeks: Number of ISO weeks to cover, the current one included
+        today: Reference date (defaults to today, UTC)
+        top_muscles: Number of muscle groups to report, by total sets
+
+    Returns:
+        Dict with the week labels, workouts and sets per week, and sets per week for the top muscles
+    """
+    today = today or datetime.now(timezone.utc).date()
+    first_week = _week_start(today) - timedelta(weeks=weeks - 1)
+    snapshot = current_catalog()
+
+    muscle_ids = {}
+    week_rows, muscle_cols, set_counts = [], [], []
+    workouts_per_week = np.zeros(weeks, dtype=int)
+    unmatched = 0
+    for workout in workouts:
+        ended = _parse_datetime(workout.get('endTime'))
+        if ended is None:
+            continue
+        week = (ended.date() - first_week).days // 7
+        if not 0 <= week < weeks:
+            continue
+        workouts_per_week[week] += 1
+        for exercise in workout.get('exercises') or []:
+            exercise_id = exercise.get('exerciseId') or exercise.get('exercise_id') or exercise.get('id')
+            row = snapshot.store.row_of(exercise_id)
+            if row is None:
+                unmatched += 1
+                continue
+            sets = _workout_set_count(exercise)
+            for muscle in snapshot.store.columns['targetMuscles'][row]:
+                week_rows.append(week)
+                muscle_cols.append(muscle_ids.setdefault(muscle.lower(), len(muscle_ids)))
+                set_counts.append(sets)
+
+    volume = np.zeros((weeks, len(muscle_ids)), dtype=int)
+    if set_counts:
+        np.add.at(volume, (np.array(week_rows), np.array(muscle_cols)), np.array(set_counts))
+    muscles = list(muscle_ids)
+    totals = volume.sum(axis=0)
+    top = np.argsort(-totals, kind='stable')[:top_muscles]
+
+    return {
+        'weeks': [(first_week + timedelta(weeks=i)).isoformat() for i in range(weeks)],
+        'workouts_per_week': workouts_per_week.tolist(),
+        'sets_per_week': volume.sum(axis=1).tolist(),
+        'sets_per_muscle_per_week': {muscles[i]: volume[:, i].tolist() for i in top},
+        'other_muscles': max(len(muscles) - len(top), 0),
+        'unmatched_exercises': unmatched,
+    }
+
+
+def summarize_sleep(sessions, window: int = 7) -> dict:
+    """
+    Sleep duration and quality statistics, rolling means and weekly trends.
+
+    Args:
+        sessions: Sleep session dicts as returned by get_user_sleep_sessions
+        window: Rolling window, in sessions
+
+    Returns:
+        Dict of means, latest rolling means, per-week trends and short-night counts
+    """
+    points = []
+    for session in sessions:
+        created = _parse_datetime(session.get('createdAt_formatted'))
+        hours = session.get('totalDuration_hours')
+        if created is None or hours is None:
+            continue
+        quality = session.get('sleepQuality')
+        if isinstance(quality, str):
+            quality = SLEEP_QUALITY_SCORES.get(quality.strip().lower())
+        points.append((created.timestamp(), float(hours), float(quality) if quality is not None else np.nan))
+    if not points:
+        return {'sessions': 0}
+
+    data = np.array(sorted(points))
+    days = (data[:, 0] - data[0, 0]) / 86400
+    hours, quality = data[:, 1], data[:, 2]
+    window = max(1, min(window, len(hours)))
+    rolling = np.convolve(hours, np.ones(window) / window, mode='valid')
+    rated = ~np.isnan(quality)
+    hours_trend = _linear_trend(days, hours)
+    quality_trend = _linear_trend(days[rated], quality[rated])
+
+    return {
+        'sessions': len(hours),
+        'first': datetime.fromtimestamp(data[0, 0], timezone.utc).date().isoformat(),
+        'last': datetime.fromtimestamp(data[-1, 0], timezone.utc).date().isoformat(),
+        'mean_hours': _rounded(hours.mean()),
+        'std_hours': _rounded(hours.std()),
+        f'rolling_mean_hours_{window}': _rounded(rolling[-1]),
+        'trend_hours_per_week': _rounded(hours_trend * 7 if hours_trend is not None else None, 3),
+        'nights_under_7h': int((hours < 7).sum()),
+        'mean_quality': _rounded(quality[rated].mean()) if rated.any() else None,
+        f'rolling_mean_quality_{window}': _rounded(quality[rated][-window:].mean()) if rated.any() else None,
+        'trend_quality_per_week': _rounded(quality_trend * 7 if quality_trend is not None else None, 3),
+    }
+
+
+def summarize_nutrition_adherence(food_log_by_days, days: int, targets: dict = None, tolerance: float = 0.1) -> dict:
+    """
+    Daily calorie/macro intake against targets.
+
+    Args:
+        food_log_by_days: Result of get_user_food_log_by_days
+        days: Length of the window the log covers
+        targets: Daily targets keyed by calories/protein/carbohydrates/fat; missing keys are skipped
+        tolerance: Relative band around a target that counts as on target
+
+    Returns:
+        Dict of mean intake, and per nutrient with a target: mean percent of target,
+        days on target, over and under
+    """
+    targets = {name: value for name, value in (targets or {}).items() if value}
+    logged = [day['totals'] for day in food_log_by_days.values()]
+    summary = {'days_in_window': days, 'days_logged': len(logged)}
+    if not logged:
+        return summary
+
+    intake = np.array([[day.get(name, 0) for name in FOOD_LOG_NUTRIENTS] for day in logged], dtype=float)
+    summary['mean_daily'] = {name: _rounded(value, 1) for name, value in zip(FOOD_LOG_NUTRIENTS, intake.mean(axis=0))}
+
+    adherence = {}
+    for i, name in enumerate(FOOD_LOG_NUTRIENTS):
+        if name not in targets:
+            continue
+        ratio = intake[:, i] / float(targets[name])
+        adherence[name] = {
+            'target': targets[name],
+            'mean_pct_of_target': _rounded(ratio.mean() * 100, 1),
+            'days_on_target': int((np.abs(ratio - 1) <= tolerance).sum()),
+            'days_over': int((ratio > 1 + tolerance).sum()),
+            'days_under': int((ratio < 1 - tolerance).sum()),
+        }
+    if adherence:
+        summary['adherence'] = adherence
+    return summary
+
+
+async def _collect_pages_async(fetch_page, items_key: str, user_id: str, since: str):
+    items, cursor = [], None
+    while len(items) < ANALYTICS_MAX_DOCUMENTS:
+        page = await fetch_page(user_id, 50, cursor, since)
+        items.extend(page[items_key])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    return items[:ANALYTICS_MAX_DOCUMENTS]
+
+
+async def get_training_volume_summary_async(user_id: str, weeks: int = 4):
+    """Weekly sets per muscle group over the last ``weeks`` ISO weeks."""
+    weeks = max(1, min(weeks, 26))
+    today = datetime.now(timezone.utc).date()
+    since = (_week_start(today) - timedelta(weeks=weeks - 1)).isoformat()
+    workouts = await _collect_pages_async(get_user_workouts_page_async, 'workouts', user_id, since)
+    return summarize_training_volume(workouts, weeks, today)
+
+
+async def get_sleep_summary_async(user_id: str, days: int = 30, window: int = 7):
+    """Sleep statistics and trends over the last ``days`` days."""
+    # Whole days, so repeated calls share one query (and one user-cache entry)
+    since = (datetime.now(timezone.utc).date() - timedelta(days=max(1, min(days, 365)))).isoformat()
+    sessions = await _collect_pages_async(get_user_sleep_sessions_page_async, 'sleep_sessions', user_id, since)
+    return summarize_sleep(sessions, window)
+
+
+async def get_nutrition_adherence_summary_async(user_id: str, days: int = 14, targets: dict = None):
+    """Calorie/macro adherence against ``targets`` over the last ``days`` days."""
+    days = max(1, min(days, 90))
+    return summarize_nutrition_adherence(await get_user_food_log_by_days_async(user_id, days), days, targets)
+
+
+# Bulk reads for coach dashboards.
+#
+# Profiles are fetched with one batched get_all() call; history collections
+# cannot be batched, so their queries run concurrently under a bound. Both
+# go through the per-user cache and report failures per user instead of
+# failing the whole roster.
+
+MAX_BULK_USERS = 200
+BULK_QUERY_CONCURRENCY = int(os.getenv("BULK_QUERY_CONCURRENCY", "10"))
+
+
+def _unique_user_ids(user_ids):
+    unique = list(dict.fromkeys(user_id for user_id in user_ids if user_id and user_id.strip()))
+    if len(unique) > MAX_BULK_USERS:
+        raise ValueError(f"At most {MAX_BULK_USERS} users can be requested at once")
+    return unique
+
+
+def _cached_profiles(user_ids):
+    results, missing = {}, []
+    for user_id in user_ids:
+        hit, profile = user_cache.get(user_id, 'profile', ()) if USER_CACHE_ENABLED else (False, None)
+        if hit:
+            results[user_id] = profile
+        else:
+            missing.append(user_id)
+    return results, missing
+
+
+def _store_profile(results, user_id, snapshot):
+    results[user_id] = _format_profile(user_id, snapshot)
+    if USER_CACHE_ENABLED:
+        user_cache.put(user_id, 'profile', (), results[user_id])
+
+
+def get_profiles(user_ids):
+    """
+    Retrieve the profiles of several users with a single batched Firestore read.
+    
+    Args:
+        user_ids: IDs of the users (duplicates and blanks are ignored, at most 200)
         
-        # Get the food log entries collection reference
-        food_log_ref = (db.collection('users')
-                       .document(user_id)
-                       .collection('nutrition')
-                       .document('data')
-                       .collection('food_log_entries'))
-        
-        # Query food entries ordered by createdAt (newest first)
-        # Get more entries to ensure we have enough for the requested days
-        query = food_log_ref.order_by('createdAt', direction=firestore.Query.DESCENDING).limit(limit_days * 10)
-        
-        # Execute the query
-        food_docs = query.get()
-        
-        # Group food entries by date
-        food_by_days = {}
-        from datetime import datetime
+    Returns:
+        Dict with profiles keyed by user ID under "results" (None when a user has no
+        profile) and error messages keyed by user ID under "errors"
+    """
+    results, missing = _cached_profiles(_unique_user_ids(user_ids))
+    errors = {}
+    if missing:
+        try:
+            db = initialize_firebase()
+            refs = {_profile_ref(db, user_id).path: user_id for user_id in missing}
+            for snapshot in db.get_all([_profile_ref(db, user_id) for user_id in missing]):
+                _store_profile(results, refs[snapshot.reference.path], snapshot)
+        except Exception as e:
+            errors.update({user_id: str(e) for user_id in missing if user_id not in results})
+    return {'results': results, 'errors': errors}
+
+
+async def get_profiles_async(user_ids):
+    """Async variant of get_profiles."""
+    results, missing = _cached_profiles(_unique_user_ids(user_ids))
+    errors = {}
+    if missing:
+        try:
+            db = initialize_firebase_async()
+            refs = {_profile_ref(db, user_id).path: user_id for user_id in missing}
+            async for snapshot in db.get_all([_profile_ref(db, user_id) for user_id in missing]):
+                _store_profile(results, refs[snapshot.reference.path], snapshot)
+        except Exception as e:
+            errors.update({user_id: str(e) for user_id in missing if user_id not in results})
+    return {'results': results, 'errors': errors}
+
+
+def get_recent_workouts_many(user_ids, limit: int = 5, max_concurrency: int = BULK_QUERY_CONCURRENCY):
+    """
+    Retrieve the most recent completed workouts of several users, querying at most
+    ``max_concurrency`` users at a time.
+    
+    Args:
+        user_ids: IDs of the users (duplicates and blanks are ignored, at most 200)
+        limit: Maximum number of workouts per user (default: 5)
+        max_concurrency: Maximum number of concurrent Firestore queries
         
-        for doc in food_docs:
-            food_data = doc.to_dict()
-            
-            # Extract date from createdAt
-            created_at = food_data.get('createdAt')
-            if not created_at:
-                continue
-                
+    Returns:
+        Dict with workout lists keyed by user ID under "results" and error messages
+        keyed by user ID under "errors"
+    """
+    user_ids = _unique_user_ids(user_ids)
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = {user_id: executor.submit(get_user_recent_workouts, user_id, limit) for user_id in user_ids}
+        for user_id, future in futures.items():
             try:
-                # Handle different timestamp formats
-                if hasattr(created_at, 'date'):
-                    # Firestore timestamp
-                    date_key = created_at.date().isoformat()
-                else:
-                    # String timestamp
-                    dt = datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
-                    date_key = dt.date().isoformat()
-                
-                # Initialize date group if not exists
-                if date_key not in food_by_days:
-                    food_by_days[date_key] = []
-                
-                # Add essential food entry data
-                nutrition_info = food_data.get('nutritionInfo', {})
-                
-                food_entry = {
-                    'entry_id': doc.id,
-                    'food_name': food_data.get('foodName'),
-                    'type': food_data.get('mealType'),
-                    'quantity': food_data.get('servingSize'),
-                    'calories': nutrition_info.get('calories', 0),
-                    'protein': nutrition_info.get('protein', 0),
-                    'carbohydrates': nutrition_info.get('carbohydrates', 0),
-                    'fat': nutrition_info.get('fat', 0),
-                    'createdAt': str(created_at)
-                }
-                
-                food_by_days[date_key].append(food_entry)
-                
+                results[user_id] = future.result()
             except Exception as e:
-                # Skip entries with invalid timestamps
-                continue
-        
-        # Sort dates (newest first) and limit to requested days
-        sorted_dates = sorted(food_by_days.keys(), reverse=True)[:limit_days]
-        limited_food_by_days = {date: food_by_days[date] for date in sorted_dates}
-        return limited_food_by_days        
-    except Exception as e:
-        raise Exception(f"Error retrieving food log for user {user_id}: {str(e)}")
+                errors[user_id] = str(e)
+    return {'results': results, 'errors': errors}
+
+
+async def get_recent_workouts_many_async(user_ids, limit: int = 5, max_concurrency: int = BULK_QUERY_CONCURRENCY):
+    """Async variant of get_recent_workouts_many."""
+    user_ids = _unique_user_ids(user_ids)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def fetch(user_id):
+        async with semaphore:
+            return await get_user_recent_workouts_async(user_id, limit)
+
+    outcomes = await asyncio.gather(*(fetch(user_id) for user_id in user_ids), return_exceptions=True)
+    results, errors = {}, {}
+    for user_id, outcome in zip(user_ids, outcomes):
+        if isinstance(outcome, Exception):
+            errors[user_id] = str(outcome)
+        else:
+            results[user_id] = outcome
+    return {'results': results, 'errors': errors}
+
+
+async def get_roster_overview_async(user_ids, workouts_limit: int = 5):
+    """
+    Profiles and recent workouts for a whole roster, fetched concurrently.
+    
+    Returns:
+        Dict with "profiles" and "recent_workouts" keyed by user ID, and "errors"
+        keyed by user ID with a message per failed part
+    """
+    profiles, workouts = await asyncio.gather(
+        get_profiles_async(user_ids),
+        get_recent_workouts_many_async(user_ids, workouts_limit),
+    )
+    errors = {}
+    for part, outcome in (('profile', profiles), ('recent_workouts', workouts)):
+        for user_id, message in outcome['errors'].items():
+            errors.setdefault(user_id, {})[part] = message
+    return {
+        'profiles': profiles['results'],
+        'recent_workouts': workouts['results'],
+        'errors': errors,
+    }
@@ -0,0 +1,364 @@
+"""
+Per-user daily and weekly rollups of workouts, sleep and food logs.
+
+Rollup documents live next to the raw data:
+
+    users/{id}/rollups/data                    watermarks + lastUpdated
+    users/{id}/rollups/data/daily/{YYYY-MM-DD}
+    users/{id}/rollups/data/weekly/{YYYY-MM-DD}  (keyed by the Monday of the week)
+
+Every update recomputes whole days from the raw documents and whole weeks
+from their daily rollups, then overwrites them. Applying the same update
+twice therefore yields the same documents, which is what makes the
+watermark catch-up idempotent: a run that dies before advancing the
+watermark is simply redone by the next one.
+
+A watermark is the last ordering value seen per source together with the
+ids of the documents holding that value. Catch-up pages by (value,
+document id) and restarts at the watermark value itself, so documents
+sharing a timestamp, within a run or written after it, are not skipped.
+Older documents store ``createdAt`` as an ISO string, which Firestore sorts
+after every timestamp, so each source keeps one watermark per value type
+and catches up on each type with its own range-bounded query.
+
+Two entry points keep the rollups current:
+
+- ``catch_up(user_id)`` (CLI / scheduled batch) picks up every raw document
+  past the per-source watermark.
+- ``on_write(document_path, before, after)`` is meant to be wired to a
+  Firestore write trigger; it also covers edits and deletes of older
+  documents, which the watermark cannot see.
+
+    python app/mcp/rollups.py --user <user_id> [--user ...]
+    python app/mcp/rollups.py --all
+"""
+
+import argparse
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from mcp_utils import (
+    SLEEP_QUALITY_SCORES,
+    _as_number,
+    _food_log_ref,
+    _parse_datetime,
+    _sleep_sessions_ref,
+    _workout_set_count,
+    _workouts_ref,
+    initialize_firebase,
+    initialize_firebase_async,
+)
+
+# source -> (collection builder, ordering/bucketing field, path segment under users/{id})
+SOURCES = {
+    'workouts': (_workouts_ref, 'endTime', 'exercise/data/completed_workouts'),
+    'sleep': (_sleep_sessions_ref, 'createdAt', 'sleep/data/sleep_sessions'),
+    'food_log': (_food_log_ref, 'createdAt', 'nutrition/data/food_log_entries'),
+}
+# value type -> lowest value of that type; a range filter only matches values of its own type
+VALUE_TYPES = {
+    'timestamp': datetime(1, 1, 1, tzinfo=timezone.utc),
+    'string': '',
+}
+CATCH_UP_BATCH_SIZE = 500
+# Firestore rejects write batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+MAX_ROLLUP_DAYS = 90
+MAX_ROLLUP_WEEKS = 26
+
+
+def _rollup_state_ref(db, user_id: str):
+    return db.collection('users').document(user_id).collection('rollups').document('data')
+
+
+def _day_of(value):
+    """UTC calendar day a raw document is bucketed under, or None if it has no usable timestamp."""
+    parsed = _parse_datetime(value) if value else None
+    if parsed is None:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.date()
+
+
+def _week_of(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _day_bounds(source: str, day: date):
+    """[start, end) ranges covering ``day``, one per type the source's ordering field is stored as."""
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    # ISO strings sort chronologically; endTime is always one, createdAt only on older documents
+    string_bounds = (start.date().isoformat(), end.date().isoformat())
+    if source == 'workouts':
+        return [string_bounds]
+    return [(start, end), string_bounds]
+
+
+def _empty_daily(day: date) -> dict:
+    return {
+        'date': day.isoformat(),
+        'workouts': {'count': 0, 'sets': 0, 'exercises': 0},
+        'sleep': {'count': 0, 'total_hours': 0.0, 'quality_sum': 0.0, 'quality_count': 0},
+        'nutrition': {'entries': 0, 'calories': 0.0, 'protein': 0.0, 'carbohydrates': 0.0, 'fat': 0.0},
+    }
+
+
+def _add_document(daily: dict, source: str, data: dict):
+    if source == 'workouts':
+        exercises = data.get('exercises') or []
+        daily['workouts']['count'] += 1
+        daily['workouts']['exercises'] += len(exercises)
+        daily['workouts']['sets'] += sum(_workout_set_count(exercise) for exercise in exercises)
+    elif source == 'sleep':
+        daily['sleep']['count'] += 1
+        daily['sleep']['total_hours'] += _as_number(data.get('totalDuration')) / 3600000
+        quality = data.get('sleepQuality')
+        if isinstance(quality, str):
+            quality = SLEEP_QUALITY_SCORES.get(quality.strip().lower())
+        if quality is not None:
+            daily['sleep']['quality_sum'] += _as_number(quality)
+            daily['sleep']['quality_count'] += 1
+    else:
+        nutrition_info = data.get('nutritionInfo') or {}
+        daily['nutrition']['entries'] += 1
+        for name in ('calories', 'protein', 'carbohydrates', 'fat'):
+            daily['nutrition'][name] += _as_number(nutrition_info.get(name))
+
+
+def compute_daily(db, user_id: str, day: date) -> dict:
+    """Recompute one day's rollup from the raw documents of every source."""
+    daily = _empty_daily(day)
+    for source, (ref_builder, field, _) in SOURCES.items():
+        for start, end in _day_bounds(source, day):
+            query = (ref_builder(db, user_id)
+                     .where(filter=FieldFilter(field, '>=', start))
+                     .where(filter=FieldFilter(field, '<', end)))
+            for doc in query.stream():
+                _add_document(daily, source, doc.to_dict())
+    for section in ('sleep', 'nutrition'):
+        for key, value in daily[section].items():
+            if isinstance(value, float):
+                daily[section][key] = round(value, 2)
+    return daily
+
+
+def _sum_sections(target: dict, source: dict):
+    for section in ('workouts', 'sleep', 'nutrition'):
+        for key, value in source.get(section, {}).items():
+            target[section][key] = round(target[section][key] + value, 2)
+
+
+def _commit_in_batches(db, writes):
+    """Apply (reference, data) writes in batches no larger than Firestore allows."""
+    for offset in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for ref, data in writes[offset:offset + MAX_BATCH_WRITES]:
+            batch.set(ref, data)
+        batch.commit()
+
+
+def recompute_days(db, user_id: str, days) -> dict:
+    """
+    Overwrite the daily rollups for ``days`` and the weekly rollups containing them.
+
+    Returns:
+        Dict with the number of daily and weekly documents written
+    """
+    days = sorted(set(days))
+    if not days:
+        return {'daily': 0, 'weekly': 0}
+    state_ref = _rollup_state_ref(db, user_id)
+    now = datetime.now(timezone.utc)
+
+    _commit_in_batches(db, [
+        (state_ref.collection('daily').document(day.isoformat()), {**compute_daily(db, user_id, day), 'updatedAt': now})
+        for day in days
+    ])
+
+    weeks = sorted({_week_of(day) for day in days})
+    writes = []
+    for week in weeks:
+        week_days = [week + timedelta(days=i) for i in range(7)]
+        weekly = _empty_daily(week)
+        weekly['week_start'] = weekly.pop('date')
+        weekly['days_with_data'] = 0
+        refs = [state_ref.collection('daily').document(day.isoformat()) for day in week_days]
+        for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                weekly['days_with_data'] += 1
+                _sum_sections(weekly, snapshot.to_dict())
+        writes.append((state_ref.collection('weekly').document(week.isoformat()), {**weekly, 'updatedAt': now}))
+    _commit_in_batches(db, writes)
+    return {'daily': len(days), 'weekly': len(weeks)}
+
+
+def catch_up(user_id: str, db=None) -> dict:
+    """
+    Roll up every raw document past the stored watermarks, then advance them.
+
+    Safe to re-run at any time: affected days are recomputed from scratch and
+    the watermarks only move after the rollups are written.
+
+    Returns:
+        Dict with the documents scanned per source and the rollups written
+    """
+    db = db or initialize_firebase()
+    state_ref = _rollup_state_ref(db, user_id)
+    state = state_ref.get()
+    watermarks = (state.to_dict() or {}).get('watermarks', {}) if state.exists else {}
+
+    affected_days = set()
+    new_watermarks = dict(watermarks)
+    scanned = {}
+    for source, (ref_builder, field, _) in SOURCES.items():
+        scanned[source] = 0
+        collection = ref_builder(db, user_id)
+        source_watermarks = _read_watermarks(watermarks.get(source))
+        for value_type, lowest in VALUE_TYPES.items():
+            watermark = source_watermarks.get(value_type)
+            base_query = (collection
+                          .where(filter=FieldFilter(field, '>=', lowest))
+                          .order_by(field)
+                          .order_by('__name__'))
+            # Restart at the watermark value itself: a document written later with the same value sorts
+            # anywhere among the ones already seen, which are recognised by id
+            query = base_query.start_at({field: watermark['value']}) if watermark else base_query
+            while True:
+                docs = list(query.limit(CATCH_UP_BATCH_SIZE).stream())
+                for doc in docs:
+                    value = doc.get(field)
+                    if watermark and value == watermark['value']:
+                        if doc.id in watermark['ids']:
+                            continue
+                        watermark['ids'].append(doc.id)
+                    else:
+                        watermark = {'value': value, 'ids': [doc.id]}
+                    day = _day_of(value)
+                    if day is not None:
+                        affected_days.add(day)
+                    scanned[source] += 1
+                if len(docs) < CATCH_UP_BATCH_SIZE:
+                    break
+                last = docs[-1]
+                query = base_query.start_after({field: last.get(field), '__name__': collection.document(last.id)})
+            if watermark is not None:
+                source_watermarks[value_type] = watermark
+        if source_watermarks:
+            new_watermarks[source] = source_watermarks
+
+    written = recompute_days(db, user_id, affected_days)
+    state_ref.set({'watermarks': new_watermarks, 'lastUpdated': datetime.now(timezone.utc)}, merge=True)
+    return {'user_id': user_id, 'scanned': scanned, **written}
+
+
+def _read_watermarks(stored) -> dict:
+    """
+    A source's stored watermarks as {value type: {"value", "ids"}}.
+
+    Older runs stored a single {"value", "ids"} watermark, or before that the
+    bare value; it is filed under the type of its value.
+    """
+    if stored is None:
+        return {}
+    if isinstance(stored, dict) and 'value' not in stored:
+        return {value_type: {'value': watermark['value'], 'ids': list(watermark.get('ids') or [])}
+                for value_type, watermark in stored.items() if value_type in VALUE_TYPES and watermark}
+    if isinstance(stored, dict):
+        watermark = {'value': stored['value'], 'ids': list(stored.get('ids') or [])}
+    else:
+        watermark = {'value': stored, 'ids': []}
+    return {'string' if isinstance(watermark['value'], str) else 'timestamp': watermark}
+
+
+def on_write(document_path: str, before: dict = None, after: dict = None, db=None) -> dict:
+    """
+    Write-trigger entry point for a create, update or delete of a raw document.
+
+    Args:
+        document_path: Full path of the written document, e.g.
+            "users/{id}/exercise/data/completed_workouts/{doc_id}"
+        before: Document data before the write (None on create)
+        after: Document data after the write (None on delete)
+
+    Returns:
+        Dict with the rollups written, or {"skipped": reason} for unrelated paths
+    """
+    parts = document_path.strip('/').split('/')
+    if len(parts) != 6 or parts[0] != 'users':
+        return {'skipped': 'not a user data document'}
+    user_id, collection_path = parts[1], '/'.join(parts[2:5])
+    source = next((name for name, (_, _, path) in SOURCES.items() if path == collection_path), None)
+    if source is None:
+        return {'skipped': f'no rollup for {collection_path}'}
+
+    field = SOURCES[source][1]
+    days = {_day_of(data.get(field)) for data in (before, after) if data}
+    days.discard(None)
+    return {'user_id': user_id, 'source': source, **recompute_days(db or initialize_firebase(), user_id, days)}
+
+
+async def get_user_rollups_async(user_id: str, days: int = 7, weeks: int = 4):
+    """
+    Read the precomputed daily and weekly rollups for the most recent days and weeks.
+
+    Args:
+        user_id: The ID of the user
+        days: Number of daily rollups, today included (default: 7)
+        weeks: Number of weekly rollups, the current week included (default: 4)
+
+    Returns:
+        Dict with "daily" and "weekly" lists (newest first) and the rollup "lastUpdated" time
+    """
+    try:
+        db = initialize_firebase_async()
+        state_ref = _rollup_state_ref(db, user_id)
+        today = datetime.now(timezone.utc).date()
+        day_keys = [(today - timedelta(days=i)).isoformat() for i in range(max(1, min(days, MAX_ROLLUP_DAYS)))]
+        week_keys = [(_week_of(today) - timedelta(weeks=i)).isoformat()
+                     for i in range(max(1, min(weeks, MAX_ROLLUP_WEEKS)))]
+
+        refs = ([state_ref]
+                + [state_ref.collection('daily').document(key) for key in day_keys]
+                + [state_ref.collection('weekly').document(key) for key in week_keys])
+        found = {}
+        async for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                found[snapshot.reference.path] = snapshot.to_dict()
+
+        def rollup(ref):
+            data = found.get(ref.path)
+            return {key: value for key, value in data.items() if key != 'updatedAt'} if data else None
+
+        state = found.get(state_ref.path) or {}
+        return {
+            'lastUpdated': state['lastUpdated'].isoformat() if state.get('lastUpdated') else None,
+            'daily': [r for r in (rollup(ref) for ref in refs[1:1 + len(day_keys)]) if r],
+            'weekly': [r for r in (rollup(ref) for ref in refs[1 + len(day_keys):]) if r],
+        }
+    except Exception as e:
+        raise Exception(f"Error retrieving rollups for user {user_id}: {str(e)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bring per-user rollups up to date.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--user", action="append", dest="users", help="User ID to catch up (repeatable)")
+    group.add_argument("--all", action="store_true", help="Catch up every user")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = initialize_firebase()
+    user_ids = args.users or [ref.id for ref in db.collection('users').list_documents()]
+    for user_id in user_ids:
+        try:
+            logging.info(f"Rollups caught up: {catch_up(user_id, db)}")
+        except Exception as e:
+            logging.error(f"Rollup catch-up failed for user {user_id}: {e}")
+
+
+if __name__ == "__main__":
+    main()
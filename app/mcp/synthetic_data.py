@@ -0,0 +1,129 @@
+"""
+Synthetic user data for the Firestore-backed tools.
+
+Writes N users x M days of profiles, completed workouts, sleep sessions and
+food log entries, in the same document shapes the app stores, into any
+client with the Firestore API (normally a ``fake_firestore.FakeStore``).
+Generation is seeded, so the same arguments always produce the same data.
+
+    store = FakeStore()
+    populate(store.client(), users=50, days=180)
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from exercise_catalog import current_catalog
+from mcp_utils import _food_log_ref, _profile_ref, _sleep_sessions_ref, _workouts_ref
+
+GOALS = ('weight_loss', 'muscle_gain', 'maintenance', 'endurance')
+MOODS = ('happy', 'neutral', 'tired', 'stressed')
+SLEEP_QUALITIES = ('poor', 'fair', 'good', 'great')
+MEALS = (
+    ('breakfast', 'Oatmeal with berries', (350, 12, 60, 7)),
+    ('breakfast', 'Scrambled eggs on toast', (420, 24, 30, 22)),
+    ('lunch', 'Chicken rice bowl', (650, 45, 75, 15)),
+    ('lunch', 'Tuna salad', (480, 38, 20, 26)),
+    ('dinner', 'Salmon with potatoes', (700, 42, 55, 30)),
+    ('dinner', 'Beef stir fry', (620, 40, 50, 24)),
+    ('snack', 'Greek yogurt', (150, 15, 12, 4)),
+    ('snack', 'Protein bar', (220, 20, 24, 8)),
+)
+WORKOUT_DAYS_PER_WEEK = 4
+
+
+def user_ids(users: int) -> list:
+    return [f"synthetic-user-{i:04d}" for i in range(users)]
+
+
+def _profile(rng: random.Random, index: int) -> dict:
+    return {
+        'name': f"Synthetic User {index}",
+        'age': rng.randint(18, 65),
+        'gender': rng.choice(('male', 'female')),
+        'height': rng.randint(150, 200),
+        'weight': round(rng.uniform(50, 110), 1),
+        'fitnessGoal': rng.choice(GOALS),
+        'workoutsPerWeek': WORKOUT_DAYS_PER_WEEK,
+    }
+
+
+def _workout(rng: random.Random, day: datetime, exercise_ids) -> dict:
+    start = day.replace(hour=rng.randint(6, 19), minute=rng.randint(0, 59))
+    end = start + timedelta(minutes=rng.randint(35, 90))
+    exercises = []
+    for exercise_id in rng.sample(exercise_ids, rng.randint(4, 7)):
+        sets = [{'reps': rng.randint(6, 15), 'weight': rng.choice((0, 10, 20, 40, 60, 80)),
+                 'completed': rng.random() > 0.1} for _ in range(rng.randint(3, 5))]
+        exercises.append({'exerciseId': exercise_id, 'sets': sets})
+    return {
+        'name': rng.choice(('Push', 'Pull', 'Legs', 'Full body', 'Upper', 'Lower')),
+        # Stored as naive ISO strings, like the mobile app writes them
+        'startTime': start.replace(tzinfo=None).isoformat(),
+        'endTime': end.replace(tzinfo=None).isoformat(),
+        'exercises': exercises,
+    }
+
+
+def _sleep_session(rng: random.Random, day: datetime) -> dict:
+    return {
+        'createdAt': day.replace(hour=7, minute=rng.randint(0, 59)),
+        'totalDuration': int(rng.uniform(5, 9.5) * 3600000),
+        'sleepQuality': rng.choice(SLEEP_QUALITIES),
+        'mood': rng.choice(MOODS),
+    }
+
+
+def _food_entry(rng: random.Random, day: datetime) -> dict:
+    meal_type, name, (calories, protein, carbohydrates, fat) = rng.choice(MEALS)
+    scale = rng.uniform(0.8, 1.3)
+    return {
+        'createdAt': day.replace(hour=rng.randint(7, 21), minute=rng.randint(0, 59)),
+        'foodName': name,
+        'mealType': meal_type,
+        'servingSize': f"{round(scale, 1)} serving",
+        'nutritionInfo': {
+            'calories': round(calories * scale), 'protein': round(protein * scale, 1),
+            'carbohydrates': round(carbohydrates * scale, 1), 'fat': round(fat * scale, 1),
+            'fiber': round(rng.uniform(1, 8), 1), 'sugar': round(rng.uniform(2, 20), 1),
+        },
+    }
+
+
+def populate(db, users: int = 10, days: int = 90, seed: int = 0, end: datetime = None) -> dict:
+    """
+    Write synthetic history for ``users`` users covering the ``days`` days up to ``end``.
+
+    Args:
+        db: Sync Firestore-compatible client
+        users: Number of users
+        days: Days of history per user, ``end`` included
+        seed: Random seed
+        end: Last day of history (default: now, UTC)
+
+    Returns:
+        Dict with the user IDs and the number of documents written per collection
+    """
+    rng = random.Random(seed)
+    end = (end or datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+    exercise_ids = list(current_catalog().store.ids)
+    counts = {'profiles': 0, 'workouts': 0, 'sleep_sessions': 0, 'food_log_entries': 0}
+
+    ids = user_ids(users)
+    for index, user_id in enumerate(ids):
+        _profile_ref(db, user_id).set(_profile(rng, index))
+        counts['profiles'] += 1
+        workouts, sleep, food = _workouts_ref(db, user_id), _sleep_sessions_ref(db, user_id), _food_log_ref(db, user_id)
+        for offset in range(days):
+            day = end - timedelta(days=offset)
+            date_key = day.date().isoformat()
+            if rng.random() < WORKOUT_DAYS_PER_WEEK / 7:
+                workouts.document(f"workout-{date_key}").set(_workout(rng, day, exercise_ids))
+                counts['workouts'] += 1
+            if rng.random() < 0.9:
+                sleep.document(f"sleep-{date_key}").set(_sleep_session(rng, day))
+                counts['sleep_sessions'] += 1
+            for meal in range(rng.randint(3, 5)):
+                food.document(f"food-{date_key}-{meal}").set(_food_entry(rng, day))
+                counts['food_log_entries'] += 1
+    return {'user_ids': ids, 'documents': counts}
@@ -0,0 +1,3 @@
+# app/middleware/__init__.py
+
+# This file can be left empty or used to initialize package-level variables or imports
@@ -0,0 +1,385 @@
+# app/middleware/admission.py
+
+"""
+Admission control for the Gemini-backed endpoints.
+
+Requests are grouped into endpoint classes. Each class has:
+
+- a cap on requests in flight, with a bounded FIFO wait queue behind it
+- a token bucket per caller (API key, user ID or client address)
+
+A request that cannot get a token, finds the queue full, or waits longer
+than the queue timeout gets an immediate 429 with ``Retry-After`` instead
+of adding to the latency of everyone already admitted. Paths outside every
+class are passed through untouched.
+
+Limits are read from the environment, per class, e.g.
+``ADMISSION_GENERATION_MAX_IN_FLIGHT``, ``ADMISSION_GENERATION_MAX_QUEUE``,
+``ADMISSION_GENERATION_QUEUE_TIMEOUT``, ``ADMISSION_GENERATION_RATE``
+(tokens per second, 0 disables) and ``ADMISSION_GENERATION_BURST``.
+``ADMISSION_CONTROL_ENABLED=false`` turns the middleware off.
+
+The client address is the connection's peer, unless that peer is one of
+``ADMISSION_TRUSTED_PROXIES`` (comma-separated addresses or CIDR ranges,
+e.g. the load balancer's subnet): then it is the right-most untrusted
+address in ``X-Forwarded-For``. API keys and user IDs are not
+authenticated here, so one address may only claim
+``ADMISSION_MAX_IDENTITIES_PER_ADDRESS`` of them within
+``ADMISSION_IDENTITY_WINDOW`` seconds; further ones share the address's
+own bucket, and rotating header values does not buy fresh tokens.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+
+from starlette.responses import JSONResponse
+
+# class -> (path prefixes, default max in flight, max queue, queue timeout s, rate/s, burst)
+ENDPOINT_CLASSES = {
+    "generation": (
+        ("/nutrition-plans/generate", "/workout-plans/generate", "/meals/analyze", "/agent/generate",
+         "/jobs/nutrition-plans", "/jobs/agent"),
+        8, 16, 10.0, 0.2, 5,
+    ),
+    "lookup": (
+        ("/recommendations/", "/coach/"),
+        32, 64, 5.0, 2.0, 20,
+    ),
+}
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+MAX_TRACKED_CALLERS = 10000
+WAIT_SAMPLES = 1000
+
+
+def _parse_networks(value: str):
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip())
+
+
+TRUSTED_PROXIES = _parse_networks(os.getenv("ADMISSION_TRUSTED_PROXIES", ""))
+MAX_IDENTITIES_PER_ADDRESS = int(os.getenv("ADMISSION_MAX_IDENTITIES_PER_ADDRESS", "20"))
+IDENTITY_WINDOW_SECONDS = float(os.getenv("ADMISSION_IDENTITY_WINDOW", "600"))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """In-flight cap with a bounded FIFO queue for one endpoint class."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        # Smoothed service time, used to estimate Retry-After
+        self._service_seconds = 1.0
+
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+        self.max_queue_depth = 0
+        self._wait_samples = deque(maxlen=WAIT_SAMPLES)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """Rough time until a queued request would be admitted."""
+        backlog = self.queue_depth + 1
+        return max(1.0, backlog * self._service_seconds / max(self.max_in_flight, 1))
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self._wait_samples.append(0.0)
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the timeout fired; give it back
+                self.release()
+            else:
+                waiter.cancel()
+            self.rejected["queue_timeout"] += 1
+            raise AdmissionRejected("queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self._wait_samples.append(waited)
+        return waited
+
+    def release(self, service_seconds: float = None):
+        if service_seconds is not None:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+        # Hand the slot straight to the oldest live waiter so it cannot be overtaken
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        waits = sorted(self._wait_samples)
+
+        def percentile(pct):
+            return round(waits[min(len(waits) - 1, int(pct / 100 * len(waits)))], 4) if waits else None
+
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_queue_depth_seen": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_seconds_p50": percentile(50),
+            "wait_seconds_p95": percentile(95),
+            "wait_seconds_max": round(waits[-1], 4) if waits else None,
+        }
+
+
+class TokenBuckets:
+    """Per-caller token buckets; the least recently seen callers are forgotten first."""
+
+    def __init__(self, rate: float, burst: int, max_callers: int = MAX_TRACKED_CALLERS):
+        self.rate = rate
+        self.burst = burst
+        self.max_callers = max_callers
+        self._buckets = OrderedDict()  # caller -> (tokens, last refill)
+        self.rejected = 0
+
+    def take(self, caller: str):
+        """
+        Take one token for ``caller``.
+
+        Raises:
+            AdmissionRejected: If the caller's bucket is empty
+        """
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(caller, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[caller] = (tokens, now)
+            self.rejected += 1
+            raise AdmissionRejected("rate_limited", (1 - tokens) / self.rate)
+        self._buckets[caller] = (tokens - 1, now)
+        while len(self._buckets) > self.max_callers:
+            self._buckets.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "callers": len(self._buckets), "rejected": self.rejected}
+
+
+class CallerIdentities:
+    """
+    Bounds the unauthenticated identities (API keys, user IDs) one client address may claim.
+
+    Identities not seen for ``window`` seconds are forgotten, so the bound only
+    limits how many an address uses at once, not over its lifetime.
+    """
+
+    def __init__(self, max_per_address: int = None, window: float = None, max_addresses: int = MAX_TRACKED_CALLERS):
+        self.max_per_address = MAX_IDENTITIES_PER_ADDRESS if max_per_address is None else max_per_address
+        self.window = IDENTITY_WINDOW_SECONDS if window is None else window
+        self.max_addresses = max_addresses
+        self._claimed = OrderedDict()  # address -> {identity: last seen}
+        self.overflowed = 0
+
+    def resolve(self, address: str, claimed: str = None, now: float = None) -> str:
+        """Return the bucket key for a request: the claimed identity while within the bound, else the address."""
+        if claimed is None or self.max_per_address <= 0:
+            return "ip:" + address
+        now = time.monotonic() if now is None else now
+        identities = self._claimed.pop(address, {})
+        self._claimed[address] = identities
+        while len(self._claimed) > self.max_addresses:
+            self._claimed.popitem(last=False)
+        for identity in [identity for identity, seen in identities.items() if now - seen > self.window]:
+            del identities[identity]
+        if claimed not in identities and len(identities) >= self.max_per_address:
+            self.overflowed += 1
+            return "ip:" + address
+        identities[claimed] = now
+        return claimed
+
+    def stats(self) -> dict:
+        return {"addresses": len(self._claimed), "overflowed": self.overflowed}
+
+
+def _env_number(name: str, default, cast):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+
+class AdmissionController:
+    """Limiters and token buckets for every endpoint class."""
+
+    def __init__(self, classes: dict = None):
+        classes = classes or ENDPOINT_CLASSES
+        self.prefixes = []
+        self.limiters = {}
+        self.buckets = {}
+        for name, (prefixes, max_in_flight, max_queue, queue_timeout, rate, burst) in classes.items():
+            env = f"ADMISSION_{name.upper()}_"
+            self.limiters[name] = ConcurrencyLimiter(
+                _env_number(env + "MAX_IN_FLIGHT", max_in_flight, int),
+                _env_number(env + "MAX_QUEUE", max_queue, int),
+                _env_number(env + "QUEUE_TIMEOUT", queue_timeout, float),
+            )
+            self.buckets[name] = TokenBuckets(_env_number(env + "RATE", rate, float),
+                                              _env_number(env + "BURST", burst, int))
+            self.prefixes.extend((prefix, name) for prefix in prefixes)
+        self.identities = CallerIdentities()
+
+    def classify(self, path: str):
+        for prefix, name in self.prefixes:
+            if path.startswith(prefix):
+                return name
+        return None
+
+    def caller(self, scope) -> str:
+        """Rate-limit bucket key for a request."""
+        return self.identities.resolve(client_address(scope), claimed_identity(scope))
+
+    def stats(self) -> dict:
+        return {
+            name: {"concurrency": self.limiters[name].stats(), "rate_limit": self.buckets[name].stats()}
+            for name in self.limiters
+        }
+
+
+def _headers(scope) -> dict:
+    headers = {}
+    for key, value in scope.get("headers", []):
+        name = key.decode("latin-1").lower()
+        value = value.decode("latin-1")
+        # Repeated headers (e.g. X-Forwarded-For from several hops) are joined, as HTTP allows
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    return headers
+
+
+def _is_trusted(address: str, trusted_proxies) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_address(scope, trusted_proxies=None) -> str:
+    """
+    Address of the client that sent the request.
+
+    Behind trusted proxies this is the right-most ``X-Forwarded-For`` entry that
+    is not itself a trusted proxy; entries further left were supplied by the
+    client and cannot be relied on.
+    """
+    trusted_proxies = TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not _is_trusted(address, trusted_proxies):
+        return address
+    forwarded = [hop.strip() for hop in _headers(scope).get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    return forwarded[0] if forwarded else address
+
+
+def claimed_identity(scope):
+    """API key, then user ID (header or query), as sent by the client; None if there is neither."""
+    headers = _headers(scope)
+    if headers.get("x-api-key"):
+        return "key:" + headers["x-api-key"]
+    if headers.get("x-user-id"):
+        return "user:" + headers["x-user-id"]
+    for pair in scope.get("query_string", b"").decode("latin-1").split("&"):
+        name, _, value = pair.partition("=")
+        if name == "user_id" and value:
+            return "user:" + value
+    return None
+
+
+def caller_identity(scope) -> str:
+    """API key, then user ID (header or query), then client address."""
+    return claimed_identity(scope) or "ip:" + client_address(scope)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware, so streaming responses keep their slot until they finish."""
+
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        endpoint_class = self.controller.classify(scope["path"])
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.limiters[endpoint_class]
+        try:
+            self.controller.buckets[endpoint_class].take(self.controller.caller(scope))
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            logging.warning(f"Admission rejected ({endpoint_class}, {e.reason}) for {scope['path']}")
+            response = JSONResponse(
+                {"detail": f"Too many requests ({e.reason}), retry later"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
+
+
+admission_controller = AdmissionController()
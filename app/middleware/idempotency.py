@@ -0,0 +1,267 @@
+# app/middleware/idempotency.py
+
+"""
+``Idempotency-Key`` handling for the generate/analyze endpoints.
+
+A request carrying an ``Idempotency-Key`` header is identified by the
+caller, the path and the key. While the first request with that identity
+is running, retries wait for it and receive the same response; once it
+has finished, its response is replayed from a bounded TTL store. Replayed
+responses carry ``Idempotent-Replayed: true``.
+
+Reusing a key with a different request body is rejected with 422. For
+``multipart/form-data`` the body is compared by its parts (field names,
+filenames, content types and contents), since clients pick a new random
+boundary for every request, retries included. 5xx and
+429 responses are handed to requests already waiting on them but are not
+stored, so a later retry runs the request again.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.responses import JSONResponse
+
+from app.middleware.admission import caller_identity
+from app.services.metrics import record_cache
+
+IDEMPOTENT_PATHS = ("/nutrition-plans/generate", "/workout-plans/generate", "/meals/analyze", "/agent/generate")
+MAX_KEY_LENGTH = 255
+MAX_STORED_RESPONSE_BYTES = 1024 * 1024
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_DISPOSITION_PARAM = re.compile(rb'\b(name|filename)="([^"]*)"', re.IGNORECASE)
+
+
+class StoredResponse:
+    __slots__ = ("status", "headers", "body", "fingerprint", "expires_at")
+
+    def __init__(self, status: int, headers: list, body: bytes, fingerprint: str, expires_at: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(name) + len(value) for name, value in self.headers)
+
+
+class IdempotencyStore:
+    """
+    Requests in flight, and finished responses by key bounded by TTL,
+    entry count and total bytes (LRU).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+        self.in_flight = {}  # key -> (fingerprint, future of (status, headers, body) or None)
+        self.counters = {"executed": 0, "replayed": 0, "attached": 0, "mismatched": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, status: int, headers: list, body: bytes, fingerprint: str):
+        entry = StoredResponse(status, headers, body, fingerprint, time.monotonic() + self.ttl_seconds)
+        if entry.size > min(self.max_bytes, MAX_STORED_RESPONSE_BYTES):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key).size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "in_flight": len(self.in_flight), "entries": len(self._entries),
+                    "bytes": self.bytes, "max_entries": self.max_entries, "max_bytes": self.max_bytes,
+                    "ttl_seconds": self.ttl_seconds, "evictions": self.evictions}
+
+
+def _header(scope, name: bytes):
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _multipart_parts(body: bytes, boundary: bytes):
+    """The (name, filename, content type, content) of each part, or None if the body is not well formed."""
+    delimiter = b"--" + boundary
+    sections = body.split(delimiter)
+    if len(sections) < 3 or not sections[-1].startswith(b"--"):
+        return None
+    parts = []
+    for section in sections[1:-1]:
+        if not section.startswith(b"\r\n") or not section.endswith(b"\r\n"):
+            return None
+        head, separator, content = section[2:-2].partition(b"\r\n\r\n")
+        if not separator:
+            return None
+        disposition, content_type = b"", b""
+        for line in head.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-disposition":
+                disposition = value
+            elif name.strip().lower() == b"content-type":
+                content_type = value.strip().lower()
+        params = {key.lower(): value for key, value in _DISPOSITION_PARAM.findall(disposition)}
+        parts.append((params.get(b"name", b""), params.get(b"filename"), content_type, content))
+    return parts
+
+
+def _fingerprint(scope, body: bytes) -> str:
+    """Hash of what identifies the request's payload: query string and body."""
+    digest = hashlib.sha256(scope.get("query_string", b"") + b"\0")
+    content_type = _header(scope, b"content-type") or ""
+    boundary = _BOUNDARY.search(content_type) if content_type.lower().startswith("multipart/form-data") else None
+    parts = _multipart_parts(body, boundary.group(1).encode("latin-1")) if boundary else None
+    if parts is None:
+        digest.update(body)
+        return digest.hexdigest()
+    digest.update(b"multipart\0")
+    for part in parts:
+        for value in part:
+            # Length-prefixed, so values can't run into each other
+            value = b"\xff" if value is None else value
+            digest.update(len(value).to_bytes(8, "big") + value)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, store: IdempotencyStore = None, paths=IDEMPOTENT_PATHS):
+        self.app = app
+        self.store = store or idempotency_store
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, b"idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"},
+                               status_code=400)(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = _fingerprint(scope, body)
+        key = (caller_identity(scope), scope["path"], idempotency_key)
+
+        stored = self.store.get(key)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                await self._mismatch(scope, receive, send)
+                return
+            self.store.counters["replayed"] += 1
+            record_cache("idempotency", True)
+            await self._replay(send, stored.status, stored.headers, stored.body)
+            return
+
+        in_flight = self.store.in_flight.get(key)
+        if in_flight is not None:
+            if in_flight[0] != fingerprint:
+                await self._mismatch(scope, receive, send)
+                return
+            self.store.counters["attached"] += 1
+            record_cache("idempotency", True)
+            outcome = await asyncio.shield(in_flight[1])
+            if outcome is None:
+                await JSONResponse({"detail": "The original request with this Idempotency-Key did not complete"},
+                                   status_code=409)(scope, receive, send)
+                return
+            await self._replay(send, *outcome)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.store.in_flight[key] = (fingerprint, future)
+        self.store.counters["executed"] += 1
+        record_cache("idempotency", False)
+        recorded = {"status": None, "headers": [], "body": bytearray(), "complete": False}
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                recorded["status"] = message["status"]
+                recorded["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                recorded["body"] += message.get("body", b"")
+                if not message.get("more_body", False):
+                    recorded["complete"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, recording_send)
+        finally:
+            del self.store.in_flight[key]
+            outcome = None
+            if recorded["complete"]:
+                outcome = (recorded["status"], recorded["headers"], bytes(recorded["body"]))
+                if recorded["status"] < 500 and recorded["status"] != 429:
+                    self.store.put(key, *outcome, fingerprint)
+            future.set_result(outcome)
+
+    async def _mismatch(self, scope, receive, send):
+        self.store.counters["mismatched"] += 1
+        await JSONResponse({"detail": "Idempotency-Key was already used with a different request"},
+                           status_code=422)(scope, receive, send)
+
+    @staticmethod
+    async def _replay(send, status: int, headers: list, body: bytes):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": headers + [(b"idempotent-replayed", b"true")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("IDEMPOTENCY_MAX_BYTES", str(64 * 1024 * 1024))),
+)
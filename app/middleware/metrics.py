@@ -0,0 +1,70 @@
+# app/middleware/metrics.py
+
+"""
+Request metrics and the ``Server-Timing`` header.
+
+Latency is labelled by route template (``/jobs/{job_id}``), never by the
+raw path, so ids do not multiply the number of time series; requests that
+match no route share the ``unmatched`` label. The route is only known once
+routing has happened, so in-flight requests are counted per admission
+endpoint class (``generation``, ``lookup`` or ``other``) instead.
+"""
+
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from app.middleware.admission import admission_controller
+from app.services.metrics import (
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    reset_stage_timings,
+    server_timing,
+    start_stage_timings,
+)
+
+
+def route_template(scope) -> str:
+    """The matched route's path with each path parameter put back as ``{name}``."""
+    if "endpoint" not in scope:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    for name, value in scope.get("path_params", {}).items():
+        value = str(value)
+        for index in range(len(segments) - 1, -1, -1):
+            if segments[index] == value:
+                segments[index] = "{" + name + "}"
+                break
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, admission_controller.classify(scope["path"]) or "other")
+        timings, token = start_stage_timings()
+        started = time.perf_counter()
+        status = 500
+        in_flight.inc()
+
+        async def timing_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timing_send)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(method, route_template(scope), str(status)).observe(time.perf_counter() - started)
+            reset_stage_timings(token)
@@ -0,0 +1,87 @@
+# app/middleware/profiling.py
+
+"""
+Opt-in profiling of a single request.
+
+Send ``X-Profile-Token: <PROFILING_TOKEN>`` (or ``?profile=<PROFILING_TOKEN>``)
+and the request runs under a profiler; the response carries ``X-Profile-Id``
+and ``X-Profile-URL`` pointing at the stored report. A wrong token gets 403.
+Only one request is profiled at a time; others sent meanwhile run normally
+with ``X-Profile: busy``. Without ``PROFILING_TOKEN`` the middleware passes
+every request straight through.
+"""
+
+import hmac
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+
+from app.services.metrics import current_stage_timings
+from app.services.profiling import PROFILING_TOKEN, ProfiledRequest, profile_store
+
+
+def supplied_token(scope):
+    for key, value in scope.get("headers", []):
+        if key == b"x-profile-token":
+            return value.decode("latin-1")
+    query_string = scope.get("query_string", b"")
+    if b"profile=" in query_string:
+        values = parse_qs(query_string.decode("latin-1")).get("profile")
+        if values:
+            return values[0]
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, token: str = None, store=None, profiler: str = None):
+        self.app = app
+        self.token = PROFILING_TOKEN if token is None else token
+        self.store = store or profile_store
+        self.profiler = profiler
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if not self.token or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = supplied_token(scope)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            await JSONResponse({"detail": "Invalid profiling token"}, status_code=403)(scope, receive, send)
+            return
+        if self._active:
+            await self.app(scope, receive, self._with_headers(send, {"X-Profile": "busy"}))
+            return
+
+        self._active = True
+        profiled = ProfiledRequest(scope["method"], scope["path"], profiler=self.profiler)
+        status = 500
+        headers = {"X-Profile-Id": profiled.id, "X-Profile-URL": f"/ops/profiles/{profiled.id}"}
+
+        async def recording_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profiled.start()
+        try:
+            await self.app(scope, receive, self._with_headers(recording_send, headers))
+        finally:
+            try:
+                self.store.put(profiled.stop(status, dict(current_stage_timings() or {})))
+            finally:
+                self._active = False
+
+    @staticmethod
+    def _with_headers(send, extra: dict):
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in extra.items():
+                    headers[name] = value
+            await send(message)
+        return send_with_headers
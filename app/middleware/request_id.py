@@ -0,0 +1,47 @@
+# app/middleware/request_id.py
+
+"""
+Request ids for logs and clients.
+
+A well-formed ``X-Request-ID`` from the caller (or a load balancer) is kept,
+otherwise a new id is generated. It is set in ``request_id_var`` for every
+log record written while serving the request, and echoed back in the
+response's ``X-Request-ID`` header.
+"""
+
+import re
+
+from starlette.datastructures import MutableHeaders
+
+from app.logging_config import new_request_id, request_id_var
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers", []):
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = new_request_id()
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,47 +1,114 @@
-import os
-from google import genai
 import logging
-from PIL import Image
+import threading
 from io import BytesIO
-from dotenv import load_dotenv
-import requests
 import json
 import base64
 from typing import Dict, Optional, List
 from datetime import datetime
-from google.genai import types
-# Initialize the Gemini API key and the model
-load_dotenv()  # Try current directory first
-if not os.getenv("GEMINI_API_KEY"):
-    # Try relative path if current directory doesn't work
-    load_dotenv('../.env')
-if not os.getenv("GEMINI_API_KEY"):
-    # Try absolute path as last resort
-    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-    load_dotenv(env_path)
-
-GEMINI_KEY = os.environ.get("GEMINI_API_KEY")
-SERP_API_KEY = os.environ.get("SERP_API_KEY")
-
-# Initialize the newer genai client
-client = genai.Client(api_key=GEMINI_KEY)
+
+from app import config as settings
+from app.logging_config import log_payload, truncate
+from app.services.cassettes import active_cassette
+from app.services.metrics import upstream
+
+# google.genai takes most of a second to import, so the client and the
+# generation config are built on first use rather than at import time
 model_name = "gemini-2.5-flash"
+SYSTEM_INSTRUCTION = """You're an AI assistant that uses scientific research to provide recommendations and plans for users that focus solely on sustainable living and wellbeing. Always look for things in a sustainable point of when generating and evaluating. Use the search tool when possible and make sure your results are correct. Make sure to return the data in the expected format"""
+
+_client = None
+_config = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide genai client, creating it on first use."""
+    global _client, _config
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                from google.genai import types
+
+                # Configure generation settings
+                _config = types.GenerateContentConfig(
+                    tools=[types.Tool(google_search=types.GoogleSearch())],
+                    system_instruction=SYSTEM_INSTRUCTION,
+                )
+                http_options = types.HttpOptions(base_url=settings.GEMINI_BASE_URL) if settings.GEMINI_BASE_URL else None
+                _client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
+    return _client
+
+
+def get_generation_config():
+    """Return the shared ``GenerateContentConfig`` (grounded search plus system instruction)."""
+    get_client()
+    return _config
+
+
+def _call_gemini(contents):
+    return get_client().models.generate_content(
+        model=model_name,
+        contents=contents,
+        config=get_generation_config()
+    )
+
+
+def _encode_response(response) -> dict:
+    return response.model_dump(mode="json", exclude_none=True, exclude={"sdk_http_response"})
+
 
-grounding_tool = types.Tool(
-    google_search=types.GoogleSearch()
-)
+def _decode_response(data: dict):
+    from google.genai import types
 
-# Configure generation settings
-config = types.GenerateContentConfig(
-    tools=[grounding_tool],
-    system_instruction="""You're an AI assistant that uses scientific research to provide recommendations and plans for users that focus solely on sustainable living and wellbeing. Always look for things in a sustainable point of when generating and evaluating. Use the search tool when possible and make sure your results are correct. Make sure to return the data in the expected format"""
-)
+    return types.GenerateContentResponse.model_validate(data)
+
+
+def _summarize_contents(contents) -> list:
+    """Prompt text (truncated) and the size of any inline data, for reading a cassette."""
+    parts = []
+    for content in contents:
+        for part in content.get("parts", []):
+            if "text" in part:
+                parts.append({"text": truncate(part["text"], 1024)})
+            elif "inline_data" in part:
+                parts.append({"inline_data": {"mime_type": part["inline_data"]["mime_type"],
+                                              "base64_length": len(part["inline_data"]["data"])}})
+    return parts
+
+
+def generate_content(operation: str, contents):
+    """
+    Call the Gemini model with the shared config, timed as the request's ``llm`` stage.
+
+    When a cassette is active the call is recorded, or answered from the
+    recording without contacting Gemini.
+    """
+    with upstream("gemini", operation, stage_name="llm"):
+        cassette = active_cassette()
+        if cassette is None:
+            return _call_gemini(contents)
+        return cassette.call(
+            "gemini", operation,
+            {"model": model_name, "system_instruction": SYSTEM_INSTRUCTION, "contents": contents},
+            lambda: _call_gemini(contents), _encode_response, _decode_response,
+            summary={"model": model_name, "parts": _summarize_contents(contents)},
+        )
 
 
 class GeminiModel:
 
     @staticmethod
-    def analyze_meal(image_data):
+    def encode_image(image_data) -> str:
+        """Check that ``image_data`` is an image PIL can open and return it base64-encoded for the request."""
+        from PIL import Image
+
+        # Convert image data (which could be bytes) into an Image object
+        Image.open(BytesIO(image_data))
+        return base64.b64encode(image_data).decode('utf-8')
+
+    @staticmethod
+    def analyze_meal(image_data, image_b64: Optional[str] = None):
         prompt = (
             "Analyze the following meal image and identify the main dish/meal. "
             "Use your knowledge of nutrition to provide detailed nutritional analysis including:\n"
@@ -76,30 +143,27 @@ class GeminiModel:
         )
 
         try:
-            # Convert image data (which could be bytes) into an Image object
-            image = Image.open(BytesIO(image_data))
+            # Callers serving requests encode the image in the image bulkhead beforehand
+            if image_b64 is None:
+                image_b64 = GeminiModel.encode_image(image_data)
 
             # Call the Gemini model with both the prompt and the image using the newer genai client
-            image_b64 = base64.b64encode(image_data).decode('utf-8')
-            
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[
+            response = generate_content(
+                "analyze_meal",
+                [
                     {
                         "parts": [
                             {"text": prompt},
                             {"inline_data": {"mime_type": "image/jpeg", "data": image_b64}}
                         ]
                     }
-                ],
-                config=config
+                ]
             )
 
-            # Log the response for debugging purposes
-            logging.info(f"Gemini API Full Response (Analyze Meal): {response}")
+            # Log the response for debugging purposes (sampled requests only)
+            log_payload("Gemini API Full Response (Analyze Meal)", response)
 
             gemini_result = response.text
-            logging.info(f"Output Text (Analyze Meal): {gemini_result}")
 
             # Try to parse the result
             try:
@@ -153,16 +217,12 @@ class GeminiModel:
             "  \"cooldown\": {\"description\": \"<description>\", \"duration\": <duration in minutes>}\n"
             "}\n"
         )
-        logging.info(f"Generated prompt: {prompt}")
+        log_payload("Generated prompt (Workout Plan)", prompt)
         try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[{"parts": [{"text": prompt}]}],
-                config=config
-            )
+            response = generate_content("generate_workout_plan", [{"parts": [{"text": prompt}]}])
             
-            # Log the response for debugging purposes
-            logging.info(f"Full Gemini API Response: {response}")
+            # Log the response for debugging purposes (sampled requests only)
+            log_payload("Full Gemini API Response (Workout Plan)", response)
 
             output_text = response.text
             # Check if the response is empty or None
@@ -170,7 +230,6 @@ class GeminiModel:
                 logging.error("Empty response from Gemini API")
                 return None
 
-            logging.info(f"Gemini output text: {output_text}")
             return output_text
 
         except Exception as e:
@@ -253,13 +312,9 @@ class GeminiModel:
         )
 
         try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[{"parts": [{"text": prompt}]}],
-                config=config
-            )
+            response = generate_content("generate_nutrition_plan", [{"parts": [{"text": prompt}]}])
             
-            logging.info(f"Full Gemini API Response: {response}")
+            log_payload("Full Gemini API Response (Nutrition Plan)", response)
             return response.text
 
         except Exception as e:
@@ -300,20 +355,16 @@ class GeminiModel:
         )
 
         try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[{"parts": [{"text": prompt}]}],
-                config=config
-            )
+            response = generate_content("recommend_brands", [{"parts": [{"text": prompt}]}])
             
-            logging.info(f"Brand recommendation response: {response}")
+            log_payload("Brand recommendation response", response)
             
             # Try to parse and return the response
             try:
                 parsed_result = json.loads(response.text)
                 return json.dumps(parsed_result)
             except json.JSONDecodeError:
-                logging.warning("Failed to parse brand recommendation response as JSON")
+                logging.warning("Failed to parse brand recommendation response as JSON, returning raw text")
                 return response.text
 
         except Exception as e:
@@ -0,0 +1,25 @@
+# app/routers/coach.py
+
+from fastapi import APIRouter
+from app.schemas.coach import RosterRequest, RosterOverview
+from app.services.coach_service import get_roster_overview
+
+router = APIRouter()
+
+
+@router.post(
+    "/roster",
+    response_model=RosterOverview,
+    summary="Roster Overview",
+    description="Profiles and recent workouts for several athletes in one batched fetch.",
+)
+async def roster_overview(request: RosterRequest):
+    """
+    Get the profiles and most recent workouts of a coach's athletes.
+
+    - **user_ids**: IDs of the athletes (at most 200)
+    - **workouts_limit**: Recent workouts per athlete (1-50, default 5)
+
+    Users that could not be read are listed under `errors` instead of failing the request.
+    """
+    return await get_roster_overview(request)
@@ -0,0 +1,26 @@
+# app/routers/health.py
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.warmup import readiness
+
+router = APIRouter()
+
+
+@router.get(
+    "/healthz",
+    summary="Liveness",
+    description="200 whenever the process is serving requests, warm or not.",
+)
+async def healthz():
+    return {"status": "ok"}
+
+
+@router.get(
+    "/readyz",
+    summary="Readiness",
+    description="200 once every required component is warm, 503 before that. Reports each component's state and warmup time.",
+)
+async def readyz():
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
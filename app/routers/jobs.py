@@ -0,0 +1,77 @@
+# app/routers/jobs.py
+
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Response
+from app.schemas.job import Job, JobAccepted
+from app.schemas.nutrition import ProfileData
+from app.services.job_service import get_job_manager
+
+router = APIRouter()
+
+TIMESTAMP_FIELDS = ("created_at", "started_at", "finished_at", "expires_at")
+
+
+def _to_schema(job: dict) -> Job:
+    job = dict(job)
+    for field in TIMESTAMP_FIELDS:
+        if job.get(field) is not None:
+            job[field] = datetime.fromtimestamp(job[field], tz=timezone.utc)
+    return Job(**job)
+
+
+def _accepted(job: dict, response: Response) -> JobAccepted:
+    status_url = f"/jobs/{job['id']}"
+    response.headers["Location"] = status_url
+    return JobAccepted(id=job["id"], status=job["status"], status_url=status_url)
+
+
+@router.post(
+    "/nutrition-plans",
+    response_model=JobAccepted,
+    status_code=202,
+    summary="Submit Nutrition Plan Job",
+    description="Queue a nutrition plan generation and poll the returned job for the result.",
+)
+async def submit_nutrition_plan_job(profile_data: ProfileData, response: Response):
+    """
+    Queue the same generation as `POST /nutrition-plans/generate`.
+
+    The job's `result` holds the `NutritionPlan` once its status is `succeeded`.
+    """
+    return _accepted(await get_job_manager().submit("nutrition_plan", profile_data.model_dump()), response)
+
+
+@router.post(
+    "/agent",
+    response_model=JobAccepted,
+    status_code=202,
+    summary="Submit Agent Job",
+    description="Queue an agent request and poll the returned job for the result.",
+)
+async def submit_agent_job(user_message: str, response: Response, user_id: str = None):
+    """
+    Queue the same request as `POST /agent/generate`.
+
+    The job's `result` holds the `AgentResponse` once its status is `succeeded`.
+    """
+    job = await get_job_manager().submit("agent", {"user_message": user_message, "user_id": user_id})
+    return _accepted(job, response)
+
+
+@router.get("/{job_id}", response_model=Job, summary="Get Job")
+async def get_job(job_id: str):
+    """
+    Status of a job, with its `result` or `error` once finished.
+
+    Finished jobs are kept for `JOB_RESULT_TTL_SECONDS` (default one hour).
+    """
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _to_schema(job)
+
+
+@router.post("/{job_id}/cancel", response_model=Job, summary="Cancel Job")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; finished jobs return 409."""
+    return _to_schema(await get_job_manager().cancel(job_id))
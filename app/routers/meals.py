@@ -1,4 +1,6 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
+from app.models.gemini_model import GeminiModel
+from app.services.bulkheads import run_in_bulkhead
 from app.services.meal_service import analyze_meal
 from app.schemas.meal import Meal
 
@@ -19,7 +21,9 @@ async def analyze_meal_endpoint(file: UploadFile = File(...)):
     """
     image_data = await file.read()
     try:
-        result = analyze_meal(image_data)
-        return result
+        image_b64 = await run_in_bulkhead("image", GeminiModel.encode_image, image_data)
+        return await run_in_bulkhead("gemini", analyze_meal, image_data, image_b64)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,16 @@
+# app/routers/metrics.py
+
+from fastapi import APIRouter, Response
+from app.services.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus Metrics",
+    description="Request, stage and upstream latency histograms, in-flight requests, cache lookups and JSON parse failures.",
+)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
@@ -1,17 +1,65 @@
 # app/routers/nutrition.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from typing import Optional
 from app.schemas.nutrition import ProfileData, NutritionPlan
+from app.services.bulkheads import run_in_bulkhead
 from app.services.nutrition_service import generate_nutrition_plan
+from app.services.plan_projection import build_include, project
+from app.services.plan_store import remember_plan, stored_plan_response
 
 router = APIRouter()
 
 
+FIELDS_DESCRIPTION = (
+    "Comma-separated dotted paths to return (e.g. `daily_meal_plans.breakfast.description`), "
+    "or `summary` for each day's meal descriptions and calories"
+)
+DAYS_DESCRIPTION = "Day numbers to return, e.g. `3` or `1-7`"
+
+
 @router.post("/generate", response_model=NutritionPlan)
-def get_nutrition_plan(profile_data: ProfileData):
+async def get_nutrition_plan(
+    profile_data: ProfileData,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    days: Optional[str] = Query(None, description=DAYS_DESCRIPTION),
+):
+    # Reject bad projections before paying for a generation
+    build_include(fields, days)
     try:
-        return generate_nutrition_plan(profile_data)
+        plan = await run_in_bulkhead("gemini", generate_nutrition_plan, profile_data)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    await run_in_bulkhead("storage", remember_plan, "nutrition", plan, response)
+    include = build_include(fields, days, len(plan.daily_meal_plans))
+    if include is None:
+        return plan
+    # The ETag set by remember_plan describes the full plan, so only Location carries over
+    location = {"Location": response.headers["Location"]} if "Location" in response.headers else None
+    return Response(content=plan.model_dump_json(include=include), media_type="application/json", headers=location)
+
+
+@router.get("/{plan_id}", response_model=NutritionPlan)
+async def get_stored_nutrition_plan(
+    plan_id: str,
+    if_none_match: str = Header(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    days: Optional[str] = Query(None, description=DAYS_DESCRIPTION),
+):
+    """
+    Return a previously generated nutrition plan by id without generating it again.
+
+    Plans never change, so a request with a matching `If-None-Match` gets `304 Not Modified`.
+    `fields` and `days` trim the plan the same way as on `POST /generate`.
+    """
+    if build_include(fields, days) is None:
+        return await run_in_bulkhead("storage", stored_plan_response, "nutrition", plan_id, if_none_match)
+
+    def transform(data):
+        return project(data, build_include(fields, days, len(data.get("daily_meal_plans", []))))
+
+    return await run_in_bulkhead("storage", stored_plan_response, "nutrition", plan_id, if_none_match, transform,
+                                 variant=f"{fields}|{days}")
@@ -0,0 +1,81 @@
+# app/routers/ops.py
+
+import hmac
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.middleware.admission import admission_controller
+from app.middleware.idempotency import idempotency_store
+from app.services.bulkheads import bulkhead_stats
+from app.services.job_service import get_job_manager
+from app.services import profiling
+
+router = APIRouter()
+
+
+@router.get(
+    "/admission",
+    summary="Admission Control Stats",
+    description="In-flight requests, queue depth, wait times and rejections per endpoint class.",
+)
+async def admission_stats():
+    return admission_controller.stats()
+
+
+@router.get(
+    "/bulkheads",
+    summary="Bulkhead Stats",
+    description="Threads in use, queue depth, completed calls and rejections per bulkhead executor.",
+)
+async def bulkheads():
+    return bulkhead_stats()
+
+
+@router.get(
+    "/jobs",
+    summary="Job Worker Stats",
+    description="Worker pool occupancy, queue depth and stored jobs by status.",
+)
+async def job_stats():
+    return await get_job_manager().stats()
+
+
+@router.get(
+    "/idempotency",
+    summary="Idempotency Key Stats",
+    description="Executed, replayed and attached requests, and the size of the response store.",
+)
+async def idempotency_stats():
+    return idempotency_store.stats()
+
+
+def _require_profiling_token(token: str):
+    if not profiling.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if not token or not hmac.compare_digest(token.encode(), profiling.PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get(
+    "/profiles",
+    summary="Recent Request Profiles",
+    description="Profiled requests, newest first. Requires the X-Profile-Token header.",
+)
+async def list_profiles(x_profile_token: str = Header(None)):
+    _require_profiling_token(x_profile_token)
+    return profiling.profile_store.summaries()
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="Request Profile",
+    description="Call tree, stage timings and upstream calls of one profiled request. "
+                "`format=text` returns only the profiler's report. Requires the X-Profile-Token header.",
+)
+async def get_profile(profile_id: str, format: str = "json", x_profile_token: str = Header(None)):
+    _require_profiling_token(x_profile_token)
+    report = profiling.profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(report["report"])
+    return report
@@ -2,6 +2,7 @@
 
 from fastapi import APIRouter, HTTPException, Query
 from app.schemas.recommendations import RecommendedBrands
+from app.services.bulkheads import run_in_bulkhead
 from app.services.recommendation_service import get_brand_recommendations
 
 router = APIRouter()
@@ -28,7 +29,7 @@ async def recommend_brands(
         GET /recommendations/brands?product=organic olive oil
     """
     try:
-        return get_brand_recommendations(product)
+        return await run_in_bulkhead("gemini", get_brand_recommendations, product)
     except HTTPException as e:
         raise e
     except Exception as e:
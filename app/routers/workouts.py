@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+from app.services.bulkheads import run_in_bulkhead
+from app.services.plan_store import remember_plan, stored_plan_response
 from app.services.workout_service import generate_workout_plan
 from app.schemas.workout import WorkoutPlan, ProfileData
 
@@ -11,7 +13,7 @@ router = APIRouter()
     summary="Generate Workout Plan",
     description="Input the athlete's profile details to receive a workout plan.",
 )
-async def generate_workout_plan_endpoint(profile_data: ProfileData):
+async def generate_workout_plan_endpoint(profile_data: ProfileData, response: Response):
     """
     Get a personalized workout plan based on athlete profile.
 
@@ -20,9 +22,29 @@ async def generate_workout_plan_endpoint(profile_data: ProfileData):
     - **age**: Age in years
     - **goal**: Fitness goal (e.g., bulking, shredding)
     - **equipment**: List of available equipment (e.g., ["dumbbells", "barbell", "resistance bands"])
+
+    The plan is also stored; the `Location` header points at `GET /workout-plans/{plan_id}`.
     """
     try:
-        result = generate_workout_plan(profile_data)
-        return result
+        result = await run_in_bulkhead("gemini", generate_workout_plan, profile_data)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    await run_in_bulkhead("storage", remember_plan, "workout", result, response)
+    return result
+
+
+@router.get(
+    "/{plan_id}",
+    response_model=WorkoutPlan,
+    summary="Get Workout Plan",
+    description="Fetch a previously generated workout plan by id.",
+)
+async def get_workout_plan(plan_id: str, if_none_match: str = Header(None)):
+    """
+    Return a stored workout plan without generating it again.
+
+    Plans never change, so a request with a matching `If-None-Match` gets `304 Not Modified`.
+    """
+    return await run_in_bulkhead("storage", stored_plan_response, "workout", plan_id, if_none_match)
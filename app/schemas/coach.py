@@ -0,0 +1,15 @@
+# app/schemas/coach.py
+
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class RosterRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=200)
+    workouts_limit: int = Field(default=5, ge=1, le=50)
+
+
+class RosterOverview(BaseModel):
+    profiles: Dict[str, Optional[Dict[str, Any]]]  # None when the user has no profile
+    recent_workouts: Dict[str, List[Dict[str, Any]]]
+    errors: Dict[str, Dict[str, str]]  # user_id -> {"profile" | "recent_workouts": message}
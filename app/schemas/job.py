@@ -0,0 +1,37 @@
+# app/schemas/job.py
+
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel
+from typing import Any, Optional
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class JobError(BaseModel):
+    status_code: int
+    detail: str
+
+
+class Job(BaseModel):
+    id: str
+    kind: str  # "nutrition_plan" or "agent"
+    status: JobStatus
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None  # Finished jobs are forgotten after this time
+    result: Optional[Any] = None  # Same body the synchronous endpoint returns
+    error: Optional[JobError] = None
+
+
+class JobAccepted(BaseModel):
+    id: str
+    status: JobStatus
+    status_url: str
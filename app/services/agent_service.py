@@ -1,24 +1,20 @@
 from fastapi import APIRouter, HTTPException
 from app.services.workout_service import generate_workout_plan
 from app.schemas.workout import WorkoutPlan, ProfileData
-from app.agents.agents import classify_intent, handle_exercise_request, handle_nutrition_request, handle_general_request
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app import config as settings
+from app.services.bulkheads import run_in_bulkhead
+from app.services.cassettes import active_cassette
+from app.services.metrics import record_cache, record_stage, stage, stage_seconds, upstream
+import functools
+import json
+import logging
 import os
-from dotenv import load_dotenv
+import time
 
-# Create LLM class
-load_dotenv()  # Try current directory first
-if not os.getenv("GEMINI_API_KEY"):
-    # Try relative path if current directory doesn't work
-    load_dotenv('../.env')
-if not os.getenv("GEMINI_API_KEY"):
-    # Try absolute path as last resort
-    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-    load_dotenv(env_path)
+# langchain, langgraph and the MCP adapters are imported where they are used:
+# together they add over half a second to the API's cold start
 
 
-api_key = os.getenv("GEMINI_API_KEY")
-
 def validate_response_data(data):
     """Ensure response data is in the correct format"""
     if data is None:
@@ -44,67 +40,211 @@ def create_mcp_client():
     from langchain_mcp_adapters.client import MultiServerMCPClient
     client = MultiServerMCPClient({
         "fitness": {
-            "url": "http://localhost:8001/mcp/" if not os.getenv("MCP_SERVER_URL") else os.getenv("MCP_SERVER_URL"),
+            "url": settings.MCP_SERVER_URL,
             "transport": "streamable_http",
         }
     })
     return client
 
-async def agent(user_message: str, user_id: str = None):
+
+async def _call_mcp_tool(name: str, arguments: dict):
+    async with create_mcp_client().session("fitness") as session:
+        return await session.call_tool(name, arguments)
+
+
+def _decode_call_tool_result(data: dict):
+    from mcp.types import CallToolResult
+
+    return CallToolResult.model_validate(data)
+
+
+async def call_mcp_tool(name: str, arguments: dict):
+    """
+    Call a fitness MCP server tool in a session of its own (recorded or replayed when a cassette is active).
+
+    Returns:
+        CallToolResult: The raw MCP result
+    """
+    with upstream("mcp", name, stage_name="tools"):
+        cassette = active_cassette()
+        if cassette is None:
+            return await _call_mcp_tool(name, arguments)
+        return await cassette.acall(
+            "mcp", name, arguments, lambda: _call_mcp_tool(name, arguments),
+            lambda result: result.model_dump(mode="json", exclude_none=True), _decode_call_tool_result,
+        )
+
+# MCP tool discovery costs a round trip to the MCP server; the tool list is
+# reused for this long. Each tool call still opens its own session.
+MCP_TOOLS_TTL_SECONDS = float(os.getenv("MCP_TOOLS_TTL_SECONDS", "300"))
+_mcp_tools = None
+_mcp_tools_expires_at = 0.0
+
+
+async def get_mcp_tools():
+    """
+    Return the fitness MCP server's tools as LangChain tools, cached for ``MCP_TOOLS_TTL_SECONDS``.
+
+    Raises:
+        Exception: If the MCP server cannot be reached and nothing is cached
+    """
+    global _mcp_tools, _mcp_tools_expires_at
+    fresh = _mcp_tools is not None and time.monotonic() < _mcp_tools_expires_at
+    record_cache("mcp_tools", fresh)
+    if not fresh:
+        with upstream("mcp", "list_tools"):
+            cassette = active_cassette()
+            if cassette is None:
+                tools = await create_mcp_client().get_tools()
+            else:
+                tools = await cassette.acall(
+                    "mcp", "list_tools", settings.MCP_SERVER_URL, lambda: create_mcp_client().get_tools(),
+                    _encode_tool_specs, _tools_from_specs,
+                )
+        _mcp_tools = [_timed_tool(tool) for tool in tools]
+        _mcp_tools_expires_at = time.monotonic() + MCP_TOOLS_TTL_SECONDS
+    return _mcp_tools
+
+
+def _encode_tool_specs(tools) -> list:
+    return [
+        {
+            "name": tool.name,
+            "description": tool.description,
+            "args_schema": tool.args_schema if isinstance(tool.args_schema, dict) else tool.args_schema.model_json_schema(),
+            "response_format": tool.response_format,
+        }
+        for tool in tools
+    ]
+
+
+def _tools_from_specs(specs: list) -> list:
+    """LangChain tools rebuilt from recorded specs; their calls can only be answered by the cassette."""
+    from langchain_core.tools import StructuredTool
+
+    async def not_recorded(**arguments):
+        raise RuntimeError("Replayed MCP tools can only be called through the cassette")
+
+    return [StructuredTool(coroutine=not_recorded, **spec) for spec in specs]
+
+
+def _encode_tool_output(output):
+    def default(value):
+        return value.model_dump(mode="json") if hasattr(value, "model_dump") else str(value)
+
+    return json.loads(json.dumps(output, default=default))
+
+
+def _timed_tool(tool):
+    """
+    Time each call of an MCP tool as an upstream call and as the request's ``tools`` stage,
+    recording or replaying it when a cassette is active.
+    """
+    call = tool.coroutine
+
+    def decode_output(data):
+        return tuple(data) if tool.response_format == "content_and_artifact" else data
+
+    @functools.wraps(call)
+    async def timed_call(*args, **kwargs):
+        with upstream("mcp", tool.name, stage_name="tools"):
+            cassette = active_cassette()
+            if cassette is None:
+                return await call(*args, **kwargs)
+            return await cassette.acall(
+                "mcp", tool.name, kwargs, lambda: call(*args, **kwargs), _encode_tool_output, decode_output,
+            )
+
+    tool.coroutine = timed_call
+    return tool
+
+
+async def _run_handler(handler, *args):
+    """Run an agent handler; its time outside MCP tool calls is the request's ``llm`` stage."""
+    tools_before = stage_seconds("tools")
+    started = time.perf_counter()
+    try:
+        return await handler(*args)
+    finally:
+        elapsed = time.perf_counter() - started
+        record_stage("llm", max(0.0, elapsed - (stage_seconds("tools") - tools_before)))
+
+
+def load_agent_stack():
+    """Import the LangChain/LangGraph modules the agent needs (the slow part of its first request)."""
+    import langchain_google_genai  # noqa: F401
+    import langgraph.prebuilt  # noqa: F401
+    import app.agents.agents  # noqa: F401
+
+
+async def agent(user_message: str, user_id: str = None, bulkhead: str = "gemini"):
     """
     Process user message and generate a response using the appropriate agent.
     
     Args:
         user_message: The message from the user
+        bulkhead: Bulkhead for the blocking intent classification ("jobs" from background jobs)
     """
-    tools = await create_mcp_client().get_tools()
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from app.agents.agents import classify_intent, handle_exercise_request, handle_nutrition_request, handle_general_request
+
+    api_key = settings.GEMINI_API_KEY
+    tools = await get_mcp_tools()
     llm_intent = ChatGoogleGenerativeAI(
         model="gemini-2.0-flash-lite",
         temperature=0,
-        google_api_key=api_key)
+        google_api_key=api_key,
+        base_url=settings.GEMINI_BASE_URL)
 
     llm_exercise = ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         temperature=0,
         google_api_key=api_key,
+        base_url=settings.GEMINI_BASE_URL,
     )
 
     llm_nutrition = ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         temperature=0.9,
         google_api_key=api_key,
+        base_url=settings.GEMINI_BASE_URL,
     )
 
     llm_general = ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         temperature=0.9,
-        google_api_key=api_key
+        google_api_key=api_key,
+        base_url=settings.GEMINI_BASE_URL
     )
 
     try:
-        intent = classify_intent(llm_intent, user_message)
-        print(f"Classified intent: {intent}")
+        with upstream("gemini", "classify_intent", stage_name="classify"):
+            intent = await run_in_bulkhead(bulkhead, classify_intent, llm_intent, user_message)
+        logging.info("Classified intent: %s", intent)
         if intent == "exercise":
-            structured_result = await handle_exercise_request(llm_exercise, tools, user_message, user_id)
+            structured_result = await _run_handler(handle_exercise_request, llm_exercise, tools, user_message, user_id)
             # Convert ExerciseResponse to dict format for AgentResponse
-            return {
-                "text": structured_result.text,
-                "data": validate_response_data(structured_result.data.model_dump() if structured_result.data else None)
-            }
+            with stage("validate"):
+                return {
+                    "text": structured_result.text,
+                    "data": validate_response_data(structured_result.data.model_dump() if structured_result.data else None)
+                }
         elif intent == "nutrition":
-            structured_result = await handle_nutrition_request(llm_nutrition, tools, user_message, user_id)
+            structured_result = await _run_handler(handle_nutrition_request, llm_nutrition, tools, user_message, user_id)
             # structured_result is already a dict from handle_nutrition_request
-            return {
-                "text": structured_result.get("text", ""),
-                "data": validate_response_data(structured_result.get("data"))
-            }
+            with stage("validate"):
+                return {
+                    "text": structured_result.get("text", ""),
+                    "data": validate_response_data(structured_result.get("data"))
+                }
         else:
-            structured_result = await handle_general_request(llm_general, tools, user_message, user_id)
+            structured_result = await _run_handler(handle_general_request, llm_general, tools, user_message, user_id)
             # Convert AgentResponse to dict format
-            return {
-                "text": structured_result.text,
-                "data": validate_response_data(structured_result.data)
-            }
+            with stage("validate"):
+                return {
+                    "text": structured_result.text,
+                    "data": validate_response_data(structured_result.data)
+                }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
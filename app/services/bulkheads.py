@@ -0,0 +1,200 @@
+# app/services/bulkheads.py
+
+"""
+Bulkheads: a separate, sized thread pool per blocking dependency.
+
+Blocking work used to run in Starlette's shared default threadpool (or, for
+``async def`` routes calling sync services, on the event loop itself), so a
+slow Gemini made every other endpoint wait for threads. Each dependency now
+gets its own executor:
+
+- ``gemini``: the sync Gemini-backed services (model call, parsing, validation)
+- ``image``: CPU-bound image handling (decoding and encoding meal photos)
+- ``storage``: writes to the local plan store
+- ``jobs``: the blocking work of background jobs (generation and the plan
+  write), so queued jobs never compete with interactive calls for threads
+
+A call waits for a thread in its bulkhead's queue. When the queue is full it
+is rejected at once with a 503 and ``Retry-After``; when the call has not
+finished within the bulkhead's timeout the caller gets a 504 (a call still
+queued is cancelled, one already running finishes in the background). The
+context of the request (request id, stage timings, profile) carries into
+the worker thread. The ``jobs`` bulkhead has no queue bound and no timeout:
+the job workers already bound how many calls it gets, and a job is meant
+to wait rather than fail.
+
+Sizes are read from the environment per bulkhead, e.g.
+``BULKHEAD_GEMINI_WORKERS``, ``BULKHEAD_GEMINI_MAX_QUEUE`` and
+``BULKHEAD_GEMINI_TIMEOUT``. ``BULKHEADS_ENABLED=false`` sends everything to
+the default executor instead, for comparison.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.services.metrics import BULKHEAD_ACTIVE, BULKHEAD_QUEUE_DEPTH, BULKHEAD_QUEUE_WAIT, BULKHEAD_REJECTIONS
+
+# name -> (default workers, max queued calls or None, timeout s or None)
+BULKHEADS = {
+    # Admission lets the generation (8) and lookup (32) classes hold this many calls in flight at once
+    "gemini": (40, 32, 120.0),
+    "image": (os.cpu_count() or 2, 16, 15.0),
+    "storage": (4, 64, 10.0),
+    # One thread per job worker; jobs wait for a thread instead of being rejected or timed out
+    "jobs": (int(os.getenv("JOB_WORKERS", "4")), None, None),
+}
+BULKHEADS_ENABLED = os.getenv("BULKHEADS_ENABLED", "true").lower() == "true"
+
+
+def _env_number(name: str, default, cast):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+
+class Bulkhead:
+    """A named, sized executor with a bounded queue and a per-call timeout (None for no bound or timeout)."""
+
+    def __init__(self, name: str, workers: int, max_queue, timeout):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self.max_queue_depth = 0
+
+    def _update_gauges(self):
+        BULKHEAD_ACTIVE.labels(self.name).set(self.active)
+        BULKHEAD_QUEUE_DEPTH.labels(self.name).set(self.queued)
+
+    def _reject(self, reason: str, status: int, detail: str):
+        with self._lock:
+            self.rejected[reason] += 1
+        BULKHEAD_REJECTIONS.labels(self.name, reason).inc()
+        logging.warning("Bulkhead %s rejected a call: %s", self.name, reason)
+        raise HTTPException(status_code=status, detail=detail, headers={"Retry-After": "1"} if status == 503 else None)
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run ``func(*args, **kwargs)`` on one of this bulkhead's threads.
+
+        Raises:
+            HTTPException: 503 if the queue is full, 504 if the call does not finish within the timeout
+        """
+        with self._lock:
+            # Submitted calls count as queued until a thread picks them up
+            if self.max_queue is not None and self.active + self.queued >= self.workers + self.max_queue:
+                full = True
+            else:
+                full = False
+                self.queued += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queued)
+                self._update_gauges()
+        if full:
+            self._reject("queue_full", 503, f"Too many pending {self.name} calls, retry shortly")
+
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def call():
+            BULKHEAD_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - submitted)
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self._update_gauges()
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self._update_gauges()
+
+        future = self._executor.submit(call)
+        waiter = asyncio.wrap_future(future)
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            self._abandon(future, waiter)
+            raise
+        if not done:
+            self._abandon(future, waiter)
+            self._reject("timeout", 504, f"{self.name} call timed out after {self.timeout:g}s")
+        return waiter.result()
+
+    def _abandon(self, future, waiter):
+        # A call that has not started yet is dropped; a running one cannot be interrupted
+        if future.cancel():
+            with self._lock:
+                self.queued -= 1
+                self._update_gauges()
+        waiter.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "active": self.active,
+                "queue_depth": self.queued,
+                "max_queue": self.max_queue,
+                "max_queue_depth_seen": self.max_queue_depth,
+                "timeout_seconds": self.timeout,
+                "completed": self.completed,
+                "rejected": dict(self.rejected),
+            }
+
+
+_bulkheads = {}
+_bulkheads_lock = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """The process-wide bulkhead called ``name``, created on first use."""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        with _bulkheads_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                workers, max_queue, timeout = BULKHEADS[name]
+                env = f"BULKHEAD_{name.upper()}_"
+                bulkhead = Bulkhead(
+                    name,
+                    _env_number(env + "WORKERS", workers, int),
+                    _env_number(env + "MAX_QUEUE", max_queue, int),
+                    _env_number(env + "TIMEOUT", timeout, float),
+                )
+                _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+async def run_in_bulkhead(name: str, func, *args, **kwargs):
+    """Run blocking ``func`` in the ``name`` bulkhead (or the default executor when bulkheads are off)."""
+    if not BULKHEADS_ENABLED:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return await get_bulkhead(name).run(func, *args, **kwargs)
+
+
+def bulkhead_stats() -> dict:
+    with _bulkheads_lock:
+        return {name: bulkhead.stats() for name, bulkhead in _bulkheads.items()}
+
+
+def shutdown_bulkheads():
+    with _bulkheads_lock:
+        for bulkhead in _bulkheads.values():
+            bulkhead.shutdown()
+        _bulkheads.clear()
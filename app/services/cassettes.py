@@ -0,0 +1,206 @@
+# app/services/cassettes.py
+
+"""
+Record/replay of Gemini and MCP calls.
+
+With ``CASSETTE_MODE=record`` every call that crosses the genai client or
+MCP client boundary is made for real and appended to a cassette file: the
+operation, a digest of the request, the full response (for Gemini
+including token counts and grounding metadata) and how long it took. With
+``CASSETTE_MODE=replay`` the same calls are answered from the cassette
+without touching the network or needing an API key, after sleeping for the
+recorded latency (or ``CASSETTE_LATENCY_MS``, scaled by
+``CASSETTE_LATENCY_SCALE``).
+
+Replay first looks for an interaction recorded from the identical request.
+With ``CASSETTE_MATCH=operation`` (the default) it otherwise serves the
+recordings of the same operation in turn, since prompts contain today's
+date; ``CASSETTE_MATCH=exact`` raises ``CassetteMiss`` instead.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+# The default does not depend on the directory the server or tests are started from
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", str(REPO_ROOT / "tests" / "cassettes" / "recorded.json"))
+CASSETTE_MATCH = os.getenv("CASSETTE_MATCH", "operation").lower()
+CASSETTE_LATENCY_MS = os.getenv("CASSETTE_LATENCY_MS")
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded interaction for a request."""
+
+
+def request_digest(boundary: str, operation: str, request) -> str:
+    """Stable digest of a request; bytes (e.g. images) are hashed rather than embedded."""
+    def default(value):
+        if isinstance(value, (bytes, bytearray)):
+            return "sha256:" + hashlib.sha256(value).hexdigest()
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json", exclude_none=True)
+        return str(value)
+
+    canonical = json.dumps([boundary, operation, request], sort_keys=True, default=default, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded interactions in one JSON file.
+
+    Args:
+        path: Cassette file; created on the first recording
+        mode: "record" or "replay"
+        match: "operation" (exact request first, then same operation in turn) or "exact"
+        latency_ms: Replay every call with this latency instead of the recorded one
+        latency_scale: Multiplier applied to the replay latency (0 replays instantly)
+    """
+
+    def __init__(self, path, mode: str = "replay", match: str = "operation", latency_ms: float = None,
+                 latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.match = match
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self.interactions = []
+        if self.path.exists():
+            self.interactions = json.loads(self.path.read_text(encoding="utf-8"))["interactions"]
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        self._by_digest = {item["request_digest"]: item for item in self.interactions}
+        self._turns = {}
+        self.stats = {"recorded": 0, "replayed": 0}
+
+    # -- replay ---------------------------------------------------------------
+
+    def _lookup(self, boundary: str, operation: str, digest: str) -> dict:
+        with self._lock:
+            found = self._by_digest.get(digest)
+            if found is None and self.match == "operation":
+                candidates = [item for item in self.interactions
+                              if item["boundary"] == boundary and item["operation"] == operation]
+                if candidates:
+                    turn = self._turns.setdefault((boundary, operation), count())
+                    found = candidates[next(turn) % len(candidates)]
+            if found is None:
+                raise CassetteMiss(f"No recorded {boundary} interaction for {operation} ({digest[:12]}) in {self.path}")
+            self.stats["replayed"] += 1
+            return found
+
+    def _replay_delay(self, interaction: dict) -> float:
+        latency_ms = self.latency_ms if self.latency_ms is not None else interaction.get("latency_ms", 0)
+        return max(0.0, latency_ms * self.latency_scale / 1000)
+
+    # -- record ---------------------------------------------------------------
+
+    def _record(self, boundary: str, operation: str, digest: str, request_summary, response, latency: float):
+        interaction = {
+            "boundary": boundary,
+            "operation": operation,
+            "request_digest": digest,
+            "request": request_summary,
+            "response": response,
+            "latency_ms": round(latency * 1000, 1),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+            self._by_digest[digest] = interaction
+            self.stats["recorded"] += 1
+            self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        document = {"version": CASSETTE_VERSION, "interactions": self.interactions}
+        with tempfile.NamedTemporaryFile("w", dir=self.path.parent, delete=False, suffix=".tmp",
+                                         encoding="utf-8") as handle:
+            json.dump(document, handle, indent=1, ensure_ascii=False)
+        os.replace(handle.name, self.path)
+
+    # -- calls ----------------------------------------------------------------
+
+    def call(self, boundary: str, operation: str, request, make_call, encode, decode, summary=None):
+        """
+        Make (record) or answer (replay) a synchronous call.
+
+        Args:
+            boundary: "gemini" or "mcp"
+            operation: Model method or MCP tool name
+            request: Everything the response depends on; digested for matching
+            make_call: Zero-argument callable performing the real call
+            encode: Response -> JSON-serializable data
+            decode: Recorded data -> response
+            summary: Human-readable request description stored alongside (not used for matching)
+        """
+        digest = request_digest(boundary, operation, request)
+        if self.mode == "replay":
+            interaction = self._lookup(boundary, operation, digest)
+            time.sleep(self._replay_delay(interaction))
+            return decode(interaction["response"])
+        started = time.perf_counter()
+        response = make_call()
+        self._record(boundary, operation, digest, summary, encode(response), time.perf_counter() - started)
+        return response
+
+    async def acall(self, boundary: str, operation: str, request, make_call, encode, decode, summary=None):
+        """Async ``call``: ``make_call`` returns an awaitable and replay latency is an ``asyncio.sleep``."""
+        digest = request_digest(boundary, operation, request)
+        if self.mode == "replay":
+            interaction = self._lookup(boundary, operation, digest)
+            await asyncio.sleep(self._replay_delay(interaction))
+            return decode(interaction["response"])
+        started = time.perf_counter()
+        response = await make_call()
+        self._record(boundary, operation, digest, summary, encode(response), time.perf_counter() - started)
+        return response
+
+
+_cassette = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def active_cassette():
+    """The process-wide cassette configured by ``CASSETTE_MODE``, or None when record/replay is off."""
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                if CASSETTE_MODE in ("record", "replay"):
+                    _cassette = Cassette(
+                        CASSETTE_PATH, CASSETTE_MODE, CASSETTE_MATCH,
+                        latency_ms=float(CASSETTE_LATENCY_MS) if CASSETTE_LATENCY_MS else None,
+                        latency_scale=CASSETTE_LATENCY_SCALE,
+                    )
+                _cassette_loaded = True
+    return _cassette
+
+
+@contextmanager
+def use_cassette(cassette):
+    """Route Gemini and MCP calls through ``cassette`` (None turns record/replay off) within the block."""
+    global _cassette, _cassette_loaded
+    previous = (_cassette, _cassette_loaded)
+    with _cassette_lock:
+        _cassette, _cassette_loaded = cassette, True
+    try:
+        yield cassette
+    finally:
+        with _cassette_lock:
+            _cassette, _cassette_loaded = previous
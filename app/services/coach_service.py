@@ -0,0 +1,44 @@
+# app/services/coach_service.py
+
+from app.schemas.coach import RosterRequest, RosterOverview
+from app.services.agent_service import call_mcp_tool
+from fastapi import HTTPException
+import json
+import logging
+
+
+def _tool_payload(result):
+    """Extract the JSON payload of an MCP tool result."""
+    if getattr(result, "isError", False):
+        raise HTTPException(status_code=502, detail=f"MCP tool error: {result.content}")
+    structured = getattr(result, "structuredContent", None)
+    if structured is not None:
+        # FastMCP wraps non-object return annotations as {"result": ...}
+        return structured.get("result", structured)
+    return json.loads(result.content[0].text)
+
+
+async def get_roster_overview(request: RosterRequest) -> RosterOverview:
+    """
+    Fetch profiles and recent workouts for a coach's roster in one batched MCP call.
+
+    Args:
+        request: The athletes' user IDs and how many recent workouts to include per athlete
+
+    Returns:
+        RosterOverview: Results keyed by user ID, with per-user errors for partial failures
+
+    Raises:
+        HTTPException: If the MCP server cannot be reached or returns an invalid payload
+    """
+    try:
+        result = await call_mcp_tool(
+            "get_roster_overview_tool",
+            {"user_ids": request.user_ids, "workouts_limit": request.workouts_limit},
+        )
+        return RosterOverview(**_tool_payload(result))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Exception (Roster Overview): {str(e)}")
+        raise HTTPException(status_code=502, detail=str(e))
@@ -0,0 +1,290 @@
+# app/services/job_service.py
+
+"""
+Background execution of long-running generations.
+
+A submitted job is stored as "queued" and put on a bounded asyncio queue
+that a fixed pool of worker tasks drains. Clients poll the job until it
+finishes; finished jobs are kept for ``JOB_RESULT_TTL_SECONDS``. Blocking
+generations run in a thread, so cancelling a running job stops waiting
+for it and discards its result, but cannot interrupt the upstream call
+itself.
+
+Each manager is an owner in the store and heartbeats while it lives, so
+when several workers share a SQLite store, one starting up only fails the
+jobs of owners that have stopped. A job cancelled through another worker
+is noticed by the worker running it, which stops waiting for it.
+
+Store reads and writes run in a worker thread, so a slow disk or a SQLite
+lock held by another process never stalls the event loop. Only the
+constructor touches the store directly, once per process.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.nutrition import ProfileData
+from app.services.agent_service import agent
+from app.services.bulkheads import run_in_bulkhead
+from app.services.job_store import FINISHED_STATUSES, UNFINISHED_STATUSES, create_job_store
+from app.logging_config import request_id_var
+from app.services.metrics import reset_stage_timings
+from app.services.nutrition_service import generate_nutrition_plan
+from app.services.plan_store import remember_plan
+
+PURGE_INTERVAL_SECONDS = 60
+HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("JOB_HEARTBEAT_INTERVAL_SECONDS", "10"))
+# An owner that has not heartbeat for this long is gone and its unfinished jobs are failed
+OWNER_STALE_SECONDS = float(os.getenv("JOB_OWNER_STALE_SECONDS", "60"))
+# How often a running job checks the store for a cancel made by another worker
+CANCEL_POLL_SECONDS = float(os.getenv("JOB_CANCEL_POLL_SECONDS", "1"))
+
+
+async def _run_nutrition_plan(payload: dict):
+    plan = await run_in_bulkhead("jobs", generate_nutrition_plan, ProfileData(**payload))
+    await run_in_bulkhead("jobs", remember_plan, "nutrition", plan)
+    return plan
+
+
+async def _run_agent(payload: dict):
+    return await agent(payload["user_message"], user_id=payload.get("user_id"), bulkhead="jobs")
+
+
+# kind -> coroutine function taking the submitted payload
+JOB_KINDS = {
+    "nutrition_plan": _run_nutrition_plan,
+    "agent": _run_agent,
+}
+
+
+class JobManager:
+    """Bounded worker pool over a job store."""
+
+    def __init__(self, store, workers: int = 4, max_queue: int = 100, ttl_seconds: float = 3600, kinds: dict = None):
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl_seconds = ttl_seconds
+        self.kinds = kinds or JOB_KINDS
+
+        self._loop = None
+        self._queue = None
+        self._worker_tasks = []
+        self._running = {}  # job_id -> task
+        self._cancel_requested = set()
+        self._submitting = 0
+        self._last_purge = 0.0
+        self._heartbeat_task = None
+        self.completed = {status: 0 for status in FINISHED_STATUSES}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        store.heartbeat(self.owner)
+        self._fail_orphaned()
+
+    def _fail_orphaned(self):
+        interrupted = self.store.fail_orphaned("Interrupted by a server restart", self.ttl_seconds,
+                                               stale_before=time.time() - OWNER_STALE_SECONDS)
+        if interrupted:
+            logging.warning(f"Marked {interrupted} unfinished jobs of stopped workers as failed")
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First use, or a new event loop (e.g. a fresh test client)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._running.clear()
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat_task = loop.create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+            except Exception as e:
+                logging.error(f"Job heartbeat failed: {e}")
+
+    async def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge >= PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            await asyncio.to_thread(self.store.purge_expired, now)
+            await asyncio.to_thread(self._fail_orphaned)
+
+    async def submit(self, kind: str, payload: dict) -> dict:
+        """
+        Queue a job.
+
+        Args:
+            kind: One of ``JOB_KINDS``
+            payload: JSON-compatible arguments for the job
+
+        Returns:
+            The stored job
+
+        Raises:
+            HTTPException: 429 if the queue is full
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._ensure_workers()
+        await self._maybe_purge()
+        # Submissions still storing their job hold a queue slot, so the put below cannot overflow
+        if self._queue.qsize() + self._submitting >= self.max_queue:
+            raise HTTPException(status_code=429, detail="Job queue is full, retry later",
+                                headers={"Retry-After": "30"})
+        job = {"id": uuid.uuid4().hex, "kind": kind, "status": "queued", "created_at": time.time(),
+               "owner": self.owner}
+        self._submitting += 1
+        try:
+            await asyncio.to_thread(self.store.create, job)
+        finally:
+            self._submitting -= 1
+        self._queue.put_nowait((job["id"], payload))
+        return job
+
+    async def get(self, job_id: str):
+        await self._maybe_purge()
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def cancel(self, job_id: str) -> dict:
+        """
+        Cancel a queued or running job.
+
+        Raises:
+            HTTPException: 404 for an unknown job, 409 if it already finished
+        """
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] in FINISHED_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+        # Set before the write: a run finishing meanwhile must not count as succeeded locally
+        self._cancel_requested.add(job_id)
+        if not await self._finish(job_id, "cancelled"):
+            # Finished in another worker since it was read
+            self._cancel_requested.discard(job_id)
+            job = await asyncio.to_thread(self.store.get, job_id)
+            raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _finish(self, job_id: str, status: str, result=None, error=None) -> bool:
+        """Record the outcome unless the job already finished (e.g. was cancelled by another worker)."""
+        now = time.time()
+        finished = await asyncio.to_thread(
+            self.store.update, job_id, if_status=UNFINISHED_STATUSES, status=status, finished_at=now,
+            expires_at=now + self.ttl_seconds, result=result, error=error,
+        )
+        if finished:
+            self.completed[status] += 1
+        return finished
+
+    async def _worker(self):
+        # Workers are started from a request; don't add job stages to that request's Server-Timing
+        reset_stage_timings()
+        while True:
+            job_id, payload = await self._queue.get()
+            # Logs written while running a job carry its id
+            request_id_var.set(f"job-{job_id}")
+            try:
+                await self._execute(job_id, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Job worker failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job_id: str, payload: dict):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or not await asyncio.to_thread(self.store.update, job_id, if_status=("queued",),
+                                                      status="running", started_at=time.time()):
+            # Cancelled while queued
+            self._cancel_requested.discard(job_id)
+            return
+        task = asyncio.ensure_future(self.kinds[job["kind"]](payload))
+        self._running[job_id] = task
+        try:
+            result = await self._await_unless_cancelled(job_id, task)
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                raise
+            return
+        except HTTPException as e:
+            await self._finish(job_id, "failed", error={"status_code": e.status_code, "detail": str(e.detail)})
+        except Exception as e:
+            logging.error(f"Exception (Job {job_id}): {str(e)}")
+            await self._finish(job_id, "failed", error={"status_code": 500, "detail": str(e)})
+        else:
+            if job_id not in self._cancel_requested:
+                await self._finish(job_id, "succeeded", result=jsonable_encoder(result))
+        finally:
+            self._running.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+
+    async def _await_unless_cancelled(self, job_id: str, task):
+        # A cancel through another worker only reaches the store, so check it while waiting
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=CANCEL_POLL_SECONDS)
+            if done:
+                return task.result()
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job is None or job["status"] != "running":
+                self._cancel_requested.add(job_id)
+                task.cancel()
+                await asyncio.wait({task})
+                return task.result()
+
+    async def shutdown(self):
+        tasks = self._worker_tasks + list(self._running.values())
+        if self._heartbeat_task is not None:
+            tasks.append(self._heartbeat_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._heartbeat_task = None
+        self._loop = None
+
+    async def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "ttl_seconds": self.ttl_seconds,
+            "completed": dict(self.completed),
+            "stored_by_status": await asyncio.to_thread(self.store.count_by_status),
+        }
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager, opening its store on first use."""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager(
+                    create_job_store(),
+                    workers=int(os.getenv("JOB_WORKERS", "4")),
+                    max_queue=int(os.getenv("JOB_MAX_QUEUE", "100")),
+                    ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600")),
+                )
+    return _job_manager
@@ -0,0 +1,202 @@
+# app/services/job_store.py
+
+"""
+Storage backends for background jobs.
+
+A job is a plain dict with the fields of ``app.schemas.job.Job`` plus the
+``owner`` that runs it; timestamps are epoch seconds and ``result``/``error``
+are JSON-compatible. Both stores treat a job whose ``expires_at`` has passed
+as gone.
+
+Several processes (e.g. ``uvicorn --workers N``) can share one SQLite file.
+Each ``JobManager`` is an owner that records a heartbeat; only unfinished
+jobs whose owner has stopped heartbeating are failed as interrupted, and
+status changes can be made conditional on the current status, so a cancel
+written by one process is not overwritten by the process running the job.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+UNFINISHED_STATUSES = ("queued", "running")
+
+
+class InMemoryJobStore:
+    """Jobs kept in a dict; lost on restart."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._heartbeats = {}  # owner -> last heartbeat
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id: str, if_status=None, **fields) -> bool:
+        """Update a job; with ``if_status``, only while its status is one of those. Returns whether it changed."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (if_status is not None and job["status"] not in if_status):
+                return False
+            job.update(fields)
+            return True
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (job.get("expires_at") and job["expires_at"] <= time.time()):
+                return None
+            return dict(job)
+
+    def purge_expired(self, now: float = None) -> int:
+        now = now or time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.get("expires_at") and job["expires_at"] <= now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def heartbeat(self, owner: str, now: float = None):
+        with self._lock:
+            self._heartbeats[owner] = now or time.time()
+
+    def fail_orphaned(self, detail: str, ttl_seconds: float, stale_before: float) -> int:
+        """Mark queued and running jobs as failed when their owner's last heartbeat is before ``stale_before``."""
+        now = time.time()
+        count = 0
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] in FINISHED_STATUSES:
+                    continue
+                if self._heartbeats.get(job.get("owner"), 0) >= stale_before:
+                    continue
+                job.update(status="failed", finished_at=now, expires_at=now + ttl_seconds,
+                           error={"status_code": 500, "detail": detail})
+                count += 1
+        return count
+
+    def count_by_status(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+
+class SQLiteJobStore:
+    """Jobs in a local SQLite file, so finished results survive a restart."""
+
+    COLUMNS = ("id", "kind", "status", "created_at", "started_at", "finished_at", "expires_at", "result", "error",
+               "owner")
+    JSON_COLUMNS = ("result", "error")
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, expires_at REAL, result TEXT, error TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+            # Files written before jobs had owners
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in existing:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS job_owners (owner TEXT PRIMARY KEY, heartbeat REAL NOT NULL)")
+
+    def _encode(self, column, value):
+        return json.dumps(value, separators=(",", ":")) if column in self.JSON_COLUMNS and value is not None else value
+
+    def create(self, job: dict):
+        values = [self._encode(column, job.get(column)) for column in self.COLUMNS]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})", values,
+            )
+
+    def update(self, job_id: str, if_status=None, **fields) -> bool:
+        """Update a job; with ``if_status``, only while its status is one of those. Returns whether it changed."""
+        columns = [column for column in fields if column in self.COLUMNS and column != "id"]
+        if not columns:
+            return False
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        values = [self._encode(column, fields[column]) for column in columns] + [job_id]
+        condition = "id = ?"
+        if if_status is not None:
+            # Checked and written in one statement, so a change made by another process in between is kept
+            condition += f" AND status IN ({', '.join('?' * len(if_status))})"
+            values += list(if_status)
+        with self._lock:
+            cursor = self._conn.execute(f"UPDATE jobs SET {assignments} WHERE {condition}", values)
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        for column in self.JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def purge_expired(self, now: float = None) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now or time.time(),))
+        return cursor.rowcount
+
+    def heartbeat(self, owner: str, now: float = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO job_owners (owner, heartbeat) VALUES (?, ?) "
+                "ON CONFLICT (owner) DO UPDATE SET heartbeat = excluded.heartbeat",
+                (owner, now or time.time()),
+            )
+
+    def fail_orphaned(self, detail: str, ttl_seconds: float, stale_before: float) -> int:
+        """Mark queued and running jobs as failed when their owner's last heartbeat is before ``stale_before``."""
+        now = time.time()
+        error = json.dumps({"status_code": 500, "detail": detail})
+        placeholders = ", ".join("?" * len(FINISHED_STATUSES))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET status = 'failed', finished_at = ?, expires_at = ?, error = ? "
+                f"WHERE status NOT IN ({placeholders}) AND (owner IS NULL OR owner NOT IN "
+                f"(SELECT owner FROM job_owners WHERE heartbeat >= ?))",
+                (now, now + ttl_seconds, error, *FINISHED_STATUSES, stale_before),
+            )
+            # Owners that stopped long ago have nothing left to vouch for
+            self._conn.execute("DELETE FROM job_owners WHERE heartbeat < ?", (stale_before,))
+        return cursor.rowcount
+
+    def count_by_status(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store():
+    """Store selected by JOB_STORE ("sqlite", the default, or "memory")."""
+    if os.getenv("JOB_STORE", "sqlite").lower() == "memory":
+        return InMemoryJobStore()
+    default_path = Path(__file__).resolve().parent.parent / "data" / "jobs.sqlite3"
+    return SQLiteJobStore(os.getenv("JOB_STORE_PATH", str(default_path)))
@@ -2,31 +2,35 @@
 
 from app.models.gemini_model import GeminiModel
 from app.schemas.meal import Meal
+from app.services.metrics import StageClock, record_parse_failure
+from app.logging_config import log_payload
 from fastapi import HTTPException
 import logging
 import json
 
 
-def analyze_meal(image_data: bytes) -> Meal:
-    logging.info("Starting meal analysis")
+def analyze_meal(image_data: bytes, image_b64: str = None) -> Meal:
+    logging.debug("Starting meal analysis")
     try:
-        result_text = GeminiModel.analyze_meal(image_data)
+        result_text = GeminiModel.analyze_meal(image_data, image_b64)
         if not result_text:
             raise HTTPException(status_code=500, detail="No response from Gemini API")
+        clock = StageClock()
 
-        logging.info(f"Gemini API Response Text (Analyze Meal): {result_text}")
+        log_payload("Gemini API Response Text (Analyze Meal)", result_text)
 
         # Clean the result_text to remove Markdown formatting
         clean_result_text = result_text.strip("```json\n").strip("```")
-        logging.info(f"Cleaned Result Text (Analyze Meal): {clean_result_text}")
 
         # Parse the cleaned JSON response
         try:
             result = json.loads(clean_result_text)
         except json.JSONDecodeError as e:
+            record_parse_failure("meal_analysis")
             logging.error(f"JSON Decode Error: {str(e)}")
-            logging.error(f"Raw response: {clean_result_text}")
+            log_payload("Raw response (Analyze Meal)", clean_result_text, error=True)
             raise HTTPException(status_code=500, detail=f"Failed to parse AI response: {str(e)}")
+        clock.lap("parse")
 
         # Extract all required fields
         food_name = result.get("food_name")
@@ -37,8 +41,8 @@ def analyze_meal(image_data: bytes) -> Meal:
         total_carbohydrates = result.get("total_carbohydrates")
         total_fats = result.get("total_fats")
 
-        logging.info(f"Parsed - Food: {food_name}, Calories: {total_calories}, "
-                    f"Protein: {total_protein}, Carbs: {total_carbohydrates}, Fats: {total_fats}")
+        logging.debug("Parsed - Food: %s, Calories: %s, Protein: %s, Carbs: %s, Fats: %s",
+                      food_name, total_calories, total_protein, total_carbohydrates, total_fats)
 
         # Validate that all required fields are present
         if not all([food_name is not None, total_calories is not None, 
@@ -59,7 +63,7 @@ def analyze_meal(image_data: bytes) -> Meal:
             )
 
         # Create and return Meal object (field validators will handle type conversion)
-        return Meal(
+        meal = Meal(
             food_name=food_name,
             total_calories=total_calories,
             calories_per_ingredient=calories_per_ingredient,
@@ -68,6 +72,8 @@ def analyze_meal(image_data: bytes) -> Meal:
             total_carbohydrates=total_carbohydrates,
             total_fats=total_fats
         )
+        clock.lap("validate")
+        return meal
 
     except HTTPException:
         # Re-raise HTTP exceptions without wrapping
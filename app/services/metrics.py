@@ -0,0 +1,175 @@
+# app/services/metrics.py
+
+"""
+Prometheus metrics and per-request stage timings for the API.
+
+``MetricsMiddleware`` records request latency per route template and
+in-flight requests per endpoint class. Services mark where a request's time goes with
+``stage()`` / ``StageClock`` (classify, tools, llm, parse, validate) and
+``upstream()`` for calls to Gemini and the MCP server. Stage totals for
+the current request are kept in a context variable and returned to the
+client in a ``Server-Timing`` header.
+
+Cache hit ratios are ``cache_requests_total{result="hit"}`` over all
+requests for that cache. When ``PROMETHEUS_MULTIPROC_DIR`` is set (several
+worker processes), ``/metrics`` aggregates every worker's samples.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from app.services.profiling import record_span
+
+# Gemini calls take seconds, routes served from memory take milliseconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served by endpoint class",
+    ["method", "endpoint_class"], multiprocess_mode="livesum",
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream services",
+    ["upstream", "operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "request_stage_duration_seconds", "Time spent per request stage",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result", ["cache", "result"])
+JSON_PARSE_FAILURES = Counter(
+    "json_parse_failures_total", "Model responses that could not be parsed as JSON", ["source"],
+)
+BULKHEAD_ACTIVE = Gauge(
+    "bulkhead_active_calls", "Calls running on a bulkhead's threads", ["bulkhead"], multiprocess_mode="livesum",
+)
+BULKHEAD_QUEUE_DEPTH = Gauge(
+    "bulkhead_queue_depth", "Calls waiting for a bulkhead thread", ["bulkhead"], multiprocess_mode="livesum",
+)
+BULKHEAD_QUEUE_WAIT = Histogram(
+    "bulkhead_queue_wait_seconds", "Time calls waited for a bulkhead thread",
+    ["bulkhead"], buckets=LATENCY_BUCKETS,
+)
+BULKHEAD_REJECTIONS = Counter(
+    "bulkhead_rejections_total", "Calls rejected by a bulkhead (queue full or timed out)", ["bulkhead", "reason"],
+)
+
+# Stage name -> seconds for the request being served (None outside a request)
+_stage_timings = ContextVar("stage_timings", default=None)
+
+
+def start_stage_timings():
+    """Begin collecting stage timings for the current request; returns (timings, reset token)."""
+    timings = {}
+    return timings, _stage_timings.set(timings)
+
+
+def reset_stage_timings(token=None):
+    if token is None:
+        _stage_timings.set(None)
+    else:
+        _stage_timings.reset(token)
+
+
+def record_stage(name: str, seconds: float):
+    STAGE_LATENCY.labels(name).observe(seconds)
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def current_stage_timings():
+    """Stage name -> seconds recorded so far for the current request, or None outside a request."""
+    return _stage_timings.get()
+
+
+def stage_seconds(name: str) -> float:
+    """Time recorded so far for a stage of the current request (0 outside a request)."""
+    timings = _stage_timings.get()
+    return timings.get(name, 0.0) if timings is not None else 0.0
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as one request stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+class StageClock:
+    """Lap timer for consecutive stages: ``clock.lap("parse")`` records the time since the previous lap."""
+
+    def __init__(self):
+        self._last = time.perf_counter()
+
+    def lap(self, name: str):
+        now = time.perf_counter()
+        record_stage(name, now - self._last)
+        self._last = now
+
+
+@contextmanager
+def upstream(service: str, operation: str, stage_name: str = None):
+    """
+    Time a call to an upstream service (gemini, mcp, ...), optionally also as a request stage.
+
+    Args:
+        service: Upstream name used as the ``upstream`` label
+        operation: What was called, e.g. a model method or MCP tool name
+        stage_name: Request stage to add the time to, if any
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_LATENCY.labels(service, operation, outcome).observe(elapsed)
+        record_span(service, operation, started, elapsed, outcome)
+        if stage_name:
+            record_stage(stage_name, elapsed)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_parse_failure(source: str):
+    JSON_PARSE_FAILURES.labels(source).inc()
+
+
+def server_timing(timings: dict, total_seconds: float) -> str:
+    """``Server-Timing`` header value: one entry per stage plus the total, in milliseconds."""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_metrics():
+    """Return (body, content type) for the ``/metrics`` endpoint."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
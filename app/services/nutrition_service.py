@@ -7,6 +7,8 @@ from app.schemas.nutrition import (
     DailyCaloriesRange,
     MacronutrientRange,
 )
+from app.services.metrics import StageClock, record_parse_failure
+from app.logging_config import log_payload
 from fastapi import HTTPException
 import json
 import logging
@@ -25,6 +27,7 @@ def generate_nutrition_plan(profile_data: ProfileData) -> NutritionPlan:
 
         if not result_text:
             raise HTTPException(status_code=500, detail="No response from Gemini API")
+        clock = StageClock()
 
         # Clean the result_text to remove Markdown formatting
         clean_result_text = clean_response_text(result_text)
@@ -33,11 +36,12 @@ def generate_nutrition_plan(profile_data: ProfileData) -> NutritionPlan:
         try:
             result = json.loads(clean_result_text)
         except json.JSONDecodeError as e:
+            record_parse_failure("nutrition_plan")
             logging.error(f"JSON Decode Error (Provide Nutrition Advice): {str(e)}")
-            logging.error(
-                f"Cleaned Result Text (Provide Nutrition Advice) on JSON Decode Error: {clean_result_text}"
-            )
+            log_payload("Cleaned Result Text (Provide Nutrition Advice) on JSON Decode Error", clean_result_text,
+                        error=True)
             raise HTTPException(status_code=500, detail=f"JSON Decode Error: {str(e)}")
+        clock.lap("parse")
 
         # Convert the result dictionary to Pydantic models
         daily_calories_range = DailyCaloriesRange(**result["daily_calories_range"])
@@ -77,12 +81,14 @@ def generate_nutrition_plan(profile_data: ProfileData) -> NutritionPlan:
             )
             daily_meal_plans.append(daily_meal_plan)
 
-        return NutritionPlan(
+        plan = NutritionPlan(
             daily_calories_range=daily_calories_range,
             macronutrients_range=macronutrients_range,
             daily_meal_plans=daily_meal_plans,
             total_days=result.get("total_days", len(daily_meal_plans))
         )
+        clock.lap("validate")
+        return plan
 
     except Exception as e:
         logging.error(f"Exception (Provide Nutrition Advice): {str(e)}")
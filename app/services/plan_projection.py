@@ -0,0 +1,128 @@
+# app/services/plan_projection.py
+
+"""
+Sparse fieldsets and day ranges for nutrition plan responses.
+
+``fields`` is a comma-separated list of dotted paths into ``NutritionPlan``
+(lists and dicts are stepped through transparently), or a preset name such
+as ``summary``. ``days`` selects day numbers, e.g. ``3`` or ``1-7``.
+
+Both are turned into one include tree. A generated plan is serialized
+with ``model_dump_json(include=...)``, so excluded subtrees are never
+serialized; a stored plan applies the same tree to its decoded JSON.
+"""
+
+import typing
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.schemas.nutrition import NutritionPlan
+
+MEAL_SLOTS = ("breakfast", "lunch", "dinner", "snacks")
+
+FIELD_PRESETS = {
+    # What the mobile list view shows: each day's meal descriptions and calories
+    "summary": [
+        "daily_calories_range",
+        "total_days",
+        "daily_meal_plans.day",
+        "daily_meal_plans.date",
+        "daily_meal_plans.total_daily_calories",
+        *(f"daily_meal_plans.{slot}.{field}" for slot in MEAL_SLOTS for field in ("description", "total_calories")),
+    ],
+}
+
+ALL = "__all__"
+MAX_PLAN_DAYS = 366
+
+
+def _inner_model(annotation):
+    """The model a field holds, looking through List[...], Dict[str, ...] and Optional[...]."""
+    while True:
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return annotation, False
+        args = typing.get_args(annotation)
+        origin = typing.get_origin(annotation)
+        if origin in (list, dict):
+            model, _ = _inner_model(args[-1])
+            return model, True
+        if origin is typing.Union:
+            annotation = next((arg for arg in args if arg is not type(None)), None)
+            continue
+        return None, False
+
+
+def _add_path(tree: dict, model, path: str):
+    segments = path.split(".")
+    node = tree
+    for position, segment in enumerate(segments):
+        field = model.model_fields.get(segment) if model else None
+        if field is None:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {path}")
+        model, is_container = _inner_model(field.annotation)
+        last = position == len(segments) - 1
+        if last:
+            node[segment] = True
+            return
+        child = node.get(segment)
+        if child is True:
+            return  # A parent is already included whole
+        child = node.setdefault(segment, {})
+        if is_container:
+            child = child.setdefault(ALL, {})
+        node = child
+
+
+def parse_days(days: str, total_days: int = None):
+    """Zero-based indices of the requested day numbers (``3`` or ``1-7``), clipped to the plan."""
+    try:
+        first, _, last = days.partition("-")
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid days range: {days!r}")
+    if first < 1 or last < first:
+        raise HTTPException(status_code=400, detail=f"Invalid days range: {days!r}")
+    return range(first - 1, min(last, total_days if total_days is not None else MAX_PLAN_DAYS))
+
+
+def build_include(fields: str = None, days: str = None, total_days: int = None):
+    """
+    Include tree for ``NutritionPlan`` serialization, or None for the full plan.
+
+    Raises:
+        HTTPException: 400 for unknown fields or a malformed day range
+    """
+    if not fields and not days:
+        return None
+    if fields:
+        paths = []
+        for name in (part.strip() for part in fields.split(",")):
+            if name:
+                paths.extend(FIELD_PRESETS.get(name, [name]))
+        tree = {}
+        for path in paths:
+            _add_path(tree, NutritionPlan, path)
+    else:
+        tree = {name: True for name in NutritionPlan.model_fields}
+
+    if days and "daily_meal_plans" in tree:
+        day_tree = tree["daily_meal_plans"]
+        day_tree = day_tree[ALL] if day_tree is not True else True
+        tree["daily_meal_plans"] = {index: day_tree for index in parse_days(days, total_days)}
+    return tree
+
+
+def project(value, include):
+    """Apply an include tree to JSON-decoded data, mirroring Pydantic's include semantics."""
+    if include is True:
+        return value
+    if isinstance(value, list):
+        if ALL in include:
+            return [project(item, include[ALL]) for item in value]
+        return [project(value[index], sub) for index, sub in sorted(include.items()) if index < len(value)]
+    if isinstance(value, dict):
+        if ALL in include:
+            return {key: project(item, include[ALL]) for key, item in value.items()}
+        return {key: project(item, include[key]) for key, item in value.items() if key in include}
+    return value
@@ -0,0 +1,169 @@
+# app/services/plan_store.py
+
+"""
+Local store of generated workout and nutrition plans.
+
+Every generated plan is saved under an id derived from its content (a
+SHA-256 of its canonical JSON), so saving the same plan twice is a no-op
+and the id doubles as a strong ETag. Plans are stored as zlib-compressed
+JSON in SQLite; fetching one by id is a single primary-key read, and the
+stored bytes are returned as-is without re-validating the model.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from fastapi import HTTPException, Response
+
+PLAN_KINDS = {"workout": "/workout-plans", "nutrition": "/nutrition-plans"}
+ID_LENGTH = 32
+
+
+def canonical_json(plan) -> bytes:
+    data = plan.model_dump(mode="json") if hasattr(plan, "model_dump") else plan
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def plan_id_for(kind: str, body: bytes) -> str:
+    return hashlib.sha256(kind.encode() + b"\0" + body).hexdigest()[:ID_LENGTH]
+
+
+def etag_for(plan_id: str) -> str:
+    return f'"{plan_id}"'
+
+
+def etag_matches(if_none_match: str, plan_id: str) -> bool:
+    """True if an If-None-Match header value matches the plan's ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag_for(plan_id) for tag in tags)
+
+
+class PlanStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, created_at REAL NOT NULL, "
+                "size INTEGER NOT NULL, body BLOB NOT NULL) WITHOUT ROWID"
+            )
+
+    def save(self, kind: str, plan) -> str:
+        """
+        Store a plan.
+
+        Args:
+            kind: "workout" or "nutrition"
+            plan: The Pydantic plan model (or its JSON-compatible dict)
+
+        Returns:
+            The plan id
+        """
+        if kind not in PLAN_KINDS:
+            raise ValueError(f"Unknown plan kind: {kind}")
+        body = canonical_json(plan)
+        plan_id = plan_id_for(kind, body)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO plans (id, kind, created_at, size, body) VALUES (?, ?, ?, ?, ?)",
+                (plan_id, kind, time.time(), len(body), zlib.compress(body, 6)),
+            )
+        return plan_id
+
+    def get(self, kind: str, plan_id: str):
+        """Return the plan's JSON bytes, or None if there is no such plan of this kind."""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM plans WHERE id = ? AND kind = ?", (plan_id, kind)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def exists(self, kind: str, plan_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM plans WHERE id = ? AND kind = ?", (plan_id, kind)).fetchone() is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, COUNT(*), SUM(size), SUM(LENGTH(body)) FROM plans GROUP BY kind").fetchall()
+        return {kind: {"plans": count, "json_bytes": raw, "stored_bytes": stored} for kind, count, raw, stored in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_plan_store = None
+_plan_store_lock = threading.Lock()
+
+
+def get_plan_store() -> PlanStore:
+    """Return the process-wide plan store (PLAN_STORE_PATH), opening it on first use."""
+    global _plan_store
+    if _plan_store is None:
+        with _plan_store_lock:
+            if _plan_store is None:
+                default_path = Path(__file__).resolve().parent.parent / "data" / "plans.sqlite3"
+                _plan_store = PlanStore(os.getenv("PLAN_STORE_PATH", str(default_path)))
+    return _plan_store
+
+
+def remember_plan(kind: str, plan, response: Response = None):
+    """
+    Save a freshly generated plan and point the response at its stored copy.
+
+    Sets ``Location`` and ``ETag`` on ``response``. A storage failure is
+    logged rather than failing the generation that produced the plan.
+
+    Returns:
+        The plan id, or None if it could not be stored
+    """
+    try:
+        plan_id = get_plan_store().save(kind, plan)
+    except Exception as e:
+        logging.warning(f"Could not store generated {kind} plan: {e}")
+        return None
+    if response is not None:
+        response.headers["Location"] = f"{PLAN_KINDS[kind]}/{plan_id}"
+        response.headers["ETag"] = etag_for(plan_id)
+    return plan_id
+
+
+def stored_plan_response(kind: str, plan_id: str, if_none_match: str = None, transform=None,
+                         variant: str = None) -> Response:
+    """
+    Serve a stored plan by id, or 304 when the client's copy is current.
+
+    Reads the store, so routes run it in the ``storage`` bulkhead.
+
+    Args:
+        transform: Optional function from the decoded plan to the data to send
+        variant: Identifies the transform in the ETag, so each projection
+            of a plan is cached separately
+
+    Raises:
+        HTTPException: 404 if there is no such plan
+    """
+    store = get_plan_store()
+    tag = f"{plan_id};{hashlib.sha256(variant.encode()).hexdigest()[:12]}" if variant else plan_id
+    headers = {"ETag": etag_for(tag), "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(if_none_match, tag) and store.exists(kind, plan_id):
+        return Response(status_code=304, headers=headers)
+    body = store.get(kind, plan_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} plan not found")
+    if transform is not None:
+        body = json.dumps(transform(json.loads(body)), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers=headers)
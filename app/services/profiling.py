@@ -0,0 +1,156 @@
+# app/services/profiling.py
+
+"""
+On-demand profiles of single requests.
+
+A profiled request runs under a sampling profiler (pyinstrument, if it is
+installed, in async mode so awaited time is charged to the request's own
+call stack) or, as a fallback, cProfile. The fallback is deterministic, much
+slower, and sees everything on the event loop thread, so using it is logged
+as a warning. Alongside the call tree the report
+lists the request's stage timings (classify, tools, llm, parse, validate)
+and every upstream call it made (Gemini, MCP tools) with its start offset
+and duration.
+
+Reports are kept in a small in-memory store and fetched from
+``/ops/profiles/{id}``. When profiling is off (``PROFILING_TOKEN`` unset,
+or a request without the token) nothing here runs; ``upstream()`` checks a
+context variable and moves on.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "20"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.001"))
+CPROFILE_TOP_FUNCTIONS = 40
+
+# Upstream calls of the request being profiled (None when not profiling)
+_spans = ContextVar("profile_spans", default=None)
+
+
+def record_span(service: str, operation: str, started: float, elapsed: float, outcome: str):
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((service, operation, started, elapsed, outcome))
+
+
+def pyinstrument_available() -> bool:
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _PyinstrumentProfiler:
+    name = "pyinstrument"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+
+        self._profiler = Profiler(interval=PROFILE_INTERVAL_SECONDS, async_mode="enabled")
+
+    def start(self):
+        self._profiler.start()
+
+    def stop(self) -> str:
+        self._profiler.stop()
+        return self._profiler.output_text(unicode=True, color=False, show_all=False)
+
+
+class _CProfileProfiler:
+    """Deterministic fallback. It sees only the event loop thread, including other requests running on it."""
+
+    name = "cProfile"
+
+    def __init__(self, explicit: bool = False):
+        if not explicit:
+            logging.warning("pyinstrument is not installed; profiling with cProfile, which is deterministic, "
+                            "adds heavy overhead and records every task on the event loop")
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        self._profiler.enable()
+
+    def stop(self) -> str:
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(CPROFILE_TOP_FUNCTIONS)
+        return out.getvalue()
+
+
+class ProfiledRequest:
+    """Profiler, stage and upstream-call capture for one request."""
+
+    def __init__(self, method: str, path: str, profiler: str = None):
+        use_pyinstrument = profiler == "pyinstrument" or (profiler is None and pyinstrument_available())
+        self.profiler = _PyinstrumentProfiler() if use_pyinstrument else _CProfileProfiler(explicit=profiler == "cProfile")
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.spans = []
+        self._token = None
+        self._started = None
+
+    def start(self):
+        self._token = _spans.set(self.spans)
+        self._started = time.perf_counter()
+        self.profiler.start()
+
+    def stop(self, status: int, stages: dict) -> dict:
+        report = self.profiler.stop()
+        duration = time.perf_counter() - self._started
+        _spans.reset(self._token)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "created_at": time.time(),
+            "duration_ms": round(duration * 1000, 1),
+            "profiler": self.profiler.name,
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in (stages or {}).items()},
+            "upstream_calls": [
+                {"upstream": service, "operation": operation, "outcome": outcome,
+                 "start_ms": round((started - self._started) * 1000, 1), "duration_ms": round(elapsed * 1000, 1)}
+                for service, operation, started, elapsed, outcome in self.spans
+            ],
+            "report": report,
+        }
+
+
+class ProfileStore:
+    """The most recent profile reports, by id."""
+
+    def __init__(self, max_entries: int = PROFILE_STORE_SIZE):
+        self.max_entries = max_entries
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, report: dict):
+        with self._lock:
+            self._reports[report["id"]] = report
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+
+    def get(self, profile_id: str):
+        with self._lock:
+            return self._reports.get(profile_id)
+
+    def summaries(self) -> list:
+        with self._lock:
+            return [{key: report[key] for key in ("id", "method", "path", "status", "created_at", "duration_ms")}
+                    for report in reversed(self._reports.values())]
+
+
+profile_store = ProfileStore()
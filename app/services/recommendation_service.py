@@ -2,6 +2,8 @@
 
 from app.models.gemini_model import GeminiModel
 from app.schemas.recommendations import RecommendedBrands, Brand
+from app.services.metrics import StageClock, record_parse_failure
+from app.logging_config import Payload, log_payload
 from fastapi import HTTPException
 import json
 import logging
@@ -32,6 +34,7 @@ def get_brand_recommendations(product: str) -> RecommendedBrands:
         
         if not result_text:
             raise HTTPException(status_code=500, detail="No response from Gemini API")
+        clock = StageClock()
         
         # Clean the result text to remove any markdown formatting
         clean_result_text = clean_response_text(result_text)
@@ -40,9 +43,11 @@ def get_brand_recommendations(product: str) -> RecommendedBrands:
         try:
             result = json.loads(clean_result_text)
         except json.JSONDecodeError as e:
+            record_parse_failure("brand_recommendations")
             logging.error(f"JSON Decode Error (Brand Recommendations): {str(e)}")
-            logging.error(f"Cleaned Result Text: {clean_result_text}")
+            log_payload("Cleaned Result Text (Brand Recommendations)", clean_result_text, error=True)
             raise HTTPException(status_code=500, detail=f"JSON Decode Error: {str(e)}")
+        clock.lap("parse")
         
         # Convert the result to Pydantic models
         brands = []
@@ -51,13 +56,15 @@ def get_brand_recommendations(product: str) -> RecommendedBrands:
                 brand = Brand(**brand_data)
                 brands.append(brand)
             except Exception as e:
-                logging.warning(f"Skipping invalid brand data: {brand_data}, error: {str(e)}")
+                logging.warning("Skipping invalid brand data: %s, error: %s", Payload(brand_data), e)
                 continue
         
         if not brands:
             raise HTTPException(status_code=404, detail="No valid brand recommendations found")
         
-        return RecommendedBrands(brands=brands)
+        recommended = RecommendedBrands(brands=brands)
+        clock.lap("validate")
+        return recommended
         
     except HTTPException:
         # Re-raise HTTP exceptions
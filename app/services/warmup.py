@@ -0,0 +1,144 @@
+# app/services/warmup.py
+
+"""
+Startup warmup and readiness for the API process.
+
+The lifespan hook warms every component concurrently in the background,
+so ``/healthz`` answers as soon as the server is up while ``/readyz``
+returns 503 until every required component is warm. The load balancer
+only routes traffic to workers that have paid their cold-start costs.
+A required component that fails (e.g. a network blip while creating a
+client) is retried with exponential backoff until it is warm, so the
+worker becomes ready without a restart.
+
+A component that is not required (MCP tool discovery by default: the MCP
+server may be deployed separately) is reported but does not hold back
+readiness; it is retried on first use as before.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from app.models.gemini_model import get_client
+from app.services.agent_service import get_mcp_tools, load_agent_stack
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+WARMUP_RETRY_INITIAL_SECONDS = float(os.getenv("WARMUP_RETRY_INITIAL_SECONDS", "1"))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "30"))
+REQUIRED_COMPONENTS = {
+    name.strip() for name in os.getenv("WARMUP_REQUIRED_COMPONENTS", "gemini_client,agent_stack").split(",")
+    if name.strip()
+}
+
+# name -> warmup callable; sync callables run in a worker thread
+WARMUP_COMPONENTS = {
+    "gemini_client": get_client,
+    "agent_stack": load_agent_stack,
+    "mcp_tools": get_mcp_tools,
+}
+
+
+class ComponentState:
+    __slots__ = ("name", "required", "state", "started_at", "duration_ms", "error")
+
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.state = "pending"
+        self.started_at = None
+        self.duration_ms = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {"state": self.state, "required": self.required,
+                "duration_ms": self.duration_ms, "error": self.error}
+
+
+class Readiness:
+    """Warm state and timings of each startup component."""
+
+    def __init__(self, components: dict = None, required=None, timeout_seconds: float = WARMUP_TIMEOUT_SECONDS,
+                 retry_initial_seconds: float = WARMUP_RETRY_INITIAL_SECONDS,
+                 retry_max_seconds: float = WARMUP_RETRY_MAX_SECONDS):
+        self.components = WARMUP_COMPONENTS if components is None else components
+        required = REQUIRED_COMPONENTS if required is None else set(required)
+        self.timeout_seconds = timeout_seconds
+        self.retry_initial_seconds = retry_initial_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.states = {name: ComponentState(name, name in required) for name in self.components}
+        self.started_at = None
+        self.finished_at = None
+
+    async def _warm(self, name: str, warm):
+        state = self.states[name]
+        state.state = "warming"
+        state.error = None
+        state.started_at = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(warm):
+                await asyncio.wait_for(warm(), self.timeout_seconds)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(warm), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            state.state = "failed"
+            state.error = f"Timed out after {self.timeout_seconds:g}s"
+        except Exception as e:
+            state.state = "failed"
+            state.error = str(e) or type(e).__name__
+        else:
+            state.state = "ready"
+        state.duration_ms = round((time.perf_counter() - state.started_at) * 1000, 1)
+        log = logging.warning if state.state == "failed" and state.required else logging.info
+        log(f"Warmup {name}: {state.state} in {state.duration_ms} ms" + (f" ({state.error})" if state.error else ""))
+
+    async def warm_up(self):
+        """Warm every component concurrently; failures are recorded, never raised."""
+        self.started_at = time.time()
+        await asyncio.gather(*(self._warm(name, warm) for name, warm in self.components.items()))
+        self.finished_at = time.time()
+
+    async def retry_failed(self):
+        """Warm failed required components again, with exponential backoff, until none is left."""
+        delay = self.retry_initial_seconds
+        while True:
+            failed = [name for name, state in self.states.items() if state.required and state.state == "failed"]
+            if not failed:
+                return
+            await asyncio.sleep(delay)
+            logging.info(f"Retrying warmup of {', '.join(failed)}")
+            await asyncio.gather(*(self._warm(name, self.components[name]) for name in failed))
+            delay = min(delay * 2, self.retry_max_seconds)
+
+    async def run(self):
+        """Warm up, then keep retrying required components that failed; run from the lifespan hook."""
+        await self.warm_up()
+        await self.retry_failed()
+
+    def skip(self):
+        """Mark every component as skipped (warmup disabled): they are created on first use."""
+        for state in self.states.values():
+            state.state = "skipped"
+
+    @property
+    def ready(self) -> bool:
+        return all(state.state in ("ready", "skipped") for state in self.states.values() if state.required)
+
+    def report(self) -> dict:
+        if self.ready:
+            status = "ready"
+        elif any(state.state in ("pending", "warming") for state in self.states.values() if state.required):
+            status = "warming"
+        else:
+            status = "failed"
+        return {
+            "status": status,
+            "warmup_started_at": self.started_at,
+            "warmup_seconds": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "components": {name: state.to_dict() for name, state in self.states.items()},
+        }
+
+
+readiness = Readiness()
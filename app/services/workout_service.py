@@ -2,6 +2,8 @@
 
 from app.models.gemini_model import GeminiModel
 from app.schemas.workout import ProfileData, WorkoutPlan, Exercise, WarmupCardioCooldown
+from app.services.metrics import StageClock, record_parse_failure
+from app.logging_config import log_payload
 from fastapi import HTTPException
 import json
 import logging
@@ -27,15 +29,13 @@ def generate_workout_plan(profile_data: ProfileData) -> WorkoutPlan:
         if not model_response:
             logging.error("Gemini API returned None or empty response")
             raise HTTPException(status_code=500, detail="Failed to generate workout plan. Please try again.")
+        clock = StageClock()
 
-        # Log the raw response for debugging
-        logging.info(f"Raw Gemini response: {model_response}")
+        # Log the raw response for debugging (sampled requests only)
+        log_payload("Raw Gemini response", model_response)
 
         # Clean the result_text to remove Markdown formatting and fix "rest" values
         clean_result_text = clean_response_text(model_response)
-        
-        # Log the cleaned response for debugging
-        logging.info(f"Cleaned response: {clean_result_text}")
 
         # Check if the cleaned response is empty or whitespace
         if not clean_result_text or clean_result_text.strip() == "":
@@ -46,9 +46,11 @@ def generate_workout_plan(profile_data: ProfileData) -> WorkoutPlan:
         try:
             result = json.loads(clean_result_text)
         except json.JSONDecodeError as e:
+            record_parse_failure("workout_plan")
             logging.error(f"JSON decode error: {e}")
-            logging.error(f"Failed to parse: {clean_result_text}")
+            log_payload("Failed to parse", clean_result_text, error=True)
             raise HTTPException(status_code=500, detail="Failed to generate workout plan. Please try again.")
+        clock.lap("parse")
 
         warmup_data = result.get("warmup")
         cardio_data = result.get("cardio")
@@ -104,6 +106,7 @@ def generate_workout_plan(profile_data: ProfileData) -> WorkoutPlan:
             workout_sessions=workout_sessions,
             cooldown=cooldown,
         )
+        clock.lap("validate")
 
     except Exception as e:
         logging.error(f"Exception (Generate Workouts): {str(e)}")
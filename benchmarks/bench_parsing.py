@@ -0,0 +1,218 @@
+"""
+Micro-benchmarks for the CPU-bound steps that run on every generation request.
+
+Each Gemini response goes through markdown cleaning (``clean_response_text``,
+with two regex substitutions in the workout service), ``json.loads`` and
+Pydantic construction before it is returned; the agent's structured output
+goes through ``validate_response_data``. This measures each step, and the
+whole post-model path of each service with the model call stubbed out, over
+synthetic payloads of increasing size (1-10 workout sessions, 1-30 day
+nutrition plans, 4-40 meal ingredients) from ``fake_gemini.py``.
+
+    python benchmarks/bench_parsing.py                        # compare with the stored baseline
+    python benchmarks/bench_parsing.py --save-baseline        # after an intended change
+    python benchmarks/bench_parsing.py --filter nutrition --json results.json
+
+Times are the best of ``--repeat`` runs, per call, in microseconds. The
+baseline (benchmarks/baselines/parsing.json) records the machine it was
+taken on; compare runs from the same machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCHMARKS_DIR, ".."))
+
+from fake_gemini import brand_recommendations, nutrition_plan, workout_plan  # noqa: E402
+
+from app.models.gemini_model import GeminiModel  # noqa: E402
+from app.schemas import nutrition, workout  # noqa: E402
+from app.schemas.meal import Meal  # noqa: E402
+from app.schemas.recommendations import RecommendedBrands  # noqa: E402
+from app.services import meal_service, nutrition_service, recommendation_service, workout_service  # noqa: E402
+from app.services.agent_service import validate_response_data  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baselines", "parsing.json")
+WORKOUT_SESSIONS = (1, 3, 5, 10)
+NUTRITION_DAYS = (1, 7, 14, 30)
+MEAL_INGREDIENTS = (4, 12, 40)
+WORKOUT_PROFILE = workout.ProfileData(weight=80, height=180, age=30, sex="male", goal="bulking", workouts_per_week=4)
+NUTRITION_PROFILE = nutrition.ProfileData(weight=80, height=180, age=30, sex="male", goal="bulking", duration_days=7)
+
+
+def _fenced(payload: dict) -> str:
+    return f"```json\n{json.dumps(payload, indent=2)}\n```"
+
+
+def _meal(rng: random.Random, ingredients: int) -> dict:
+    # Floats, as the model often returns them, so the rounding validators do work
+    per_ingredient = {f"ingredient {i}": round(rng.uniform(5, 300), 1) for i in range(ingredients)}
+    return {
+        "food_name": "Mixed grill platter",
+        "total_calories": round(sum(per_ingredient.values()), 1),
+        "sustainability": {"environmental_impact": "medium", "nutrition_impact": "low", "Overall_score": 55,
+                           "Description": "Mostly red meat with some vegetables."},
+        "calories_per_ingredient": per_ingredient,
+        "total_protein": 61.4, "total_carbohydrates": 48.2, "total_fats": 39.9,
+    }
+
+
+def cases(seed: int = 0) -> dict:
+    """name -> (zero-argument callable, payload size in bytes), with payloads generated from ``seed``"""
+    rng = random.Random(seed)
+    found = {}
+
+    for sessions in WORKOUT_SESSIONS:
+        text = _fenced(workout_plan(rng, sessions))
+        cleaned = workout_service.clean_response_text(text)
+        data = json.loads(cleaned)
+        size = len(text)
+        found[f"workout.clean[{sessions}s]"] = (lambda t=text: workout_service.clean_response_text(t), size)
+        found[f"workout.json_loads[{sessions}s]"] = (lambda c=cleaned: json.loads(c), size)
+        found[f"workout.model[{sessions}s]"] = (lambda d=data: workout.WorkoutPlan(**d), size)
+        found[f"workout.service[{sessions}s]"] = (
+            _ServiceCall(GeminiModel, "generate_workout_plan", text, workout_service.generate_workout_plan,
+                         WORKOUT_PROFILE), size)
+
+    for days in NUTRITION_DAYS:
+        text = _fenced(nutrition_plan(rng, days, date(2025, 6, 2)))
+        cleaned = nutrition_service.clean_response_text(text)
+        data = json.loads(cleaned)
+        size = len(text)
+        found[f"nutrition.clean[{days}d]"] = (lambda t=text: nutrition_service.clean_response_text(t), size)
+        found[f"nutrition.json_loads[{days}d]"] = (lambda c=cleaned: json.loads(c), size)
+        found[f"nutrition.model[{days}d]"] = (lambda d=data: nutrition.NutritionPlan(**d), size)
+        found[f"nutrition.service[{days}d]"] = (
+            _ServiceCall(GeminiModel, "generate_nutrition_plan", text, nutrition_service.generate_nutrition_plan,
+                         NUTRITION_PROFILE), size)
+        found[f"agent.validate_response_data[{days}d]"] = (lambda c=cleaned: validate_response_data(c), size)
+
+    for ingredients in MEAL_INGREDIENTS:
+        payload = _meal(rng, ingredients)
+        text = json.dumps(payload)
+        size = len(text)
+        found[f"meal.model[{ingredients}i]"] = (lambda p=payload: Meal(**p), size)
+        found[f"meal.service[{ingredients}i]"] = (
+            _ServiceCall(GeminiModel, "analyze_meal", text, meal_service.analyze_meal, b""), size)
+
+    text = _fenced(brand_recommendations(rng))
+    found["brands.clean"] = (lambda: recommendation_service.clean_response_text(text), len(text))
+    found["brands.model"] = (
+        lambda data=json.loads(recommendation_service.clean_response_text(text)): RecommendedBrands(**data), len(text))
+    found["brands.service"] = (
+        _ServiceCall(GeminiModel, "recommend_brands", text, recommendation_service.get_brand_recommendations, "dates"),
+        len(text))
+    found["agent.validate_response_data[dict]"] = (lambda: validate_response_data({"plan": "ok"}), 0)
+    return found
+
+
+class _ServiceCall:
+    """A call of ``service``; while measured, the model method answers ``model_text`` immediately."""
+
+    def __init__(self, target, method: str, model_text: str, service, argument):
+        # A plain function rather than a Mock, which would keep every call's arguments
+        self.stub = patch.object(target, method, staticmethod(lambda *args, **kwargs: model_text))
+        self.service = service
+        self.argument = argument
+
+    def __call__(self):
+        return self.service(self.argument)
+
+
+def measure(func, repeat: int) -> dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = sorted(seconds / number * 1e6 for seconds in timer.repeat(repeat=repeat, number=number))
+    return {"best_us": round(runs[0], 2), "median_us": round(runs[len(runs) // 2], 2), "calls_per_run": number}
+
+
+def run(filter_text: str = None, repeat: int = 5, seed: int = 0) -> dict:
+    results = {}
+    for name, (func, size) in cases(seed).items():
+        if filter_text and filter_text not in name:
+            continue
+        if isinstance(func, _ServiceCall):
+            with func.stub:
+                results[name] = {**measure(func, repeat), "payload_bytes": size}
+        else:
+            results[name] = {**measure(func, repeat), "payload_bytes": size}
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} {platform.processor() or ''}".strip(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.25) -> list:
+    """One row per benchmark in both reports; ``regression`` when the best time grew by more than ``threshold``."""
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["best_us"] / before["best_us"] if before["best_us"] else None
+        rows.append({"name": name, "baseline_us": before["best_us"], "current_us": result["best_us"],
+                     "ratio": round(ratio, 3) if ratio else None,
+                     "regression": ratio is not None and ratio > 1 + threshold})
+    return rows
+
+
+def print_results(report: dict, rows: list = None):
+    by_name = {row["name"]: row for row in rows or []}
+    print(f"{'benchmark':<40}{'bytes':>9}{'best us':>12}{'median us':>12}{'baseline':>12}{'ratio':>8}")
+    for name, result in report["results"].items():
+        row = by_name.get(name)
+        baseline = f"{row['baseline_us']:>12}{row['ratio']:>8}" if row else f"{'-':>12}{'-':>8}"
+        flag = "  SLOWER" if row and row["regression"] else ""
+        print(f"{name:<40}{result['payload_bytes']:>9}{result['best_us']:>12}{result['median_us']:>12}{baseline}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline report to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a slowdown")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.filter, args.repeat, args.seed)
+    rows = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        rows = compare(report, baseline, args.threshold)
+        print(f"Baseline: {args.baseline} ({baseline['meta']['created_at']}, {baseline['meta']['machine']}, "
+              f"Python {baseline['meta']['python']})")
+    print_results(report, rows)
+
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.fail_on_regression and any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Latency and payload-size benchmark for the Firestore-backed MCP tools.
+
+Runs the user-data tools against the in-memory Firestore stand-in, filled
+with synthetic history at one or more depths, so no Firebase project or
+credentials are needed. Each tool is measured with the per-user cache
+disabled (every call reaches the store) and enabled (steady state after a
+first miss). A fixed read latency can be injected to approximate the
+network round trip to Firestore.
+
+    python benchmarks/bench_user_tools.py --users 20 --days 30,180,365
+    python benchmarks/bench_user_tools.py --latency-ms 15 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils  # noqa: E402
+from fake_firestore import FakeStore  # noqa: E402
+from rollups import catch_up, get_user_rollups_async  # noqa: E402
+from synthetic_data import populate  # noqa: E402
+
+ROSTER_SIZE = 25
+
+
+def _tools(roster):
+    """name -> coroutine factory taking a user ID"""
+    return {
+        'profile': lambda u: mcp_utils.get_user_profile_async(u),
+        'workouts_page': lambda u: mcp_utils.get_user_workouts_page_async(u, 10),
+        'sleep_page': lambda u: mcp_utils.get_user_sleep_sessions_page_async(u, 10),
+        'food_log_7d': lambda u: mcp_utils.get_user_food_log_by_days_async(u, 7),
+        'food_log_30d': lambda u: mcp_utils.get_user_food_log_by_days_async(u, 30),
+        'training_volume_4w': lambda u: mcp_utils.get_training_volume_summary_async(u, 4),
+        'sleep_summary_30d': lambda u: mcp_utils.get_sleep_summary_async(u, 30),
+        'nutrition_adherence_14d': lambda u: mcp_utils.get_nutrition_adherence_summary_async(u, 14),
+        'rollups': lambda u: get_user_rollups_async(u),
+        f'roster_overview_{len(roster)}': lambda u: mcp_utils.get_roster_overview_async(roster),
+    }
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _measure(store, factory, user_ids, iterations):
+    timings, payloads, reads, read_bytes = [], [], [], []
+    for i in range(iterations):
+        user_id = user_ids[i % len(user_ids)]
+        before = store.stats()
+        started = time.perf_counter()
+        result = await factory(user_id)
+        timings.append((time.perf_counter() - started) * 1000)
+        payloads.append(len(json.dumps(result, default=str)))
+        after = store.stats()
+        reads.append(after['reads'] - before['reads'])
+        read_bytes.append(after['read_bytes'] - before['read_bytes'])
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'max_ms': round(max(timings), 3),
+        'payload_bytes': round(statistics.mean(payloads)),
+        'reads_per_call': round(statistics.mean(reads), 1),
+        'read_bytes_per_call': round(statistics.mean(read_bytes)),
+    }
+
+
+async def _run_depth(users, days, iterations, latency, seed):
+    store = FakeStore()
+    generated = populate(store.client(), users=users, days=days, seed=seed)
+    user_ids = generated['user_ids']
+    db = store.client()
+    for user_id in user_ids:
+        catch_up(user_id, db)
+    mcp_utils.use_firestore_clients(db, store.async_client())
+    store.read_latency = latency
+
+    results = {}
+    for name, factory in _tools(user_ids[:ROSTER_SIZE]).items():
+        results[name] = {}
+        for cached in (False, True):
+            mcp_utils.USER_CACHE_ENABLED = cached
+            mcp_utils.user_cache.clear()
+            if cached:
+                # Prime every user so the measured calls are steady-state hits
+                for user_id in user_ids:
+                    await factory(user_id)
+            results[name]['cached' if cached else 'uncached'] = await _measure(store, factory, user_ids, iterations)
+    return {'days': days, 'users': users, 'documents': generated['documents'], 'tools': results}
+
+
+def _print_report(report):
+    header = f"{'tool':<26}{'cache':<10}{'p50 ms':>10}{'p95 ms':>10}{'payload B':>12}{'reads':>8}{'read B':>10}"
+    for depth in report['depths']:
+        print(f"\n{depth['users']} users x {depth['days']} days  {depth['documents']}")
+        print(header)
+        for name, modes in depth['tools'].items():
+            for mode, row in modes.items():
+                print(f"{name:<26}{mode:<10}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+                      f"{row['payload_bytes']:>12}{row['reads_per_call']:>8}{row['read_bytes_per_call']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the user-data MCP tools on synthetic data.")
+    parser.add_argument("--users", type=int, default=20, help="Synthetic users per depth")
+    parser.add_argument("--days", default="30,180,365", help="Comma-separated history depths in days")
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per tool and cache mode")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected latency per Firestore read")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = {
+        'latency_ms': args.latency_ms,
+        'iterations': args.iterations,
+        'depths': [],
+    }
+    for days in (int(value) for value in args.days.split(",")):
+        report['depths'].append(asyncio.run(
+            _run_depth(args.users, days, args.iterations, args.latency_ms / 1000, args.seed)))
+
+    _print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Local stand-in for the Gemini API, for load testing the whole API.
+
+Serves ``models/{model}:generateContent`` and
+``models/{model}:streamGenerateContent`` in the wire format the genai client
+expects, so pointing the API at it with ``GEMINI_BASE_URL`` exercises the
+real client code path (request building, HTTP, response parsing) without
+spending quota. Answers are synthetic but schema-valid workout plans,
+nutrition plans, meal analyses and brand recommendations, chosen from the
+prompt; anything else gets a short text reply. Generation is seeded.
+
+Latency, error rates and stream chunking are configurable:
+
+    python benchmarks/fake_gemini.py --port 8090 \\
+        --latency "workout=lognormal:8000:0.35,nutrition=lognormal:20000:0.35,default=lognormal:1500:0.5" \\
+        --error-rate 0.02 --malformed-rate 0.01 --stream-chunks 8 --chunk-interval uniform:20:80
+
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8090 uvicorn app.main:app
+
+Latency specs are ``fixed:MS`` (or just ``MS``), ``uniform:LOW:HIGH``,
+``normal:MEAN:SD`` and ``lognormal:MEDIAN:SIGMA``, in milliseconds; a comma
+separated list of ``kind=spec`` sets them per payload kind (workout,
+nutrition, meal, brands, text) with ``default`` for the rest. For streamed
+calls the latency is the time to the first chunk.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_LATENCY = (
+    "workout=lognormal:8000:0.35,nutrition=lognormal:20000:0.35,meal=lognormal:5000:0.35,"
+    "brands=lognormal:4000:0.35,default=lognormal:1500:0.5"
+)
+ERROR_STATUSES = {
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+PAYLOAD_KINDS = ("workout", "nutrition", "meal", "brands", "text")
+IMAGE_TOKENS = 258
+
+EXERCISES = (
+    "Barbell Back Squat", "Dumbbell Bench Press", "Seated Cable Row", "Romanian Deadlift", "Overhead Press",
+    "Lat Pulldown", "Walking Lunges", "Incline Dumbbell Press", "Plank", "Hip Thrust", "Face Pull", "Goblet Squat",
+)
+MEALS = {
+    "breakfast": (
+        ("Overnight oats with dates and almonds", (("Rolled oats", "80 g", 300), ("Medjool dates", "2 pieces", 133),
+                                                    ("Almonds", "20 g", 116))),
+        ("Shakshuka with wholegrain bread", (("Eggs", "3 large", 216), ("Tomato sauce", "150 g", 75),
+                                             ("Wholegrain bread", "1 slice", 110))),
+    ),
+    "lunch": (
+        ("Grilled chicken machboos with brown rice", (("Chicken breast", "180 g", 297), ("Brown rice", "150 g", 167),
+                                                       ("Olive oil", "1 tbsp", 119))),
+        ("Lentil and quinoa salad", (("Cooked lentils", "150 g", 174), ("Quinoa", "100 g", 120),
+                                     ("Feta", "30 g", 79))),
+    ),
+    "dinner": (
+        ("Baked hammour with roasted vegetables", (("Hammour fillet", "200 g", 184), ("Sweet potato", "200 g", 172),
+                                                    ("Zucchini and peppers", "150 g", 45))),
+        ("Beef kofta with tabbouleh", (("Lean beef mince", "150 g", 255), ("Bulgur", "60 g", 68),
+                                       ("Parsley and tomato", "100 g", 25))),
+    ),
+    "snack": (
+        ("Greek yogurt with honey", (("Greek yogurt", "170 g", 100), ("Sidr honey", "1 tsp", 21))),
+        ("Hummus with carrot sticks", (("Hummus", "60 g", 150), ("Carrots", "100 g", 41))),
+    ),
+}
+BRANDS = ("Al Ain Farms", "Bayara", "Kibsons", "Organic Foods & Cafe", "Almarai", "Lulu", "Spinneys")
+
+
+class Latency:
+    """A latency distribution in milliseconds, parsed from a spec like ``lognormal:1500:0.5``."""
+
+    def __init__(self, spec: str):
+        parts = str(spec).split(":")
+        if len(parts) == 1:
+            parts = ["fixed", parts[0]]
+        self.kind, params = parts[0], [float(value) for value in parts[1:]]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if expected.get(self.kind) != len(params):
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.params = params
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        """One latency, in seconds."""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return max(0.0, ms) / 1000
+
+
+def parse_latencies(spec: str) -> dict:
+    """``kind=spec,...`` (or a single spec for every kind) -> {kind: Latency}, always with a "default"."""
+    if "=" not in spec:
+        return {"default": Latency(spec)}
+    latencies = {}
+    for item in spec.split(","):
+        kind, _, value = item.partition("=")
+        kind = kind.strip()
+        if kind not in PAYLOAD_KINDS + ("default",):
+            raise ValueError(f"Unknown payload kind in latency spec: {kind}")
+        latencies[kind] = Latency(value.strip())
+    latencies.setdefault("default", Latency("0"))
+    return latencies
+
+
+# -- synthetic payloads ---------------------------------------------------------
+
+
+def classify_prompt(prompt: str) -> str:
+    if "workout plan" in prompt:
+        return "workout"
+    if "nutrition plan" in prompt:
+        return "nutrition"
+    if "meal image" in prompt:
+        return "meal"
+    if "brands for the product" in prompt:
+        return "brands"
+    return "text"
+
+
+def workout_plan(rng: random.Random, sessions: int) -> dict:
+    return {
+        "warmup": {"description": "Brisk walking followed by dynamic mobility drills.", "duration": rng.randint(5, 10)},
+        "cardio": {"description": "Zone 2 cycling at a conversational pace.", "duration": rng.choice((15, 20, 30))},
+        "sessions_per_week": sessions,
+        "workout_sessions": [
+            {"exercises": [
+                {"name": name, "sets": rng.randint(3, 5), "reps": rng.choice(("6-8", "8-10", "10-12", "12-15")),
+                 "rest": rng.choice((60, 90, 120, 180))}
+                for name in rng.sample(EXERCISES, rng.randint(4, 6))
+            ]}
+            for _ in range(sessions)
+        ],
+        "cooldown": {"description": "Static stretching for the muscles trained.", "duration": rng.randint(5, 10)},
+    }
+
+
+def _meal_option(rng: random.Random, slot: str) -> dict:
+    description, items = rng.choice(MEALS[slot])
+    ingredients = [{"ingredient": name, "quantity": quantity, "calories": calories}
+                   for name, quantity, calories in items]
+    return {
+        "description": description,
+        "ingredients": ingredients,
+        "total_calories": sum(item["calories"] for item in ingredients),
+        "recipe": f"Prepare the {description.lower()} in about {rng.randint(10, 40)} minutes.",
+        "suggested_brands": rng.sample(BRANDS, 2),
+    }
+
+
+def nutrition_plan(rng: random.Random, days: int, start: date) -> dict:
+    plans = []
+    for day in range(days):
+        meals = {slot: _meal_option(rng, slot) for slot in ("breakfast", "lunch", "dinner")}
+        snacks = [_meal_option(rng, "snack") for _ in range(rng.randint(1, 2))]
+        total = sum(meal["total_calories"] for meal in meals.values()) + sum(s["total_calories"] for s in snacks)
+        plans.append({
+            "day": day + 1,
+            "date": str(start + timedelta(days=day)),
+            **meals,
+            "snacks": snacks,
+            "total_daily_calories": total,
+            "daily_macros": {"protein": round(total * 0.3 / 4), "carbohydrates": round(total * 0.45 / 4),
+                             "fat": round(total * 0.25 / 9)},
+        })
+    return {
+        "daily_calories_range": {"min": 2000, "max": 2400},
+        "macronutrients_range": {"protein": {"min": 140, "max": 170}, "carbohydrates": {"min": 220, "max": 280},
+                                 "fat": {"min": 60, "max": 80}},
+        "daily_meal_plans": plans,
+        "total_days": days,
+    }
+
+
+def meal_analysis(rng: random.Random) -> dict:
+    ingredients = {"chicken shawarma": rng.randint(220, 300), "markook bread": rng.randint(150, 200),
+                   "garlic sauce": rng.randint(80, 130), "pickles": rng.randint(5, 20)}
+    return {
+        "food_name": "Chicken shawarma wrap (1 wrap)",
+        "total_calories": sum(ingredients.values()),
+        "sustainability": {"environmental_impact": rng.choice(("low", "medium", "high")),
+                           "nutrition_impact": rng.choice(("low", "medium", "high")),
+                           "Overall_score": rng.randint(30, 90),
+                           "Description": "Poultry has a moderate footprint; the sauce adds saturated fat."},
+        "calories_per_ingredient": ingredients,
+        "total_protein": rng.randint(30, 45),
+        "total_carbohydrates": rng.randint(45, 65),
+        "total_fats": rng.randint(18, 32),
+    }
+
+
+def brand_recommendations(rng: random.Random) -> dict:
+    return {"brands": [
+        {"name": name, "price": round(rng.uniform(5, 40), 2),
+         "sustainability_rating": rng.choice(("Excellent", "Good", "Fair")),
+         "description": f"{name} is widely available in the UAE with responsible sourcing."}
+        for name in rng.sample(BRANDS, rng.randint(3, 5))
+    ]}
+
+
+def synthetic_reply(rng: random.Random, prompt: str) -> tuple:
+    """(payload kind, response text) for a prompt, in the shape the matching service expects."""
+    kind = classify_prompt(prompt)
+    if kind == "workout":
+        sessions = re.search(r"include (\d+) sessions per week", prompt)
+        payload = workout_plan(rng, int(sessions.group(1)) if sessions else 3)
+    elif kind == "nutrition":
+        days = re.search(r"(\d+)-day nutrition plan", prompt)
+        start = re.search(r'"date": "(\d{4}-\d{2}-\d{2})"', prompt)
+        start = datetime.strptime(start.group(1), "%Y-%m-%d").date() if start else date.today()
+        payload = nutrition_plan(rng, int(days.group(1)) if days else 7, start)
+    elif kind == "meal":
+        payload = meal_analysis(rng)
+    elif kind == "brands":
+        payload = brand_recommendations(rng)
+    else:
+        return kind, "This is a synthetic reply from the local Gemini stand-in."
+    text = json.dumps(payload, indent=2)
+    # The real model fences JSON about half the time; the services strip it
+    if kind in ("workout", "brands") and rng.random() < 0.5:
+        text = f"```json\n{text}\n```"
+    return kind, text
+
+
+# -- server -----------------------------------------------------------------------
+
+
+class FakeGeminiSettings:
+    """
+    Behaviour of the stand-in.
+
+    Args:
+        latency: Latency spec (see module docstring)
+        error_rate: Fraction of calls answered with an API error instead
+        error_statuses: HTTP statuses errors are drawn from
+        malformed_rate: Fraction of successful calls whose text is cut short (invalid JSON)
+        stream_chunks: Chunks a streamed response is split into
+        chunk_interval: Latency spec for the gap between streamed chunks
+        seed: Seed for payloads, latencies and errors
+    """
+
+    def __init__(self, latency: str = DEFAULT_LATENCY, error_rate: float = 0.0, error_statuses=(429, 500, 503),
+                 malformed_rate: float = 0.0, stream_chunks: int = 8, chunk_interval: str = "fixed:50",
+                 seed: int = 0):
+        self.latencies = parse_latencies(latency)
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.malformed_rate = malformed_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self.chunk_interval = Latency(chunk_interval)
+        self.seed = seed
+
+    def latency(self, kind: str) -> Latency:
+        return self.latencies.get(kind, self.latencies["default"])
+
+
+def _prompt_parts(body: dict) -> tuple:
+    texts, images = [], 0
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+            elif "inlineData" in part or "inline_data" in part:
+                images += 1
+    return "\n".join(texts), images
+
+
+def _chunk(text: str, model: str, response_id: str, finish: bool = False, usage: dict = None) -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    chunk = {"candidates": [candidate], "modelVersion": model, "responseId": response_id}
+    if usage:
+        chunk["usageMetadata"] = usage
+    return chunk
+
+
+def create_app(settings: FakeGeminiSettings = None) -> FastAPI:
+    settings = settings or FakeGeminiSettings()
+    rng = random.Random(settings.seed)
+    stats = Counter()
+    api = FastAPI(title="Fake Gemini")
+
+    def error_response(status: int) -> JSONResponse:
+        stats["errors"] += 1
+        return JSONResponse(status_code=status, content={"error": {
+            "code": status, "message": "Injected error from the local Gemini stand-in",
+            "status": ERROR_STATUSES.get(status, "UNKNOWN")}})
+
+    @api.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @api.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @api.post("/{api_version}/models/{model_action}")
+    async def models(api_version: str, model_action: str, request: Request):
+        model, _, action = model_action.rpartition(":")
+        if action not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse(status_code=404, content={"error": {
+                "code": 404, "message": f"Unsupported method: {action}", "status": "NOT_FOUND"}})
+        prompt, images = _prompt_parts(await request.json())
+        kind, text = synthetic_reply(rng, prompt)
+        stats[f"requests.{kind}"] += 1
+        latency = settings.latency(kind).sample(rng)
+
+        if rng.random() < settings.error_rate:
+            await asyncio.sleep(latency)
+            return error_response(rng.choice(settings.error_statuses))
+        if rng.random() < settings.malformed_rate:
+            stats["malformed"] += 1
+            text = text[: len(text) // 2]
+
+        candidates_tokens = max(1, len(text) // 4)
+        thoughts_tokens = rng.randint(0, 2 * candidates_tokens) if kind != "text" else 0
+        prompt_tokens = max(1, len(prompt) // 4) + IMAGE_TOKENS * images
+        usage = {"promptTokenCount": prompt_tokens, "candidatesTokenCount": candidates_tokens,
+                 "thoughtsTokenCount": thoughts_tokens,
+                 "totalTokenCount": prompt_tokens + candidates_tokens + thoughts_tokens}
+        response_id = uuid.uuid4().hex[:16]
+
+        if action == "generateContent":
+            await asyncio.sleep(latency)
+            return _chunk(text, model, response_id, finish=True, usage=usage)
+
+        stats["streams"] += 1
+        size = math.ceil(len(text) / settings.stream_chunks)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        gaps = [settings.chunk_interval.sample(rng) for _ in pieces[1:]]
+
+        async def events():
+            await asyncio.sleep(latency)
+            for index, piece in enumerate(pieces):
+                if index:
+                    await asyncio.sleep(gaps[index - 1])
+                last = index == len(pieces) - 1
+                chunk = _chunk(piece, model, response_id, finish=last, usage=usage if last else None)
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return api
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help="Latency spec, per payload kind or for all")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with an error")
+    parser.add_argument("--error-statuses", default="429,500,503", help="Comma-separated HTTP statuses")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of calls whose JSON is cut short")
+    parser.add_argument("--stream-chunks", type=int, default=8)
+    parser.add_argument("--chunk-interval", default="fixed:50", help="Latency spec between streamed chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = FakeGeminiSettings(
+        latency=args.latency, error_rate=args.error_rate,
+        error_statuses=[int(status) for status in args.error_statuses.split(",")],
+        malformed_rate=args.malformed_rate, stream_chunks=args.stream_chunks,
+        chunk_interval=args.chunk_interval, seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+Load test for the API: weighted traffic mixes at a target request rate.
+
+Sends an open-loop stream of requests (fixed or Poisson arrivals) drawn from
+a weighted mix of the generation and lookup endpoints, and reports p50, p95
+and p99 latency, throughput and error rates per endpoint, plus the resident
+memory of each server process when their PIDs are known. The report is JSON
+so runs on different commits can be compared.
+
+Against a running API:
+
+    python benchmarks/load_test.py run --url http://127.0.0.1:8000 --rps 20 --duration 60 --out load.json
+
+Or let the harness start the local Gemini stand-in (benchmarks/fake_gemini.py)
+and the API with several workers, so no quota is spent:
+
+    python benchmarks/load_test.py run --spawn --workers 2 --rps 20 --duration 60 --out load.json
+
+Compare two reports; exits non-zero when p95 latency, throughput or the
+error rate regressed beyond the thresholds:
+
+    python benchmarks/load_test.py compare load.json baseline.json
+
+Mixes are a preset name (see MIXES) or ``endpoint=weight,...``. Latency
+percentiles are over successful (2xx) responses; everything else counts as
+an error, by status or exception type.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MEAL_IMAGE = os.path.join(REPO_ROOT, "tests", "test_image.jpg")
+
+MIXES = {
+    # Roughly the production split between the endpoints
+    "default": {"workout": 3, "nutrition": 2, "meal": 2, "brands": 2, "agent": 1},
+    "plans": {"workout": 1, "nutrition": 1},
+    "meals": {"meal": 1},
+    "lookup": {"brands": 1},
+    "agent": {"agent": 1},
+}
+GOALS = ("muscle building", "fat loss", "bulking", "shredding", "maintenance")
+PRODUCTS = ("greek yogurt", "olive oil", "dates", "oat milk", "brown rice", "almonds", "hummus")
+AGENT_MESSAGES = (
+    "Build me a 3 day push pull legs routine",
+    "What should I eat before a morning run?",
+    "How many grams of protein do I need per day?",
+    "Suggest a high protein vegetarian dinner",
+)
+RSS_SAMPLE_INTERVAL = 0.5
+
+
+def _profile(rng: random.Random) -> dict:
+    return {
+        "weight": round(rng.uniform(50, 110), 1),
+        "height": rng.randint(150, 200),
+        "age": rng.randint(18, 65),
+        "sex": rng.choice(("male", "female")),
+        "goal": rng.choice(GOALS),
+    }
+
+
+def _workout(rng, image):
+    return {"method": "POST", "url": "/workout-plans/generate",
+            "json": {**_profile(rng), "workouts_per_week": rng.randint(2, 6)}}
+
+
+def _nutrition(rng, image):
+    return {"method": "POST", "url": "/nutrition-plans/generate",
+            "json": {**_profile(rng), "duration_days": rng.choice((1, 3, 7))}}
+
+
+def _meal(rng, image):
+    return {"method": "POST", "url": "/meals/analyze", "files": {"file": ("meal.jpg", image, "image/jpeg")}}
+
+
+def _brands(rng, image):
+    return {"method": "GET", "url": "/recommendations/brands", "params": {"product": rng.choice(PRODUCTS)}}
+
+
+def _agent(rng, image):
+    return {"method": "POST", "url": "/agent/generate", "params": {"user_message": rng.choice(AGENT_MESSAGES)}}
+
+
+ENDPOINTS = {
+    "workout": _workout,
+    "nutrition": _nutrition,
+    "meal": _meal,
+    "brands": _brands,
+    "agent": _agent,
+}
+
+
+def parse_mix(spec: str) -> dict:
+    """A preset name or ``endpoint=weight,...`` -> {endpoint: weight}."""
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (expected one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def arrival_offsets(rps: float, duration: float, arrivals: str, rng: random.Random) -> list:
+    """Send times, in seconds from the start, for ``rps`` requests per second over ``duration``."""
+    if arrivals == "constant":
+        return [i / rps for i in range(int(rps * duration))]
+    offsets, t = [], rng.expovariate(rps)
+    while t < duration:
+        offsets.append(t)
+        t += rng.expovariate(rps)
+    return offsets
+
+
+async def run_load(client: httpx.AsyncClient, mix: dict, rps: float, duration: float, arrivals: str = "constant",
+                   users: int = 50, max_in_flight: int = 512, seed: int = 0) -> dict:
+    """
+    Drive ``client`` with the mix for ``duration`` seconds.
+
+    Returns:
+        dict: ``samples`` as (endpoint, start offset s, latency s, outcome) tuples, where the outcome is
+        the HTTP status or an exception name; ``dropped`` requests not sent because ``max_in_flight``
+        were outstanding; and the ``wall_seconds`` the run took
+    """
+    rng = random.Random(seed)
+    with open(MEAL_IMAGE, "rb") as file:
+        image = file.read()
+    names, weights = list(mix), list(mix.values())
+    samples, tasks = [], set()
+    dropped = Counter()
+
+    async def send(name, offset, request, user):
+        started = time.perf_counter()
+        try:
+            response = await client.request(headers={"X-User-ID": user}, **request)
+            outcome = response.status_code
+        except Exception as e:
+            outcome = type(e).__name__
+        samples.append((name, offset, time.perf_counter() - started, outcome))
+
+    t0 = time.perf_counter()
+    for offset in arrival_offsets(rps, duration, arrivals, rng):
+        delay = t0 + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = rng.choices(names, weights)[0]
+        if len(tasks) >= max_in_flight:
+            dropped[name] += 1
+            continue
+        request = ENDPOINTS[name](rng, image)
+        task = asyncio.create_task(send(name, offset, request, f"loadtest-user-{rng.randrange(users)}"))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+    return {"samples": samples, "dropped": dict(dropped), "wall_seconds": time.perf_counter() - t0}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _summary(rows, wall_seconds, dropped=0) -> dict:
+    latencies = [latency * 1000 for _, _, latency, outcome in rows if isinstance(outcome, int) and outcome < 300]
+    outcomes = Counter(str(outcome) for *_, outcome in rows)
+    errors = len(rows) - len(latencies)
+    summary = {
+        "requests": len(rows),
+        "succeeded": len(latencies),
+        "errors": errors,
+        "dropped": dropped,
+        "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+        "throughput_rps": round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+        "outcomes": dict(sorted(outcomes.items())),
+    }
+    if latencies:
+        summary.update({
+            "p50_ms": round(_percentile(latencies, 50), 1),
+            "p95_ms": round(_percentile(latencies, 95), 1),
+            "p99_ms": round(_percentile(latencies, 99), 1),
+            "mean_ms": round(sum(latencies) / len(latencies), 1),
+            "max_ms": round(max(latencies), 1),
+        })
+    return summary
+
+
+def summarize(result: dict) -> dict:
+    """Overall and per-endpoint summaries of a ``run_load`` result."""
+    by_endpoint = defaultdict(list)
+    for row in result["samples"]:
+        by_endpoint[row[0]].append(row)
+    wall = result["wall_seconds"]
+    return {
+        "overall": _summary(result["samples"], wall, sum(result["dropped"].values())),
+        "endpoints": {name: _summary(rows, wall, result["dropped"].get(name, 0))
+                      for name, rows in sorted(by_endpoint.items())},
+    }
+
+
+# -- server memory ----------------------------------------------------------------
+
+
+def _rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def _role(pid: int, root_pid: int) -> str:
+    if pid == root_pid:
+        return "main"
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as file:
+            cmdline = file.read()
+    except OSError:
+        cmdline = b""
+    # multiprocessing's resource tracker is a child of uvicorn's supervisor too
+    return "helper" if b"resource_tracker" in cmdline else "worker"
+
+
+def process_tree(pid: int) -> list:
+    """``pid`` and its descendants (uvicorn's worker processes), from /proc."""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as file:
+                    pending.extend(int(child) for child in file.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+class RssSampler:
+    """Peak and last resident memory of a server's processes, sampled in a background thread (Linux only)."""
+
+    def __init__(self, root_pid: int, interval: float = RSS_SAMPLE_INTERVAL):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak, self.last, self.roles = {}, {}, {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        for pid in process_tree(self.root_pid):
+            rss = _rss_mb(pid)
+            if rss is not None:
+                self.roles.setdefault(pid, _role(pid, self.root_pid))
+                self.last[pid] = rss
+                self.peak[pid] = max(rss, self.peak.get(pid, 0))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def report(self) -> dict:
+        return {str(pid): {"role": self.roles[pid],
+                           "peak_rss_mb": round(self.peak[pid], 1), "last_rss_mb": round(self.last.get(pid, 0), 1)}
+                for pid in sorted(self.peak)}
+
+
+# -- spawned servers --------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with status {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not healthy after {timeout:.0f}s")
+
+
+def spawn_servers(workers: int, fake_gemini_args: list) -> tuple:
+    """Start the Gemini stand-in and the API behind it; returns (API url, API process, all processes)."""
+    fake_port, api_port = _free_port(), _free_port()
+    fake = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "benchmarks", "fake_gemini.py"),
+                             "--port", str(fake_port), *fake_gemini_args])
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "fake",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        # Measure capacity, not the per-caller token buckets
+        "ADMISSION_GENERATION_RATE": os.environ.get("ADMISSION_GENERATION_RATE", "0"),
+        "ADMISSION_LOOKUP_RATE": os.environ.get("ADMISSION_LOOKUP_RATE", "0"),
+    }
+    api = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port),
+                            "--workers", str(workers), "--log-level", "warning"], cwd=REPO_ROOT, env=env)
+    processes = [api, fake]
+    try:
+        _wait_healthy(f"http://127.0.0.1:{fake_port}/healthz", fake)
+        _wait_healthy(f"http://127.0.0.1:{api_port}/healthz", api)
+    except Exception:
+        stop_servers(processes)
+        raise
+    return f"http://127.0.0.1:{api_port}", api, processes
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# -- reports ----------------------------------------------------------------------
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict):
+    print(f"\n{report['meta']['rps']} rps for {report['meta']['duration_s']}s, mix {report['meta']['mix']}")
+    print(f"{'endpoint':<12}{'requests':>10}{'ok/s':>8}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in [*report["endpoints"].items(), ("overall", report["overall"])]:
+        print(f"{name:<12}{row['requests']:>10}{row['throughput_rps']:>8}{row['error_rate']:>9.1%}"
+              f"{row.get('p50_ms', '-'):>10}{row.get('p95_ms', '-'):>10}{row.get('p99_ms', '-'):>10}")
+    for pid, rss in report.get("rss", {}).items():
+        print(f"pid {pid} ({rss['role']}): peak {rss['peak_rss_mb']} MB, last {rss['last_rss_mb']} MB")
+
+
+def compare(current: dict, baseline: dict, latency_threshold: float = 0.10, throughput_threshold: float = 0.10,
+            error_rate_threshold: float = 0.01) -> list:
+    """
+    Compare two reports, overall and per endpoint.
+
+    Returns:
+        list: One row per (scope, metric) with both values, the relative change and whether it is a regression
+    """
+    rows = []
+    scopes = [("overall", current["overall"], baseline["overall"])] + [
+        (name, row, baseline["endpoints"][name])
+        for name, row in current["endpoints"].items() if name in baseline["endpoints"]]
+    for scope, now, before in scopes:
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "error_rate"):
+            if metric not in now or metric not in before:
+                continue
+            change = (now[metric] - before[metric]) / before[metric] if before[metric] else None
+            if metric == "error_rate":
+                regression = now[metric] - before[metric] > error_rate_threshold
+            elif metric == "throughput_rps":
+                regression = change is not None and change < -throughput_threshold
+            else:
+                regression = metric != "p50_ms" and change is not None and change > latency_threshold
+            rows.append({"scope": scope, "metric": metric, "baseline": before[metric], "current": now[metric],
+                         "change": round(change, 4) if change is not None else None, "regression": regression})
+    return rows
+
+
+def print_comparison(rows: list):
+    print(f"{'scope':<12}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['scope']:<12}{row['metric']:<16}{row['baseline']:>12}{row['current']:>12}{change:>10}{flag}")
+
+
+def _run(args):
+    mix = parse_mix(args.mix)
+    processes, server_pid, url = [], args.pid, args.url
+    if args.spawn:
+        url, api, processes = spawn_servers(args.workers, args.fake_gemini_args.split())
+        server_pid = api.pid
+    try:
+        async def drive():
+            timeout = httpx.Timeout(args.timeout)
+            limits = httpx.Limits(max_connections=args.max_in_flight)
+            async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+                return await run_load(client, mix, args.rps, args.duration, args.arrivals, args.users,
+                                      args.max_in_flight, args.seed)
+
+        if server_pid and os.path.isdir("/proc"):
+            with RssSampler(server_pid) as sampler:
+                result = asyncio.run(drive())
+            rss = sampler.report()
+        else:
+            result = asyncio.run(drive())
+            rss = {}
+    finally:
+        stop_servers(processes)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "url": url, "spawned": args.spawn, "workers": args.workers if args.spawn else None,
+            "rps": args.rps, "duration_s": args.duration, "arrivals": args.arrivals, "mix": mix,
+            "users": args.users, "seed": args.seed,
+        },
+        **summarize(result),
+        "rss": rss,
+    }
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+def _compare(args):
+    with open(args.current) as file:
+        current = json.load(file)
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    rows = compare(current, baseline, args.latency_threshold, args.throughput_threshold, args.error_rate_threshold)
+    print_comparison(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a load test")
+    run.add_argument("--url", default="http://127.0.0.1:8000", help="API to load (ignored with --spawn)")
+    run.add_argument("--pid", type=int, help="PID of the API's main process, for per-worker RSS")
+    run.add_argument("--spawn", action="store_true", help="Start the Gemini stand-in and the API")
+    run.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    run.add_argument("--fake-gemini-args", default="", help="Extra arguments for fake_gemini.py with --spawn")
+    run.add_argument("--mix", default="default", help=f"Preset ({', '.join(MIXES)}) or endpoint=weight,...")
+    run.add_argument("--rps", type=float, default=10.0, help="Target requests per second")
+    run.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    run.add_argument("--arrivals", choices=("constant", "poisson"), default="constant")
+    run.add_argument("--users", type=int, default=50, help="Distinct X-User-ID values to spread requests over")
+    run.add_argument("--max-in-flight", type=int, default=512, help="Outstanding requests before sends are dropped")
+    run.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--out", help="Write the JSON report to this file")
+
+    diff = commands.add_parser("compare", help="Compare a report with a baseline report")
+    diff.add_argument("current")
+    diff.add_argument("baseline")
+    diff.add_argument("--latency-threshold", type=float, default=0.10, help="Allowed relative p95/p99 increase")
+    diff.add_argument("--throughput-threshold", type=float, default=0.10, help="Allowed relative throughput drop")
+    diff.add_argument("--error-rate-threshold", type=float, default=0.01, help="Allowed absolute error-rate increase")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        _run(args)
+    else:
+        sys.exit(_compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Record a cassette of real Gemini (and optionally MCP) calls.
+
+Runs each generation service once per sample profile against the real
+APIs and stores the responses, token counts and latencies in a cassette
+that tests and benchmarks can replay offline:
+
+    GEMINI_API_KEY=... python benchmarks/record_cassettes.py --out tests/cassettes/recorded.json
+    python benchmarks/record_cassettes.py --roster user-1,user-2   # also record a roster call
+
+Replay it with ``CASSETTE_MODE=replay CASSETTE_PATH=<file>`` (see README).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.schemas import nutrition, workout  # noqa: E402
+from app.schemas.coach import RosterRequest  # noqa: E402
+from app.services.cassettes import Cassette, use_cassette  # noqa: E402
+from app.services.coach_service import get_roster_overview  # noqa: E402
+from app.services.meal_service import analyze_meal  # noqa: E402
+from app.services.nutrition_service import generate_nutrition_plan  # noqa: E402
+from app.services.recommendation_service import get_brand_recommendations  # noqa: E402
+from app.services.workout_service import generate_workout_plan  # noqa: E402
+
+PROFILES = [
+    {"weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "muscle building", "workouts_per_week": 4,
+     "equipment": ["barbell", "dumbbells"], "duration_days": 3},
+    {"weight": 62, "height": 165, "age": 41, "sex": "female", "goal": "fat loss", "workouts_per_week": 3,
+     "dietary_preferences": ["vegetarian"], "duration_days": 7},
+]
+PRODUCTS = ["greek yogurt", "olive oil"]
+MEAL_IMAGE = os.path.join(os.path.dirname(__file__), "..", "tests", "test_image.jpg")
+
+
+def _record(label, func, *args):
+    started = time.perf_counter()
+    try:
+        result = func(*args)
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+        print(f"  {label:<40} {time.perf_counter() - started:6.1f}s")
+    except Exception as e:
+        print(f"  {label:<40} failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="tests/cassettes/recorded.json", help="Cassette file (appended to)")
+    parser.add_argument("--roster", help="Comma-separated user IDs; records get_roster_overview_tool via MCP")
+    args = parser.parse_args()
+
+    with use_cassette(Cassette(args.out, "record")) as cassette:
+        for profile in PROFILES:
+            _record(f"workout plan ({profile['goal']})", generate_workout_plan, workout.ProfileData(**profile))
+            _record(f"nutrition plan ({profile['duration_days']} days)", generate_nutrition_plan,
+                    nutrition.ProfileData(**profile))
+        for product in PRODUCTS:
+            _record(f"brands ({product})", get_brand_recommendations, product)
+        with open(MEAL_IMAGE, "rb") as image:
+            _record("meal analysis", analyze_meal, image.read())
+        if args.roster:
+            _record("roster overview", get_roster_overview, RosterRequest(user_ids=args.roster.split(",")))
+
+    print(f"Recorded {cassette.stats['recorded']} interactions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
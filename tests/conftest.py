@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Keep the SQLite stores the API opens on first use out of app/data
+_store_dir = tempfile.mkdtemp(prefix="fitness-tribe-tests-")
+os.environ.setdefault("PLAN_STORE_PATH", os.path.join(_store_dir, "plans.sqlite3"))
+os.environ.setdefault("JOB_STORE", "memory")
+
+# Every TestClient request comes from the same caller; don't rate-limit the suite
+os.environ.setdefault("ADMISSION_GENERATION_RATE", "0")
+
+# Don't build the Gemini client or contact an MCP server when a TestClient starts the app
+os.environ.setdefault("WARMUP_ENABLED", "false")
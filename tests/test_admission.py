@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    CallerIdentities,
+    ConcurrencyLimiter,
+    TokenBuckets,
+    _parse_networks,
+    client_address,
+)
+
+
+def test_limiter_queues_then_rejects_when_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=5)
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after >= 1
+
+        limiter.release(0.5)
+        await queued
+        assert (limiter.in_flight, limiter.queue_depth) == (1, 0)
+        limiter.release(0.5)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == {"queue_full": 1, "queue_timeout": 0}
+    assert stats["max_queue_depth_seen"] == 1
+
+
+def test_limiter_queue_timeout_frees_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=4, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_timeout"
+        assert limiter.queue_depth == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_per_caller():
+    buckets = TokenBuckets(rate=1, burst=2)
+    buckets.take("a")
+    buckets.take("a")
+    with pytest.raises(AdmissionRejected) as rejected:
+        buckets.take("a")
+    assert rejected.value.reason == "rate_limited"
+    assert 0 < rejected.value.retry_after <= 1
+    buckets.take("b")
+    assert buckets.stats()["rejected"] == 1
+
+
+def test_middleware_returns_429_with_retry_after():
+    api = FastAPI()
+
+    @api.post("/meals/analyze")
+    async def analyze():
+        return {"ok": True}
+
+    @api.get("/")
+    async def root():
+        return {"ok": True}
+
+    controller = AdmissionController({"uploads": (("/meals/analyze",), 4, 4, 1.0, 0.001, 2)})
+    api.add_middleware(AdmissionMiddleware, controller=controller)
+    client = TestClient(api)
+
+    headers = {"X-API-Key": "coach-1"}
+    assert client.post("/meals/analyze", headers=headers).status_code == 200
+    assert client.post("/meals/analyze", headers=headers).status_code == 200
+    response = client.post("/meals/analyze", headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other callers and unclassified paths are unaffected
+    assert client.post("/meals/analyze", headers={"X-API-Key": "coach-2"}).status_code == 200
+    assert all(client.get("/").status_code == 200 for _ in range(5))
+    assert controller.stats()["uploads"]["concurrency"]["in_flight"] == 0
+
+
+def scope_from(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded or []]
+    return {"type": "http", "client": (peer, 50000), "headers": headers}
+
+
+def test_client_address_uses_forwarded_for_only_behind_trusted_proxies():
+    proxies = _parse_networks("10.0.0.0/8, 192.168.1.5")
+
+    # A direct client cannot pick its own address
+    assert client_address(scope_from("203.0.113.9", ["1.2.3.4"]), proxies) == "203.0.113.9"
+    # Behind the load balancer, the right-most untrusted hop is the client
+    assert client_address(scope_from("10.0.0.2", ["198.51.100.7"]), proxies) == "198.51.100.7"
+    # Entries the client prepended itself are ignored
+    assert client_address(scope_from("10.0.0.2", ["1.2.3.4, 198.51.100.7, 192.168.1.5"]), proxies) == "198.51.100.7"
+    assert client_address(scope_from("10.0.0.2", ["1.2.3.4", "198.51.100.7"]), proxies) == "198.51.100.7"
+    assert client_address(scope_from("10.0.0.2"), proxies) == "10.0.0.2"
+
+
+def test_rotating_header_identities_share_the_address_bucket():
+    identities = CallerIdentities(max_per_address=2, window=60)
+
+    assert identities.resolve("1.1.1.1", "user:a", now=0) == "user:a"
+    assert identities.resolve("1.1.1.1", "user:b", now=1) == "user:b"
+    assert identities.resolve("1.1.1.1", "user:c", now=2) == "ip:1.1.1.1"
+    assert identities.resolve("1.1.1.1", "user:a", now=3) == "user:a"
+    # Another address has its own allowance, and idle identities are forgotten
+    assert identities.resolve("2.2.2.2", "user:c", now=4) == "user:c"
+    assert identities.resolve("1.1.1.1", "user:c", now=100) == "user:c"
+    assert identities.resolve("1.1.1.1", None, now=100) == "ip:1.1.1.1"
+    assert identities.stats() == {"addresses": 2, "overflowed": 1}
+
+
+def test_middleware_limits_each_forwarded_client(monkeypatch):
+    monkeypatch.setattr("app.middleware.admission.TRUSTED_PROXIES", _parse_networks("10.0.0.0/8"))
+    api = FastAPI()
+
+    @api.post("/meals/analyze")
+    async def analyze():
+        return {"ok": True}
+
+    controller = AdmissionController({"uploads": (("/meals/analyze",), 4, 4, 1.0, 0.001, 1)})
+    controller.identities = CallerIdentities(max_per_address=1, window=60)
+    api.add_middleware(AdmissionMiddleware, controller=controller)
+    # Every request arrives from the load balancer
+    client = TestClient(api, client=("10.0.0.2", 50000))
+
+    def post(forwarded_for, user_id=None):
+        headers = {"X-Forwarded-For": forwarded_for, **({"X-User-Id": user_id} if user_id else {})}
+        return client.post("/meals/analyze", headers=headers).status_code
+
+    # Anonymous callers behind the proxy get a bucket each
+    assert [post("198.51.100.1"), post("198.51.100.2")] == [200, 200]
+    assert post("198.51.100.1") == 429
+
+    # A second, made-up identity from the same address falls back to the address bucket
+    assert post("198.51.100.3", "u1") == 200
+    assert post("198.51.100.3", "u2") == 200
+    assert post("198.51.100.3", "u3") == 429
@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from bench_parsing import BASELINE_PATH, _ServiceCall, cases, compare  # noqa: E402
+
+from app.schemas.nutrition import NutritionPlan  # noqa: E402
+
+
+def test_every_case_runs_on_its_payload():
+    found = cases()
+    for name, (func, size) in found.items():
+        if isinstance(func, _ServiceCall):
+            with func.stub:
+                result = func()
+        else:
+            result = func()
+        assert result is not None, name
+
+    func, _ = found["nutrition.service[30d]"]
+    with func.stub:
+        assert len(func().daily_meal_plans) == 30
+    assert isinstance(found["nutrition.model[7d]"][0](), NutritionPlan)
+
+
+def test_baseline_covers_every_case():
+    with open(BASELINE_PATH) as file:
+        baseline = json.load(file)
+    assert set(baseline["results"]) == set(cases())
+
+
+def test_compare_flags_slowdowns():
+    baseline = {"results": {"a": {"best_us": 10.0}, "b": {"best_us": 10.0}}}
+    current = {"results": {"a": {"best_us": 13.0}, "b": {"best_us": 12.0}, "new": {"best_us": 1.0}}}
+
+    rows = compare(current, baseline, threshold=0.25)
+    assert [(row["name"], row["regression"]) for row in rows] == [("a", True), ("b", False)]
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.logging_config import request_id_var
+from app.main import app
+from app.services import bulkheads
+from app.services.bulkheads import Bulkhead
+from tests.test_plan_store import WORKOUT_PLAN
+
+
+def test_full_queue_is_rejected_at_once():
+    bulkhead = Bulkhead("test", workers=1, max_queue=1, timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(bulkhead.run(release.wait))
+        queued = asyncio.ensure_future(bulkhead.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert bulkhead.stats()["active"] == 1 and bulkhead.stats()["queue_depth"] == 1
+        with pytest.raises(HTTPException) as rejected:
+            await bulkhead.run(lambda: "rejected")
+        release.set()
+        return rejected.value, await running, await queued
+
+    rejected, running, queued = asyncio.run(scenario())
+    assert rejected.status_code == 503 and rejected.headers == {"Retry-After": "1"}
+    assert (running, queued) == (True, "queued")
+    assert bulkhead.stats()["rejected"] == {"queue_full": 1, "timeout": 0}
+    bulkhead.shutdown()
+
+
+def test_timeout_cancels_queued_calls():
+    bulkhead = Bulkhead("test", workers=1, max_queue=4, timeout=0.05)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        busy = asyncio.ensure_future(bulkhead.run(release.wait))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as timed_out:
+            await bulkhead.run(ran.append, "late")
+        with pytest.raises(HTTPException):
+            await busy
+        return timed_out.value
+
+    assert asyncio.run(scenario()).status_code == 504
+    release.set()
+    time.sleep(0.05)
+    assert ran == []
+    assert bulkhead.stats()["queue_depth"] == 0 and bulkhead.stats()["rejected"]["timeout"] == 2
+    bulkhead.shutdown()
+
+
+def test_request_context_reaches_the_worker_thread():
+    bulkhead = Bulkhead("test", workers=1, max_queue=1, timeout=5)
+
+    async def scenario():
+        request_id_var.set("req-123")
+        return await bulkhead.run(lambda: (request_id_var.get(), threading.current_thread().name))
+
+    request_id, thread = asyncio.run(scenario())
+    assert request_id == "req-123" and thread.startswith("bulkhead-test")
+    bulkhead.shutdown()
+
+
+def test_saturated_gemini_bulkhead_does_not_block_other_endpoints(monkeypatch):
+    monkeypatch.setattr(bulkheads, "_bulkheads", {"gemini": Bulkhead("gemini", workers=1, max_queue=0, timeout=5)})
+    client = TestClient(app)
+    release = threading.Event()
+    responses = []
+    profile = {"weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "bulking", "workouts_per_week": 3}
+
+    with patch("app.routers.workouts.generate_workout_plan", side_effect=lambda p: release.wait() and WORKOUT_PLAN):
+        slow = threading.Thread(target=lambda: responses.append(client.post("/workout-plans/generate", json=profile)))
+        slow.start()
+        deadline = time.monotonic() + 5
+        while bulkheads.bulkhead_stats()["gemini"]["active"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        rejected = client.get("/recommendations/brands", params={"product": "dates"})
+        assert rejected.status_code == 503 and rejected.headers["Retry-After"] == "1"
+        assert client.get("/ops/bulkheads").json()["gemini"]["rejected"]["queue_full"] == 1
+        assert client.get("/healthz").status_code == 200
+
+        release.set()
+        slow.join(5)
+    assert responses[0].status_code == 200
+    bulkheads.shutdown_bulkheads()
+
+
+def test_jobs_bulkhead_queues_without_bound_or_timeout(monkeypatch):
+    monkeypatch.setattr(bulkheads, "_bulkheads", {
+        "gemini": Bulkhead("gemini", workers=1, max_queue=0, timeout=0.01),
+        "jobs": Bulkhead("jobs", workers=1, max_queue=None, timeout=None),
+    })
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(bulkheads.run_in_bulkhead("gemini", release.wait))
+        await asyncio.sleep(0.01)
+        # Interactive calls are rejected while jobs keep queueing, and a slow one is never timed out
+        jobs = [asyncio.ensure_future(bulkheads.run_in_bulkhead("jobs", time.sleep, 0.03)) for _ in range(5)]
+        with pytest.raises(HTTPException):
+            await bulkheads.run_in_bulkhead("gemini", lambda: None)
+        await asyncio.gather(*jobs)
+        release.set()
+        with pytest.raises(HTTPException):
+            await busy
+
+    asyncio.run(scenario())
+    stats = bulkheads.bulkhead_stats()["jobs"]
+    assert stats["completed"] == 5 and stats["rejected"] == {"queue_full": 0, "timeout": 0}
+    assert stats["max_queue_depth_seen"] >= 4
+    bulkheads.shutdown_bulkheads()
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import gemini_model
+from app.services import cassettes
+from app.services.cassettes import Cassette, CassetteMiss, use_cassette
+
+CASSETTE = Path(__file__).parent / "cassettes" / "synthetic_plans.json"
+IMAGE = Path(__file__).parent / "test_image.jpg"
+
+client = TestClient(app)
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError("replay must not build the Gemini client")
+
+
+@pytest.fixture
+def replay():
+    with patch("app.models.gemini_model.get_client", no_network):
+        with use_cassette(Cassette(CASSETTE, "replay", latency_scale=0)) as cassette:
+            yield cassette
+
+
+def test_replayed_gemini_responses_drive_the_api(replay):
+    workout = client.post("/workout-plans/generate", json={
+        "weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "muscle building", "workouts_per_week": 3})
+    assert workout.status_code == 200
+    assert len(workout.json()["workout_sessions"]) == 3
+
+    nutrition = client.post("/nutrition-plans/generate", json={
+        "weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "bulking", "duration_days": 2})
+    assert nutrition.status_code == 200
+    assert [day["day"] for day in nutrition.json()["daily_meal_plans"]] == [1, 2]
+
+    with open(IMAGE, "rb") as image:
+        meal = client.post("/meals/analyze", files={"file": ("meal.jpg", image, "image/jpeg")})
+    assert meal.status_code == 200
+    assert meal.json()["total_calories"] == 612
+
+    brands = client.get("/recommendations/brands", params={"product": "greek yogurt"})
+    assert brands.status_code == 200
+    assert brands.json()["brands"][0]["name"] == "Al Ain Farms"
+
+    assert replay.stats == {"recorded": 0, "replayed": 4}
+
+
+def test_replayed_mcp_tool_result(replay):
+    response = client.post("/coach/roster", json={"user_ids": ["synthetic-user-0000"]})
+
+    assert response.status_code == 200
+    assert response.json()["profiles"]["synthetic-user-0000"]["name"] == "Synthetic User 0"
+
+
+def test_replayed_response_keeps_token_counts(replay):
+    response = gemini_model.generate_content("recommend_brands", [{"parts": [{"text": "anything"}]}])
+
+    assert response.usage_metadata.prompt_token_count == 412
+    assert response.text.startswith("```json")
+
+
+def test_record_then_exact_replay(tmp_path):
+    recording = json.loads(CASSETTE.read_text())["interactions"][3]["response"]
+    contents = [{"parts": [{"text": "Recommend brands for dates"}]}]
+    path = tmp_path / "recorded.json"
+
+    with patch("app.models.gemini_model._call_gemini", lambda c: gemini_model._decode_response(recording)):
+        with use_cassette(Cassette(path, "record")) as cassette:
+            recorded = gemini_model.generate_content("recommend_brands", contents)
+    assert cassette.stats["recorded"] == 1
+
+    interaction = json.loads(path.read_text())["interactions"][0]
+    assert interaction["request"]["parts"] == [{"text": "Recommend brands for dates"}]
+    assert interaction["response"]["usage_metadata"]["total_token_count"] == 1377
+
+    with patch("app.models.gemini_model.get_client", no_network):
+        with use_cassette(Cassette(path, "replay", match="exact", latency_scale=0)):
+            assert gemini_model.generate_content("recommend_brands", contents).text == recorded.text
+            with pytest.raises(CassetteMiss):
+                gemini_model.generate_content("recommend_brands", [{"parts": [{"text": "Another prompt"}]}])
+
+
+def test_replay_latency_injection():
+    cassette = Cassette(CASSETTE, "replay", latency_ms=50)
+    started = time.perf_counter()
+    cassette.call("gemini", "analyze_meal", {}, no_network, None, lambda data: data)
+    assert time.perf_counter() - started >= 0.05
+
+    instant = Cassette(CASSETTE, "replay", latency_scale=0)
+    started = time.perf_counter()
+    instant.call("gemini", "generate_nutrition_plan", {}, no_network, None, lambda data: data)
+    assert time.perf_counter() - started < 0.05
+
+
+def test_missing_cassette_in_replay_mode(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Cassette(tmp_path / "missing.json", "replay")
+
+
+def test_default_cassette_path_does_not_depend_on_the_working_directory():
+    assert cassettes.REPO_ROOT == Path(__file__).resolve().parents[1]
+    if "CASSETTE_PATH" not in os.environ:
+        assert Path(cassettes.CASSETTE_PATH) == cassettes.REPO_ROOT / "tests" / "cassettes" / "recorded.json"
@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+from prometheus_client import CollectorRegistry
+from starlette.testclient import TestClient
+
+import mcp_server
+from exercise_catalog import ExerciseCatalog
+from mcp_metrics import ExerciseCatalogCollector
+
+
+def make_exercise(exercise_id, muscle):
+    return {
+        "exerciseId": exercise_id,
+        "name": f"exercise {exercise_id}",
+        "gifUrl": "",
+        "targetMuscles": [muscle],
+        "bodyParts": ["upper arms"],
+        "equipments": ["Dumbbell"],
+        "secondaryMuscles": [],
+        "instructions": [f"Step:1 Do {exercise_id}."],
+    }
+
+
+def test_reload_swaps_snapshot_without_touching_readers(tmp_path):
+    source = tmp_path / "exercises.json"
+    source.write_text(json.dumps([make_exercise("a", "Biceps")]))
+    catalog = ExerciseCatalog(source, poll_interval=0)
+
+    old = catalog.current()
+    assert [ex["exerciseId"] for ex in old.exercises_by_target("biceps")] == ["a"]
+    assert old.facts["equipment"] == {"dumbbell"}
+    assert catalog.reload() is False
+
+    source.write_text(json.dumps([make_exercise("a", "Biceps"), make_exercise("b", "biceps")]))
+    os.utime(source, ns=(0, 1))
+    assert catalog.reload() is True
+
+    new = catalog.current()
+    assert new.generation == old.generation + 1
+    assert new.version != old.version
+    assert [ex["exerciseId"] for ex in new.exercises_by_target("BICEPS")] == ["a", "b"]
+    # A query holding the previous snapshot still sees the previous data
+    assert [ex["exerciseId"] for ex in old.exercises_by_target("biceps")] == ["a"]
+    assert old.store.get("a")["instructions"] == ["Step:1 Do a."]
+
+
+def test_failed_reload_keeps_current_snapshot(tmp_path):
+    source = tmp_path / "exercises.json"
+    source.write_text(json.dumps([make_exercise("a", "biceps")]))
+    catalog = ExerciseCatalog(source, poll_interval=0)
+    version = catalog.current().version
+
+    source.write_text("{not json")
+    assert catalog.reload(force=True) is False
+    assert catalog.current().version == version
+    assert catalog.stats()["last_error"]
+
+
+def test_catalog_version_is_exported_as_metrics(tmp_path):
+    source = tmp_path / "exercises.json"
+    source.write_text(json.dumps([make_exercise("a", "biceps")]))
+    catalog = ExerciseCatalog(source, poll_interval=0)
+    registry = CollectorRegistry()
+    registry.register(ExerciseCatalogCollector(catalog))
+
+    # Nothing is exported (or loaded) before the first query
+    assert registry.get_sample_value("exercise_catalog_generation") is None
+    assert catalog.loaded_snapshot() is None
+
+    version = catalog.current().version
+    assert registry.get_sample_value("exercise_catalog_info", {"version": version}) == 1
+    assert registry.get_sample_value("exercise_catalog_exercises") == 1
+    assert registry.get_sample_value("exercise_catalog_reloads_total") == 0
+
+
+def test_admin_routes_require_the_admin_token(monkeypatch):
+    client = TestClient(mcp_server.mcp.http_app())
+    monkeypatch.setattr(mcp_server, "MCP_ADMIN_TOKEN", None)
+    assert client.post("/admin/exercise-catalog/reload").status_code == 404
+
+    monkeypatch.setattr(mcp_server, "MCP_ADMIN_TOKEN", "secret")
+    reloads = []
+    monkeypatch.setattr(mcp_server.get_catalog(), "reload_in_background", lambda force: reloads.append(force))
+    assert client.post("/admin/exercise-catalog/reload").status_code == 403
+    assert client.get("/admin/user-cache", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert reloads == []
+
+    # Stats report the catalog as it is, without loading it on the event loop
+    monkeypatch.setattr(mcp_server, "get_catalog", lambda: ExerciseCatalog(poll_interval=0))
+    stats = client.get("/admin/exercise-catalog", headers={"X-Admin-Token": "secret"}).json()
+    assert stats["loaded"] is False and stats["exercise_count"] == 0
+
+    response = client.get("/admin/user-cache", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200 and "hit_ratio" in response.json()
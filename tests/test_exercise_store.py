@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+from exercise_store import build_artifact, open_store, artifact_path_for
+
+SAMPLE_EXERCISES = [
+    {
+        "exerciseId": "ex1",
+        "name": "band shrug",
+        "gifUrl": "https://example.com/ex1.gif",
+        "targetMuscles": ["traps"],
+        "bodyParts": ["neck"],
+        "equipments": ["band"],
+        "secondaryMuscles": ["shoulders"],
+        "instructions": ["Step:1 Stand up.", "Step:2 Shrug."],
+    },
+    {
+        "exerciseId": "ex2",
+        "name": "barbell curl",
+        "gifUrl": "https://example.com/ex2.gif",
+        "targetMuscles": ["biceps"],
+        "bodyParts": ["upper arms"],
+        "equipments": ["barbell"],
+        "secondaryMuscles": [],
+        "instructions": [],
+    },
+]
+
+
+def write_source(tmp_path, exercises):
+    source = tmp_path / "exercises.json"
+    source.write_text(json.dumps(exercises))
+    return source
+
+
+def test_artifact_round_trip(tmp_path):
+    source = write_source(tmp_path, SAMPLE_EXERCISES)
+    build_artifact(source)
+
+    store = open_store(source)
+    assert len(store) == 2
+    assert [store.record(row) for row in range(len(store))] == SAMPLE_EXERCISES
+    assert store.get("ex2")["targetMuscles"] == ["biceps"]
+    assert store.get("missing") is None
+    store.close()
+
+
+def test_tag_strings_are_shared(tmp_path):
+    exercises = [dict(SAMPLE_EXERCISES[0], exerciseId=f"ex{i}") for i in range(3)]
+    store = open_store(write_source(tmp_path, exercises))
+    first, second = store.columns["equipments"][0][0], store.columns["equipments"][2][0]
+    assert first is second
+    store.close()
+
+
+def test_stale_artifact_is_rebuilt(tmp_path):
+    source = write_source(tmp_path, SAMPLE_EXERCISES[:1])
+    open_store(source).close()
+    assert artifact_path_for(source).exists()
+
+    source.write_text(json.dumps(SAMPLE_EXERCISES))
+    os.utime(source, ns=(0, 1))
+    store = open_store(source)
+    assert len(store) == 2
+    store.close()
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils
+import rollups
+from fake_firestore import FakeStore
+from synthetic_data import populate
+
+END = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def store():
+    store = FakeStore()
+    populate(store.client(), users=3, days=40, seed=1, end=END)
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    yield store
+    mcp_utils.use_firestore_clients(*previous)
+
+
+def test_query_filters_order_limit_and_projection(store):
+    ref = mcp_utils._food_log_ref(store.client(), "synthetic-user-0000")
+    cutoff = END - timedelta(days=3)
+    docs = list(ref.where(filter=mcp_utils.FieldFilter("createdAt", ">=", cutoff))
+                .order_by("createdAt", direction="DESCENDING").limit(5).select(["nutritionInfo.calories"]).stream())
+
+    assert len(docs) == 5
+    assert set(docs[0].to_dict()) == {"nutritionInfo"}
+    assert set(docs[0].to_dict()["nutritionInfo"]) == {"calories"}
+
+
+def test_workout_pages_cover_history_without_overlap(store):
+    mcp_utils.USER_CACHE_ENABLED = False
+    try:
+        seen, cursor = [], None
+        while True:
+            page = mcp_utils.get_user_workouts_page("synthetic-user-0001", page_size=7, cursor=cursor)
+            seen.extend(workout["workout_id"] for workout in page["workouts"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+    finally:
+        mcp_utils.USER_CACHE_ENABLED = True
+
+    everything = list(mcp_utils._workouts_ref(store.client(), "synthetic-user-0001").stream())
+    assert len(seen) == len(set(seen)) == len(everything)
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_food_log_window_and_async_parity(store):
+    sync_result = mcp_utils.get_user_food_log_by_days.__wrapped__("synthetic-user-0002", 7)
+    async_result = asyncio.run(mcp_utils.get_user_food_log_by_days_async.__wrapped__("synthetic-user-0002", 7))
+
+    assert sync_result == async_result
+    assert len(sync_result) == 7
+    assert list(sync_result) == sorted(sync_result, reverse=True)
+
+
+def test_snapshot_listener_invalidates_cached_profile(store):
+    first = mcp_utils.get_user_profile("synthetic-user-0000")
+    mcp_utils._profile_ref(store.client(), "synthetic-user-0000").set({**first, "weight": 1.0})
+
+    assert mcp_utils.get_user_profile("synthetic-user-0000")["weight"] == 1.0
+
+
+def test_bulk_profiles_use_one_batched_read(store, monkeypatch):
+    monkeypatch.setattr(mcp_utils.user_cache, "listen", False)
+    store.reset_stats()
+    result = mcp_utils.get_profiles(["synthetic-user-0000", "synthetic-user-0001", "missing-user"])
+
+    assert result["errors"] == {}
+    assert result["results"]["missing-user"] is None
+    assert result["results"]["synthetic-user-0001"]["name"] == "Synthetic User 1"
+    assert store.stats()["reads"] == 3
+
+
+def test_rollup_catch_up_is_idempotent(store):
+    db = store.client()
+    first = rollups.catch_up("synthetic-user-0000", db)
+    daily = {doc.id: doc.to_dict() for doc in rollups._rollup_state_ref(db, "synthetic-user-0000")
+             .collection("daily").stream()}
+    second = rollups.catch_up("synthetic-user-0000", db)
+
+    assert first["daily"] == 40
+    assert second["daily"] == 0
+    today = END.date().isoformat()
+    assert daily[today]["nutrition"]["entries"] >= 3
+
+    summary = asyncio.run(rollups.get_user_rollups_async("synthetic-user-0000", days=3, weeks=1))
+    assert summary["daily"][0]["date"] == today
+    assert summary["daily"][0]["nutrition"] == daily[today]["nutrition"]
@@ -0,0 +1,114 @@
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import date
+from random import Random
+
+import pytest
+import uvicorn
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from fake_gemini import FakeGeminiSettings, Latency, create_app, nutrition_plan, parse_latencies  # noqa: E402
+
+from app import config as settings  # noqa: E402
+from app.models import gemini_model  # noqa: E402
+from app.schemas import nutrition, workout  # noqa: E402
+from app.services.meal_service import analyze_meal  # noqa: E402
+from app.services.nutrition_service import generate_nutrition_plan  # noqa: E402
+from app.services.recommendation_service import get_brand_recommendations  # noqa: E402
+from app.services.workout_service import generate_workout_plan  # noqa: E402
+
+IMAGE = os.path.join(os.path.dirname(__file__), "test_image.jpg")
+
+
+def serve(fake_settings):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(fake_settings), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """Start a stand-in with the given settings and point a fresh genai client at it."""
+    running = []
+
+    def start(**kwargs):
+        server, thread, url = serve(FakeGeminiSettings(**{"latency": "fixed:0", **kwargs}))
+        running.append((server, thread))
+        monkeypatch.setattr(settings, "GEMINI_BASE_URL", url)
+        monkeypatch.setattr(settings, "GEMINI_API_KEY", "fake")
+        monkeypatch.setattr(gemini_model, "_client", None)
+        return url
+
+    yield start
+    for server, thread in running:
+        server.should_exit = True
+        thread.join(5)
+    gemini_model._client = None
+
+
+def test_services_run_against_the_stand_in(fake_gemini):
+    fake_gemini()
+
+    plan = generate_workout_plan(workout.ProfileData(
+        weight=80, height=180, age=30, sex="male", goal="muscle building", workouts_per_week=4))
+    assert plan.sessions_per_week == 4 and len(plan.workout_sessions) == 4
+
+    meal_plan = generate_nutrition_plan(nutrition.ProfileData(
+        weight=80, height=180, age=30, sex="male", goal="bulking", duration_days=3))
+    assert [day.day for day in meal_plan.daily_meal_plans] == [1, 2, 3]
+    assert meal_plan.daily_meal_plans[0].date == str(date.today())
+
+    with open(IMAGE, "rb") as image:
+        assert analyze_meal(image.read()).total_calories > 0
+    assert 3 <= len(get_brand_recommendations("olive oil").brands) <= 5
+
+
+def test_streamed_response_and_token_counts(fake_gemini):
+    fake_gemini(stream_chunks=4, chunk_interval="fixed:20")
+    client = gemini_model.get_client()
+
+    started = time.perf_counter()
+    chunks = list(client.models.generate_content_stream(
+        model=gemini_model.model_name, contents="Recommend UAE-based brands or sustainable brands for the product: 'dates'"))
+
+    assert len(chunks) == 4
+    assert time.perf_counter() - started >= 0.06
+    assert chunks[-1].usage_metadata.total_token_count > 0
+    assert "brands" in "".join(chunk.text for chunk in chunks)
+
+
+def test_injected_errors(fake_gemini):
+    from google.genai import errors
+
+    fake_gemini(error_rate=1.0, error_statuses=(429,))
+    with pytest.raises(errors.ClientError) as raised:
+        gemini_model.generate_content("recommend_brands", [{"parts": [{"text": "hello"}]}])
+    assert raised.value.code == 429
+
+
+def test_latency_specs():
+    rng = Random(1)
+    assert Latency("250").sample(rng) == 0.25
+    assert 0.1 <= Latency("uniform:100:200").sample(rng) <= 0.2
+    assert Latency("normal:-100:1").sample(rng) == 0.0
+    latencies = parse_latencies("nutrition=lognormal:20000:0.3,default=fixed:5")
+    assert latencies["default"].sample(rng) == 0.005
+    with pytest.raises(ValueError):
+        parse_latencies("dessert=fixed:5")
+    with pytest.raises(ValueError):
+        Latency("lognormal:100")
+
+
+def test_synthetic_nutrition_plan_is_schema_valid():
+    plan = nutrition.NutritionPlan(**nutrition_plan(Random(0), 7, date(2025, 6, 2)))
+    assert plan.total_days == 7 and plan.daily_meal_plans[-1].date == "2025-06-08"
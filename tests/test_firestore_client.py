@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastmcp import Client
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_server
+import mcp_utils
+from fake_firestore import FakeStore
+from synthetic_data import populate
+
+USER = "synthetic-user-0000"
+
+
+@pytest.fixture
+def store():
+    store = FakeStore()
+    populate(store.client(), users=2, days=5, seed=3)
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    yield store
+    mcp_utils.use_firestore_clients(*previous)
+
+
+@pytest.fixture
+def no_clients(monkeypatch):
+    monkeypatch.setattr(mcp_utils, "_db", None)
+    monkeypatch.setattr(mcp_utils, "_async_db", None)
+    monkeypatch.setattr(mcp_utils, "FIRESTORE_BACKEND", "firestore")
+
+
+def test_clients_are_created_once_across_threads(no_clients):
+    with patch.object(mcp_utils, "_ensure_firebase_app") as ensure_app, \
+            patch.object(mcp_utils.firestore, "client", side_effect=lambda: object()) as sync_client, \
+            patch.object(mcp_utils.firestore_async, "client", side_effect=lambda: object()) as async_client:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(mcp_utils.initialize_firebase()))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        async_db = mcp_utils.initialize_firebase_async()
+
+        assert len({id(db) for db in results}) == 1
+        assert mcp_utils.initialize_firebase_async() is async_db
+        assert sync_client.call_count == async_client.call_count == 1
+        assert ensure_app.call_count == 2
+
+
+def test_memory_backend_shares_one_store(no_clients, monkeypatch):
+    monkeypatch.setattr(mcp_utils, "FIRESTORE_BACKEND", "memory")
+    db, async_db = mcp_utils.initialize_firebase(), mcp_utils.initialize_firebase_async()
+
+    mcp_utils._profile_ref(db, "memory-user").set({"name": "Memory"})
+    profile = asyncio.run(mcp_utils._profile_ref(async_db, "memory-user").get())
+    assert profile.to_dict() == {"name": "Memory"}
+
+
+def test_refs_point_at_the_app_document_paths(store):
+    db = store.client()
+    assert mcp_utils._profile_ref(db, USER).path == f"users/{USER}/profile/data/personal_info/current"
+    assert mcp_utils._workouts_ref(db, USER).path == f"users/{USER}/exercise/data/completed_workouts"
+    assert mcp_utils._sleep_sessions_ref(db, USER).path == f"users/{USER}/sleep/data/sleep_sessions"
+    assert mcp_utils._food_log_ref(db, USER).path == f"users/{USER}/nutrition/data/food_log_entries"
+
+
+def test_format_helpers():
+    missing = SimpleNamespace(exists=False)
+    assert mcp_utils._format_profile(USER, missing) is None
+
+    workout = SimpleNamespace(
+        id="w1", reference=SimpleNamespace(path="users/u/w1"),
+        to_dict=lambda: {"name": "Push", "endTime": "2026-03-01T18:30:00Z"},
+    )
+    formatted = mcp_utils._format_workout(workout)
+    assert formatted["workout_id"] == "w1" and formatted["document_path"] == "users/u/w1"
+    assert formatted["endTime_readable"] == "March 01, 2026 at 06:30 PM"
+
+    created = datetime(2026, 3, 1, 23, 0, tzinfo=timezone.utc)
+    for created_at in (created, "2026-03-01T23:00:00Z"):
+        session = SimpleNamespace(id="s1", to_dict=lambda: {
+            "mood": "happy", "sleepQuality": "good", "totalDuration": 27_000_000, "createdAt": created_at,
+        })
+        formatted = mcp_utils._format_sleep_session(session)
+        assert formatted["totalDuration_hours"] == 7.5
+        assert formatted["createdAt_readable"] == "March 01, 2026 at 11:00 PM"
+
+
+def test_async_reads_match_sync_reads(store):
+    mcp_utils.user_cache.clear()
+    profile = mcp_utils.get_user_profile.__wrapped__(USER)
+    assert asyncio.run(mcp_utils.get_user_profile_async.__wrapped__(USER)) == profile
+    assert asyncio.run(mcp_utils.get_user_profile_async.__wrapped__("missing-user")) is None
+
+    sync_page = mcp_utils.get_user_sleep_sessions_page.__wrapped__(USER, page_size=3)
+    async_page = asyncio.run(mcp_utils.get_user_sleep_sessions_page_async.__wrapped__(USER, page_size=3))
+    assert async_page == sync_page and len(sync_page["sleep_sessions"]) == 3
+
+
+def test_async_mcp_tool_reads_through_the_shared_client(store):
+    async def call():
+        async with Client(mcp_server.mcp) as client:
+            return await client.call_tool("get_user_profile_tool", {"user_id": USER})
+
+    result = asyncio.run(call())
+    assert result.data["name"] == "Synthetic User 0"
+    assert result.data["user_id"] == USER
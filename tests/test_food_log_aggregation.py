@@ -0,0 +1,84 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils
+from fake_firestore import FakeStore
+from mcp_utils import _FoodLogAccumulator, _food_log_cutoff
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+def food_doc(doc_id, created_at, calories, protein=0, carbohydrates=0, fat=0):
+    return FakeDoc(doc_id, {
+        "foodName": doc_id,
+        "mealType": "lunch",
+        "servingSize": "1 serving",
+        "createdAt": created_at,
+        "nutritionInfo": {"calories": calories, "protein": protein, "carbohydrates": carbohydrates, "fat": fat},
+    })
+
+
+def test_entries_are_grouped_and_totalled_per_day():
+    accumulator = _FoodLogAccumulator()
+    for doc in [
+        food_doc("a", datetime(2025, 9, 8, 12, tzinfo=timezone.utc), 500, 30, 60, 10),
+        food_doc("b", "2025-09-08T08:00:00Z", 250.5, 10, None, "5"),
+        food_doc("c", datetime(2025, 9, 7, 19, tzinfo=timezone.utc), 700, 40, 80, 20),
+        food_doc("no-date", None, 100),
+        food_doc("bad-date", "yesterday", 100),
+    ]:
+        accumulator.add(doc)
+
+    result = accumulator.result()
+
+    assert list(result) == ["2025-09-08", "2025-09-07"]
+    assert [entry["entry_id"] for entry in result["2025-09-08"]["entries"]] == ["a", "b"]
+    assert result["2025-09-08"]["totals"] == {"calories": 750.5, "protein": 40.0, "carbohydrates": 60.0, "fat": 15.0}
+    assert result["2025-09-07"]["totals"]["calories"] == 700.0
+
+
+def test_empty_log():
+    assert _FoodLogAccumulator().result() == {}
+
+
+def test_cutoff_covers_requested_calendar_days():
+    cutoff = _food_log_cutoff(7)
+    today = datetime.now(timezone.utc).date()
+    assert (cutoff.hour, cutoff.minute, cutoff.second) == (0, 0, 0)
+    assert (today - cutoff.date()).days == 6
+
+
+def test_window_includes_entries_with_string_timestamps():
+    store = FakeStore()
+    ref = mcp_utils._food_log_ref(store.client(), "user-1")
+    today = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+    for doc_id, created_at in [
+        ("timestamp-today", today),
+        ("string-today", today.strftime("%Y-%m-%dT%H:%M:%S.000Z")),
+        ("string-yesterday", (today - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")),
+        ("string-too-old", (today - timedelta(days=3)).strftime("%Y-%m-%dT%H:%M:%SZ")),
+        ("timestamp-too-old", today - timedelta(days=3)),
+    ]:
+        ref.document(doc_id).set(food_doc(doc_id, created_at, 100).to_dict())
+
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    try:
+        result = mcp_utils.get_user_food_log_by_days.__wrapped__("user-1", 2)
+    finally:
+        mcp_utils.use_firestore_clients(*previous)
+
+    days = list(result)
+    assert [entry["entry_id"] for entry in result[days[0]]["entries"]] == ["timestamp-today", "string-today"]
+    assert [entry["entry_id"] for entry in result[days[1]]["entries"]] == ["string-yesterday"]
+    assert result[days[0]]["totals"]["calories"] == 200.0
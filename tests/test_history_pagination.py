@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils
+from fake_firestore import FakeStore
+from mcp_utils import decode_cursor, encode_cursor, _history_page, _since_value
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def get(self, field):
+        return self._data[field]
+
+
+def test_cursor_round_trip_keeps_value_types():
+    created_at = datetime(2025, 9, 7, 21, 46, 8, 859144, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor("createdAt", created_at, "s1"), "createdAt") == (created_at, "s1")
+    assert decode_cursor(encode_cursor("endTime", "2025-09-07T21:46:08.859144"), "endTime") == (
+        "2025-09-07T21:46:08.859144", None)
+
+
+def test_cursor_is_rejected_for_another_field_or_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("endTime", "2025-09-07"), "createdAt")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "endTime")
+
+
+def test_next_cursor_only_for_full_pages():
+    docs = [FakeDoc(f"w{i}", {"endTime": f"2025-09-0{9 - i}T10:00:00"}) for i in range(3)]
+
+    full = _history_page(docs, "endTime", lambda doc: doc.id, "workouts", page_size=3)
+    assert full["workouts"] == ["w0", "w1", "w2"]
+    assert decode_cursor(full["next_cursor"], "endTime") == ("2025-09-07T10:00:00", "w2")
+
+    partial = _history_page(docs, "endTime", lambda doc: doc.id, "workouts", page_size=5)
+    assert partial["next_cursor"] is None
+
+
+def test_since_matches_stored_field_types():
+    assert _since_value("endTime", "2025-09-01T04:00:00+04:00") == "2025-09-01T00:00:00"
+    assert _since_value("createdAt", "2025-09-01") == datetime(2025, 9, 1, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        _since_value("createdAt", "last week")
+
+
+def test_pages_keep_documents_that_share_a_timestamp():
+    store = FakeStore()
+    ref = mcp_utils._workouts_ref(store.client(), "user-1")
+    # Five workouts share one endTime, so every page boundary falls inside the tie
+    for i in range(5):
+        ref.document(f"tied-{i}").set({"name": "Push", "endTime": "2025-09-07T10:00:00"})
+    ref.document("older").set({"name": "Pull", "endTime": "2025-09-06T10:00:00"})
+
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    try:
+        seen, cursor = [], None
+        while True:
+            page = mcp_utils.get_user_workouts_page.__wrapped__("user-1", page_size=2, cursor=cursor)
+            seen.extend(workout["workout_id"] for workout in page["workouts"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+    finally:
+        mcp_utils.use_firestore_clients(*previous)
+
+    assert seen == ["tied-4", "tied-3", "tied-2", "tied-1", "tied-0", "older"]
@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, File, HTTPException, UploadFile
+
+from app.middleware.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+def make_app(delay=0.0):
+    api = FastAPI()
+    calls = {"generate": 0, "fail": 0, "analyze": 0}
+
+    @api.post("/workout-plans/generate")
+    async def generate(body: dict):
+        calls["generate"] += 1
+        await asyncio.sleep(delay)
+        return {"plan": body["goal"], "call": calls["generate"]}
+
+    @api.post("/agent/generate")
+    async def fail():
+        calls["fail"] += 1
+        raise HTTPException(status_code=500, detail="upstream error")
+
+    @api.post("/meals/analyze")
+    async def analyze(file: UploadFile = File(...)):
+        calls["analyze"] += 1
+        return {"filename": file.filename, "size": len(await file.read())}
+
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10, max_bytes=10_000)
+    api.add_middleware(IdempotencyMiddleware, store=store)
+    return api, calls, store
+
+
+def client_for(api):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://test")
+
+
+def test_retry_replays_stored_response():
+    async def scenario():
+        api, calls, store = make_app()
+        async with client_for(api) as client:
+            headers = {"Idempotency-Key": "k1"}
+            first = await client.post("/workout-plans/generate", json={"goal": "bulk"}, headers=headers)
+            retry = await client.post("/workout-plans/generate", json={"goal": "bulk"}, headers=headers)
+            other_key = await client.post("/workout-plans/generate", json={"goal": "bulk"},
+                                          headers={"Idempotency-Key": "k2"})
+            no_key = await client.post("/workout-plans/generate", json={"goal": "bulk"})
+        return first, retry, other_key, no_key, calls, store
+
+    first, retry, other_key, no_key, calls, store = asyncio.run(scenario())
+    assert retry.json() == first.json() == {"plan": "bulk", "call": 1}
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert other_key.json()["call"] == 2 and no_key.json()["call"] == 3
+    assert calls["generate"] == 3
+    assert store.stats()["replayed"] == 1
+
+
+def test_concurrent_retries_attach_to_in_flight_request():
+    async def scenario():
+        api, calls, store = make_app(delay=0.05)
+        async with client_for(api) as client:
+            responses = await asyncio.gather(*(
+                client.post("/workout-plans/generate", json={"goal": "cut"}, headers={"Idempotency-Key": "k"})
+                for _ in range(5)
+            ))
+        return responses, calls, store
+
+    responses, calls, store = asyncio.run(scenario())
+    assert calls["generate"] == 1
+    assert all(response.json() == {"plan": "cut", "call": 1} for response in responses)
+    assert store.stats()["attached"] == 4
+    assert store.stats()["in_flight"] == 0
+
+
+def test_key_reuse_with_different_body_is_rejected():
+    async def scenario():
+        api, calls, _ = make_app()
+        async with client_for(api) as client:
+            await client.post("/workout-plans/generate", json={"goal": "bulk"}, headers={"Idempotency-Key": "k"})
+            return await client.post("/workout-plans/generate", json={"goal": "cut"},
+                                     headers={"Idempotency-Key": "k"}), calls
+
+    response, calls = asyncio.run(scenario())
+    assert response.status_code == 422
+    assert calls["generate"] == 1
+
+
+def test_multipart_retry_with_a_new_boundary_is_replayed():
+    async def scenario():
+        api, calls, store = make_app()
+        headers = {"Idempotency-Key": "upload"}
+        async with client_for(api) as client:
+            # httpx picks a random boundary for every request, as browsers and mobile clients do
+            first = await client.post("/meals/analyze", files={"file": ("meal.jpg", b"jpeg-bytes", "image/jpeg")},
+                                      headers=headers)
+            retry = await client.post("/meals/analyze", files={"file": ("meal.jpg", b"jpeg-bytes", "image/jpeg")},
+                                      headers=headers)
+            other_photo = await client.post("/meals/analyze",
+                                            files={"file": ("meal.jpg", b"other-bytes", "image/jpeg")},
+                                            headers=headers)
+        return first, retry, other_photo, calls
+
+    first, retry, other_photo, calls = asyncio.run(scenario())
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == {"filename": "meal.jpg", "size": 10}
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert other_photo.status_code == 422
+    assert calls["analyze"] == 1
+
+
+def test_server_errors_are_not_stored():
+    async def scenario():
+        api, calls, store = make_app()
+        async with client_for(api) as client:
+            for _ in range(2):
+                response = await client.post("/agent/generate", headers={"Idempotency-Key": "k"})
+                assert response.status_code == 500
+        return calls, store
+
+    calls, store = asyncio.run(scenario())
+    assert calls["fail"] == 2
+    assert store.stats()["entries"] == 0
+
+
+def test_store_is_bounded():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=2, max_bytes=10_000)
+    for key in ("a", "b", "c"):
+        store.put(key, 200, [], b"{}", "fp")
+
+    assert store.get("a") is None
+    assert store.get("c").body == b"{}"
+    assert store.stats()["evictions"] == 1
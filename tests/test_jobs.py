@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.job_service import JobManager
+from app.services.job_store import InMemoryJobStore, SQLiteJobStore
+
+
+async def echo(payload):
+    await asyncio.sleep(payload.get("delay", 0))
+    if payload.get("fail"):
+        raise HTTPException(status_code=502, detail="upstream failed")
+    return {"echo": payload["value"]}
+
+
+def make_manager(store=None, **kwargs):
+    return JobManager(store or InMemoryJobStore(), kinds={"echo": echo}, **kwargs)
+
+
+async def wait_for_status(manager, job_id, statuses=("succeeded", "failed", "cancelled")):
+    for _ in range(200):
+        job = await manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job stuck in {job['status']}")
+
+
+def test_job_lifecycle_success_failure_and_cancel():
+    async def scenario():
+        manager = make_manager(workers=2)
+        ok = await manager.submit("echo", {"value": 1})
+        failing = await manager.submit("echo", {"value": 2, "fail": True})
+        slow = await manager.submit("echo", {"value": 3, "delay": 10})
+
+        assert (await wait_for_status(manager, ok["id"]))["result"] == {"echo": 1}
+        failed = await wait_for_status(manager, failing["id"])
+        assert failed["error"] == {"status_code": 502, "detail": "upstream failed"}
+
+        await wait_for_status(manager, slow["id"], ("running",))
+        assert (await manager.cancel(slow["id"]))["status"] == "cancelled"
+        with pytest.raises(HTTPException) as conflict:
+            await manager.cancel(slow["id"])
+        assert conflict.value.status_code == 409
+        await asyncio.sleep(0.01)
+        stats = await manager.stats()
+        await manager.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["completed"] == {"succeeded": 1, "failed": 1, "cancelled": 1}
+    assert stats["running"] == 0
+
+
+def test_full_queue_rejects_with_429():
+    async def scenario():
+        manager = make_manager(workers=1, max_queue=1)
+        await manager.submit("echo", {"value": 1, "delay": 1})
+        await asyncio.sleep(0.01)  # picked up by the worker
+        await manager.submit("echo", {"value": 2})
+        with pytest.raises(HTTPException) as rejected:
+            await manager.submit("echo", {"value": 3})
+        await manager.shutdown()
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert "Retry-After" in rejected.headers
+
+
+def test_finished_jobs_expire_after_ttl():
+    store = InMemoryJobStore()
+    store.create({"id": "a", "kind": "echo", "status": "succeeded", "created_at": 1, "expires_at": time.time() - 1})
+    store.create({"id": "b", "kind": "echo", "status": "queued", "created_at": 1})
+
+    assert store.get("a") is None
+    assert store.purge_expired() == 1
+    assert store.get("b")["status"] == "queued"
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    store = SQLiteJobStore(path)
+    store.create({"id": "done", "kind": "echo", "status": "queued", "created_at": 1.0})
+    store.update("done", status="succeeded", result={"plan": [1, 2]}, expires_at=time.time() + 60)
+    store.create({"id": "lost", "kind": "echo", "status": "running", "created_at": 1.0})
+    store.close()
+
+    manager = make_manager(SQLiteJobStore(path))
+
+    assert asyncio.run(manager.get("done"))["result"] == {"plan": [1, 2]}
+    lost = asyncio.run(manager.get("lost"))
+    assert lost["status"] == "failed"
+    assert lost["error"]["detail"] == "Interrupted by a server restart"
+
+
+def test_job_endpoints(tmp_path):
+    manager = make_manager(InMemoryJobStore())
+    with patch("app.routers.jobs.get_job_manager", return_value=manager), TestClient(app) as client:
+        manager.kinds["agent"] = lambda payload: echo({"value": payload["user_message"]})
+        response = client.post("/jobs/agent", params={"user_message": "hi"})
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        assert response.headers["Location"] == f"/jobs/{job_id}"
+
+        for _ in range(100):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        assert job["result"] == {"echo": "hi"}
+        assert client.post(f"/jobs/{job_id}/cancel").status_code == 409
+        assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_restart_only_fails_jobs_of_stopped_workers(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    store = SQLiteJobStore(path)
+    store.heartbeat("live-worker")
+    store.heartbeat("stopped-worker", now=time.time() - 3600)
+    store.create({"id": "live", "kind": "echo", "status": "running", "created_at": 1.0, "owner": "live-worker"})
+    store.create({"id": "orphan", "kind": "echo", "status": "running", "created_at": 1.0, "owner": "stopped-worker"})
+    store.close()
+
+    manager = make_manager(SQLiteJobStore(path))
+
+    assert asyncio.run(manager.get("live"))["status"] == "running"
+    assert asyncio.run(manager.get("orphan"))["status"] == "failed"
+
+
+def test_cancel_from_another_worker_is_not_overwritten(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.job_service.CANCEL_POLL_SECONDS", 0.01)
+    path = tmp_path / "jobs.sqlite3"
+
+    async def scenario():
+        running = make_manager(SQLiteJobStore(path))
+        other = make_manager(SQLiteJobStore(path))
+        job = await running.submit("echo", {"value": 1, "delay": 10})
+        await wait_for_status(running, job["id"], ("running",))
+
+        assert (await other.cancel(job["id"]))["status"] == "cancelled"
+        for _ in range(100):
+            if not (await running.stats())["running"]:
+                break
+            await asyncio.sleep(0.01)
+        stats = await running.stats()
+        await running.shutdown()
+        return await running.get(job["id"]), stats
+
+    job, stats = asyncio.run(scenario())
+    assert job["status"] == "cancelled"
+    assert stats["running"] == 0 and stats["completed"]["succeeded"] == 0
+
+
+def test_finish_does_not_overwrite_a_finished_job():
+    store = InMemoryJobStore()
+    manager = make_manager(store)
+    store.create({"id": "a", "kind": "echo", "status": "running", "created_at": 1.0})
+    store.update("a", status="cancelled")
+
+    assert asyncio.run(manager._finish("a", "succeeded", result={"echo": 1})) is False
+    assert store.get("a")["status"] == "cancelled" and "result" not in store.get("a")
+    assert manager.completed["succeeded"] == 0
+
+
+def test_store_is_called_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr("app.services.job_service.CANCEL_POLL_SECONDS", 0.01)
+
+    threads = set()
+
+    class ThreadRecordingStore(InMemoryJobStore):
+        pass
+
+    for name in ("create", "update", "get", "heartbeat", "fail_orphaned", "purge_expired", "count_by_status"):
+        def recorded(self, *args, _method=getattr(InMemoryJobStore, name), **kwargs):
+            threads.add(threading.current_thread())
+            return _method(self, *args, **kwargs)
+        setattr(ThreadRecordingStore, name, recorded)
+
+    store = ThreadRecordingStore()
+
+    async def scenario():
+        manager = make_manager(store)
+        threads.clear()  # the constructor reads the store once, before serving
+        job = await manager.submit("echo", {"value": 1, "delay": 0.05})
+        await wait_for_status(manager, job["id"])
+        await manager.stats()
+        await manager.shutdown()
+
+    asyncio.run(scenario())
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from load_test import compare, parse_mix, run_load, summarize  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.cassettes import Cassette, use_cassette  # noqa: E402
+
+CASSETTE = Path(__file__).parent / "cassettes" / "synthetic_plans.json"
+
+
+def replay_load(mix, rps, duration):
+    async def drive():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await run_load(client, mix, rps, duration)
+
+    with patch("app.models.gemini_model.get_client", side_effect=AssertionError("no network")):
+        with use_cassette(Cassette(CASSETTE, "replay", latency_scale=0)):
+            return asyncio.run(drive())
+
+
+def test_mix_against_replayed_gemini():
+    result = replay_load(parse_mix("workout=1,nutrition=1,meal=1,brands=1"), rps=40, duration=0.5)
+    report = summarize(result)
+
+    assert report["overall"]["requests"] == 20
+    assert report["overall"]["error_rate"] == 0.0
+    assert set(report["endpoints"]) == {"workout", "nutrition", "meal", "brands"}
+    assert report["overall"]["p50_ms"] <= report["overall"]["p95_ms"] <= report["overall"]["p99_ms"]
+
+
+def test_errors_are_counted_by_outcome():
+    samples = [("brands", 0.0, 0.010, 200), ("brands", 0.1, 0.020, 200), ("brands", 0.2, 0.5, 429),
+               ("agent", 0.3, 1.0, "ReadTimeout")]
+    report = summarize({"samples": samples, "dropped": {"agent": 2}, "wall_seconds": 1.0})
+
+    assert report["overall"]["outcomes"] == {"200": 2, "429": 1, "ReadTimeout": 1}
+    assert report["overall"]["error_rate"] == 0.5
+    assert report["endpoints"]["brands"]["p99_ms"] == 20.0
+    assert report["endpoints"]["agent"]["dropped"] == 2 and "p50_ms" not in report["endpoints"]["agent"]
+
+
+def test_compare_flags_regressions():
+    baseline = {"overall": {"p50_ms": 100, "p95_ms": 200, "p99_ms": 300, "throughput_rps": 10.0, "error_rate": 0.0},
+                "endpoints": {}}
+    current = {"overall": {"p50_ms": 150, "p95_ms": 210, "p99_ms": 400, "throughput_rps": 8.0, "error_rate": 0.05},
+               "endpoints": {}}
+
+    regressed = {row["metric"] for row in compare(current, baseline) if row["regression"]}
+    assert regressed == {"p99_ms", "throughput_rps", "error_rate"}
+
+
+def test_unknown_endpoint_in_mix():
+    assert parse_mix("plans") == {"workout": 1, "nutrition": 1}
+    with pytest.raises(ValueError):
+        parse_mix("workout=1,checkout=2")
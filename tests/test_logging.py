@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.logging_config import (
+    JsonFormatter,
+    Payload,
+    RequestIdFilter,
+    log_payload,
+    payload_sampled,
+    request_id_var,
+    truncate,
+)
+from app.main import app
+
+client = TestClient(app)
+
+
+def capture(logger_name="test.structured"):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger(logger_name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger, stream
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_records_carry_request_id_and_extra_fields():
+    logger, stream = capture()
+    token = request_id_var.set("req-1")
+    try:
+        logger.info("Generated %s plan", "workout", extra={"duration_ms": 12})
+    finally:
+        request_id_var.reset(token)
+
+    [record] = records(stream)
+    assert record["message"] == "Generated workout plan"
+    assert record["request_id"] == "req-1"
+    assert record["duration_ms"] == 12
+    assert record["level"] == "INFO"
+
+
+def test_truncation_and_lazy_payloads():
+    assert truncate("x" * 10, 4) == "xxxx... [6 more bytes]"
+    assert truncate("é" * 3, 3) == "é... [4 more bytes]"
+    assert truncate("short", 100) == "short"
+
+    class Expensive:
+        rendered = 0
+
+        def __str__(self):
+            Expensive.rendered += 1
+            return "big"
+
+    logger, _ = capture()
+    logger.debug("%s", Payload(Expensive()))
+    assert Expensive.rendered == 0
+
+
+def test_payloads_are_sampled_per_request_or_logged_on_error():
+    ids = [f"request-{i}" for i in range(1000)]
+    sampled = [request_id for request_id in ids if payload_sampled(request_id, rate=0.1)]
+    assert 50 < len(sampled) < 150
+    assert sampled == [request_id for request_id in ids if payload_sampled(request_id, rate=0.1)]
+    assert not payload_sampled("request-1", rate=0)
+
+    logger, stream = capture()
+    log_payload("Raw response", "{" * 5000, logger=logger)
+    assert records(stream) == []
+
+    log_payload("Raw response", "{" * 5000, error=True, logger=logger)
+    [record] = records(stream)
+    assert record["level"] == "ERROR"
+    assert record["payload_bytes"] == 5000
+    assert len(record["message"]) < 2200
+
+
+def test_request_id_header_is_echoed_or_generated():
+    assert client.get("/", headers={"X-Request-ID": "abc-123"}).headers["X-Request-ID"] == "abc-123"
+    generated = client.get("/", headers={"X-Request-ID": "not valid\x01"}).headers["X-Request-ID"]
+    assert len(generated) == 32 and generated != client.get("/").headers["X-Request-ID"]
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_metrics
+import mcp_utils
+from fake_firestore import FakeStore
+from synthetic_data import populate, user_ids
+
+client = TestClient(app)
+
+PLAN = {
+    "warmup": {"description": "Jog", "duration": 5},
+    "cardio": {"description": "Bike", "duration": 20},
+    "sessions_per_week": 3,
+    "workout_sessions": [{"exercises": [{"name": "Squat", "sets": 4, "reps": "8-12", "rest": 60}]}],
+    "cooldown": {"description": "Stretch", "duration": 5},
+}
+PROFILE = {"weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "bulking",
+           "workouts_per_week": 3, "equipment": ["barbell"]}
+
+
+def gemini_returning(text):
+    models = SimpleNamespace(generate_content=lambda **_: SimpleNamespace(text=text))
+    return patch("app.models.gemini_model.get_client", return_value=SimpleNamespace(models=models))
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_generate_reports_stages_and_route_metrics():
+    route = {"method": "POST", "route": "/workout-plans/generate", "status": "200"}
+    gemini = {"upstream": "gemini", "operation": "generate_workout_plan", "outcome": "ok"}
+    requests_before = sample("http_request_duration_seconds_count", **route)
+    calls_before = sample("upstream_request_duration_seconds_count", **gemini)
+
+    with gemini_returning(json.dumps(PLAN)):
+        response = client.post("/workout-plans/generate", json=PROFILE)
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["llm", "parse", "validate", "total"]
+    assert sample("http_request_duration_seconds_count", **route) == requests_before + 1
+    assert sample("upstream_request_duration_seconds_count", **gemini) == calls_before + 1
+    assert sample("http_requests_in_flight", method="POST", endpoint_class="generation") == 0
+
+
+def test_parse_failures_and_route_templates():
+    failures_before = sample("json_parse_failures_total", source="workout_plan")
+    with gemini_returning("Sorry, I can't help with that"):
+        assert client.post("/workout-plans/generate", json=PROFILE).status_code == 500
+    assert sample("json_parse_failures_total", source="workout_plan") == failures_before + 1
+
+    client.get("/jobs/no-such-job")
+    client.get("/no-such-route")
+    assert sample("http_request_duration_seconds_count", method="GET", route="/jobs/{job_id}", status="404") >= 1
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+
+    body = client.get("/metrics")
+    assert body.status_code == 200
+    assert "http_request_duration_seconds_bucket" in body.text
+
+
+def test_mcp_metrics_cover_firestore_and_user_cache():
+    store = FakeStore()
+    populate(store.client(), users=1, days=3, seed=2)
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    try:
+        labels = {"upstream": "firestore", "operation": "profile", "outcome": "ok"}
+        reads_before = mcp_metrics.REGISTRY.get_sample_value("upstream_request_duration_seconds_count", labels) or 0
+        for _ in range(3):
+            mcp_utils.get_user_profile(user_ids(1)[0])
+        assert mcp_metrics.REGISTRY.get_sample_value("upstream_request_duration_seconds_count", labels) == reads_before + 1
+        assert mcp_metrics.REGISTRY.get_sample_value(
+            "cache_requests_total", {"cache": "user_data.profile", "result": "hit"}) >= 2
+        assert "cache_hit_ratio" in mcp_metrics.render_metrics()[0].decode()
+    finally:
+        mcp_utils.use_firestore_clients(*previous)
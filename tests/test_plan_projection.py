@@ -0,0 +1,76 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.nutrition import NutritionPlan
+from app.services.plan_projection import build_include, parse_days, project
+
+client = TestClient(app)
+
+MEAL = {
+    "description": "Oatmeal",
+    "ingredients": [{"ingredient": "Oats", "quantity": "1 cup", "calories": 300}],
+    "total_calories": 300,
+    "recipe": "Cook the oats.",
+    "suggested_brands": ["Brand"],
+}
+PLAN = NutritionPlan(
+    daily_calories_range={"min": 2000, "max": 2500},
+    macronutrients_range={"protein": {"min": 120, "max": 150}},
+    daily_meal_plans=[
+        {"day": day, "date": f"2025-01-0{day}", "breakfast": MEAL, "lunch": MEAL, "dinner": MEAL, "snacks": [MEAL],
+         "total_daily_calories": 1200, "daily_macros": {"protein": 100}}
+        for day in (1, 2, 3)
+    ],
+    total_days=3,
+)
+PROFILE = {"weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "bulking", "duration_days": 3}
+
+
+def test_summary_projection_matches_for_models_and_stored_json():
+    include = build_include("summary", "2-9", total_days=3)
+    from_model = json.loads(PLAN.model_dump_json(include=include))
+    from_json = project(PLAN.model_dump(mode="json"), include)
+
+    assert from_model == from_json
+    assert [day["day"] for day in from_model["daily_meal_plans"]] == [2, 3]
+    assert from_model["daily_meal_plans"][0]["breakfast"] == {"description": "Oatmeal", "total_calories": 300}
+    assert from_model["daily_meal_plans"][0]["snacks"] == [{"description": "Oatmeal", "total_calories": 300}]
+    assert "macronutrients_range" not in from_model
+
+
+def test_days_only_and_out_of_range():
+    assert json.loads(PLAN.model_dump_json(include=build_include(None, "5", 3)))["daily_meal_plans"] == []
+    assert len(project(PLAN.model_dump(mode="json"), build_include(None, "1", 3))["daily_meal_plans"]) == 1
+    assert list(parse_days("2-4", 3)) == [1, 2]
+
+
+@pytest.mark.parametrize("fields,days", [("recipe", None), ("daily_meal_plans.nope", None), (None, "0"), (None, "3-1")])
+def test_invalid_projection(fields, days):
+    with pytest.raises(HTTPException) as error:
+        build_include(fields, days)
+    assert error.value.status_code == 400
+
+
+@patch("app.routers.nutrition.generate_nutrition_plan", return_value=PLAN)
+def test_generate_and_stored_plan_projection(generate):
+    full = client.post("/nutrition-plans/generate", json=PROFILE)
+    summary = client.post("/nutrition-plans/generate", params={"fields": "summary", "days": "1"}, json=PROFILE)
+
+    assert summary.status_code == 200
+    assert len(summary.content) < len(full.content) / 3
+    assert summary.json()["daily_meal_plans"][0]["lunch"] == {"description": "Oatmeal", "total_calories": 300}
+
+    location = full.headers["Location"]
+    stored = client.get(location, params={"fields": "summary", "days": "1"})
+    assert stored.json() == summary.json()
+    assert stored.headers["ETag"] != full.headers["ETag"]
+    assert client.get(location, params={"fields": "summary", "days": "1"},
+                      headers={"If-None-Match": stored.headers["ETag"]}).status_code == 304
+
+    assert client.post("/nutrition-plans/generate", params={"fields": "bogus"}, json=PROFILE).status_code == 400
+    assert generate.call_count == 2
@@ -0,0 +1,62 @@
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.bulkheads import bulkhead_stats
+from app.schemas.workout import WorkoutPlan
+from app.services.plan_store import PlanStore, etag_matches
+
+client = TestClient(app)
+
+WORKOUT_PLAN = WorkoutPlan(
+    warmup={"description": "Jog", "duration": 5},
+    cardio={"description": "Bike", "duration": 20},
+    sessions_per_week=3,
+    workout_sessions=[{"exercises": [{"name": "Squat", "sets": 4, "reps": "8-12", "rest": 90}] * 10}],
+    cooldown={"description": "Stretch", "duration": 5},
+)
+PROFILE = {"weight": 80, "height": 180, "age": 30, "sex": "male", "goal": "bulking", "workouts_per_week": 3}
+
+
+def test_content_addressed_and_compressed(tmp_path):
+    store = PlanStore(tmp_path / "plans.sqlite3")
+    plan_id = store.save("workout", WORKOUT_PLAN)
+
+    assert store.save("workout", WORKOUT_PLAN.model_dump()) == plan_id
+    assert json.loads(store.get("workout", plan_id)) == WORKOUT_PLAN.model_dump(mode="json")
+    assert store.get("nutrition", plan_id) is None
+    stats = store.stats()["workout"]
+    assert stats["plans"] == 1
+    assert stats["stored_bytes"] < stats["json_bytes"]
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('W/"abc", "def"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abcd"', "abc")
+    assert not etag_matches(None, "abc")
+
+
+@patch("app.routers.workouts.generate_workout_plan", return_value=WORKOUT_PLAN)
+def test_generated_plan_is_served_by_id(_):
+    generated = client.post("/workout-plans/generate", json=PROFILE)
+    assert generated.status_code == 200
+    location, etag = generated.headers["Location"], generated.headers["ETag"]
+    storage_calls = bulkhead_stats()["storage"]["completed"]
+
+    stored = client.get(location)
+    assert stored.status_code == 200
+    assert stored.json() == generated.json()
+    assert stored.headers["ETag"] == etag
+
+    not_modified = client.get(location, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    # Reads go through the storage bulkhead, off the event loop
+    assert bulkhead_stats()["storage"]["completed"] == storage_calls + 2
+
+    assert client.get("/workout-plans/" + "0" * 32).status_code == 404
+    assert client.get(location.replace("/workout-plans/", "/nutrition-plans/")).status_code == 404
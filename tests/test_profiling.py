@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.services import profiling
+from app.services.metrics import stage, upstream
+from app.services.profiling import ProfileStore, pyinstrument_available
+
+PROFILERS = ["cProfile", pytest.param("pyinstrument", marks=pytest.mark.skipif(
+    not pyinstrument_available(), reason="pyinstrument is not installed"))]
+
+
+def make_client(profiler):
+    api = FastAPI()
+
+    @api.post("/agent/generate")
+    async def generate():
+        with upstream("gemini", "classify_intent", stage_name="classify"):
+            await asyncio.sleep(0.01)
+        with upstream("mcp", "get_user_profile", stage_name="tools"):
+            await asyncio.sleep(0.02)
+        with stage("llm"):
+            sum(i * i for i in range(20_000))
+        return {"text": "done"}
+
+    store = ProfileStore(max_entries=2)
+    api.add_middleware(ProfilingMiddleware, token="secret", store=store, profiler=profiler)
+    api.add_middleware(MetricsMiddleware)
+    return TestClient(api), store
+
+
+@pytest.mark.parametrize("profiler", PROFILERS)
+def test_profiled_request_reports_stages_and_upstream_calls(profiler):
+    client, store = make_client(profiler)
+    response = client.post("/agent/generate", headers={"X-Profile-Token": "secret"})
+
+    assert response.status_code == 200
+    report = store.get(response.headers["X-Profile-Id"])
+    assert response.headers["X-Profile-URL"] == f"/ops/profiles/{report['id']}"
+    assert report["profiler"] == profiler
+    assert set(report["stages_ms"]) == {"classify", "tools", "llm"}
+    assert [(call["upstream"], call["operation"]) for call in report["upstream_calls"]] == [
+        ("gemini", "classify_intent"), ("mcp", "get_user_profile")]
+    assert report["upstream_calls"][1]["start_ms"] >= report["upstream_calls"][0]["duration_ms"]
+    assert "generate" in report["report"]
+
+
+def test_cprofile_fallback_is_logged(monkeypatch, caplog):
+    monkeypatch.setattr(profiling, "pyinstrument_available", lambda: False)
+
+    assert profiling.ProfiledRequest("GET", "/").profiler.name == "cProfile"
+    assert "pyinstrument is not installed" in caplog.text
+
+    caplog.clear()
+    profiling.ProfiledRequest("GET", "/", profiler="cProfile")
+    assert caplog.text == ""
+
+
+def test_unprofiled_and_unauthorized_requests():
+    client, store = make_client("cProfile")
+
+    plain = client.post("/agent/generate")
+    assert plain.status_code == 200 and "X-Profile-Id" not in plain.headers
+    assert client.post("/agent/generate", params={"profile": "wrong"}).status_code == 403
+    assert client.post("/agent/generate", params={"profile": "secret"}).headers["X-Profile-Id"]
+    assert len(store.summaries()) == 1
+
+
+def test_ops_profile_endpoints(monkeypatch):
+    client = TestClient(app)
+    assert client.get("/ops/profiles").status_code == 404
+
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    report = {"id": "p1", "method": "POST", "path": "/agent/generate", "status": 200, "created_at": 0,
+              "duration_ms": 5.0, "report": "call tree"}
+    monkeypatch.setattr(profiling, "profile_store", ProfileStore())
+    profiling.profile_store.put(report)
+
+    assert client.get("/ops/profiles", headers={"X-Profile-Token": "nope"}).status_code == 403
+    headers = {"X-Profile-Token": "secret"}
+    assert client.get("/ops/profiles", headers=headers).json()[0]["id"] == "p1"
+    assert client.get("/ops/profiles/p1", params={"format": "text"}, headers=headers).text == "call tree"
+    assert client.get("/ops/profiles/missing", headers=headers).status_code == 404
@@ -0,0 +1,160 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import rollups
+from fake_firestore import FakeBatch, FakeStore
+from mcp_utils import _food_log_ref, _workouts_ref
+
+USER = "user-1"
+NOON = datetime(2025, 9, 8, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    return FakeStore().client()
+
+
+def log_food(db, doc_id, created_at, calories=100):
+    _food_log_ref(db, USER).document(doc_id).set({
+        "foodName": doc_id, "createdAt": created_at, "nutritionInfo": {"calories": calories},
+    })
+
+
+def daily(db, day):
+    snapshot = rollups._rollup_state_ref(db, USER).collection("daily").document(day).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+
+def test_watermark_keeps_the_ids_at_its_value(db):
+    log_food(db, "b", NOON)
+    log_food(db, "d", NOON)
+    log_food(db, "earlier", NOON - timedelta(hours=1))
+
+    first = rollups.catch_up(USER, db)
+    watermark = rollups._rollup_state_ref(db, USER).get().to_dict()["watermarks"]["food_log"]
+    second = rollups.catch_up(USER, db)
+
+    assert first["scanned"]["food_log"] == 3
+    assert watermark == {"timestamp": {"value": NOON, "ids": ["b", "d"]}}
+    assert second["scanned"] == {"workouts": 0, "sleep": 0, "food_log": 0} and second["daily"] == 0
+
+
+def test_document_written_later_at_the_watermark_value_is_caught_up(db):
+    log_food(db, "b", NOON)
+    rollups.catch_up(USER, db)
+
+    # Sorts before the watermark's document id, so a (value, id) cursor alone would miss it
+    log_food(db, "a", NOON, calories=250)
+    result = rollups.catch_up(USER, db)
+
+    assert result["scanned"]["food_log"] == 1
+    assert daily(db, "2025-09-08")["nutrition"] == {
+        "entries": 2, "calories": 350.0, "protein": 0.0, "carbohydrates": 0.0, "fat": 0.0,
+    }
+
+
+def test_documents_sharing_a_timestamp_across_pages(db, monkeypatch):
+    monkeypatch.setattr(rollups, "CATCH_UP_BATCH_SIZE", 2)
+    for i in range(5):
+        log_food(db, f"tied-{i}", NOON)
+    log_food(db, "next-day", NOON + timedelta(days=1))
+
+    result = rollups.catch_up(USER, db)
+
+    assert result["scanned"]["food_log"] == 6
+    assert daily(db, "2025-09-08")["nutrition"]["entries"] == 5
+    assert daily(db, "2025-09-09")["nutrition"]["entries"] == 1
+
+
+def test_bare_value_watermarks_from_older_runs_still_work(db):
+    log_food(db, "old", NOON - timedelta(days=1))
+    log_food(db, "new", NOON)
+    rollups._rollup_state_ref(db, USER).set({"watermarks": {"food_log": NOON - timedelta(days=1)}})
+
+    result = rollups.catch_up(USER, db)
+
+    # The document at the old watermark is read again; recomputing its day is harmless
+    assert result["scanned"]["food_log"] == 2
+    assert rollups._rollup_state_ref(db, USER).get().to_dict()["watermarks"]["food_log"] == {
+        "timestamp": {"value": NOON, "ids": ["new"]},
+    }
+
+
+def test_string_timestamps_are_rolled_up(db):
+    log_food(db, "timestamp", NOON)
+    log_food(db, "string", "2025-09-08T08:00:00Z")
+
+    rollups.catch_up(USER, db)
+
+    assert daily(db, "2025-09-08")["nutrition"]["entries"] == 2
+
+
+def test_timestamp_documents_after_a_string_document_are_caught_up(db):
+    log_food(db, "legacy", "2025-09-08T08:00:00")
+    log_food(db, "timestamp", NOON - timedelta(days=1))
+    rollups.catch_up(USER, db)
+
+    # ISO strings sort after every timestamp, so a single watermark would now sit past this one
+    log_food(db, "later", NOON + timedelta(days=1))
+    result = rollups.catch_up(USER, db)
+
+    assert result["scanned"]["food_log"] == 1
+    assert daily(db, "2025-09-09")["nutrition"]["entries"] == 1
+    assert rollups._rollup_state_ref(db, USER).get().to_dict()["watermarks"]["food_log"] == {
+        "timestamp": {"value": NOON + timedelta(days=1), "ids": ["later"]},
+        "string": {"value": "2025-09-08T08:00:00", "ids": ["legacy"]},
+    }
+
+
+def test_single_string_watermark_from_older_runs_rescans_timestamps(db):
+    log_food(db, "legacy", "2025-09-08T08:00:00")
+    log_food(db, "missed", NOON + timedelta(days=1))
+    rollups._rollup_state_ref(db, USER).set({
+        "watermarks": {"food_log": {"value": "2025-09-08T08:00:00", "ids": ["legacy"]}},
+    })
+
+    result = rollups.catch_up(USER, db)
+
+    assert result["scanned"]["food_log"] == 1
+    assert daily(db, "2025-09-09")["nutrition"]["entries"] == 1
+
+
+def test_on_write_recomputes_the_days_before_and_after(db):
+    workouts = _workouts_ref(db, USER)
+    workout = {"endTime": "2025-09-08T10:00:00", "exercises": [{"exerciseId": "x", "sets": 3}]}
+    workouts.document("w1").set(workout)
+    path = f"users/{USER}/exercise/data/completed_workouts/w1"
+
+    created = rollups.on_write(path, None, workout, db=db)
+    assert created == {"user_id": USER, "source": "workouts", "daily": 1, "weekly": 1}
+    assert daily(db, "2025-09-08")["workouts"] == {"count": 1, "sets": 3, "exercises": 1}
+
+    moved = {**workout, "endTime": "2025-09-15T10:00:00"}
+    workouts.document("w1").set(moved)
+    assert rollups.on_write(path, workout, moved, db=db)["daily"] == 2
+    assert daily(db, "2025-09-08")["workouts"]["count"] == 0
+    assert daily(db, "2025-09-15")["workouts"]["count"] == 1
+
+    workouts.document("w1").delete()
+    rollups.on_write(path, moved, None, db=db)
+    assert daily(db, "2025-09-15")["workouts"]["count"] == 0
+
+    assert "skipped" in rollups.on_write(f"users/{USER}/profile/data/personal_info/current", None, {}, db=db)
+    assert "skipped" in rollups.on_write("workouts/w1", None, workout, db=db)
+
+
+def test_rollup_writes_are_split_into_allowed_batches(db, monkeypatch):
+    monkeypatch.setattr(FakeBatch, "MAX_WRITES", 3)
+    monkeypatch.setattr(rollups, "MAX_BATCH_WRITES", 3)
+    for i in range(8):
+        log_food(db, f"day-{i}", NOON - timedelta(days=i))
+
+    result = rollups.catch_up(USER, db)
+
+    assert result["daily"] == 8
+    assert all(daily(db, (NOON - timedelta(days=i)).date().isoformat()) for i in range(8))
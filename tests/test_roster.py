@@ -0,0 +1,140 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils
+from fake_firestore import FakeFirestore, FakeStore
+from synthetic_data import populate
+
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    populate(store.client(), users=3, days=5, seed=4)
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    monkeypatch.setattr(mcp_utils.user_cache, "listen", False)
+    yield store
+    mcp_utils.use_firestore_clients(*previous)
+
+
+class Peak:
+    """Counts how many calls are inside the tracked section at once."""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+def test_recent_workouts_many_bounds_concurrency():
+    peak = Peak()
+
+    def fetch(user_id, limit):
+        with peak:
+            time.sleep(0.02)
+        if user_id == "broken":
+            raise Exception("Firestore unavailable")
+        return [{"workout_id": f"{user_id}-w"}] * limit
+
+    user_ids = [f"user-{i}" for i in range(9)] + ["broken", "user-0", " "]
+    with patch.object(mcp_utils, "get_user_recent_workouts", side_effect=fetch):
+        result = mcp_utils.get_recent_workouts_many(user_ids, limit=2, max_concurrency=3)
+
+    assert 1 < peak.peak <= 3
+    assert len(result["results"]) == 9 and result["results"]["user-0"] == [{"workout_id": "user-0-w"}] * 2
+    assert result["errors"] == {"broken": "Firestore unavailable"}
+
+
+def test_recent_workouts_many_async_bounds_concurrency():
+    peak = Peak()
+
+    async def fetch(user_id, limit):
+        with peak:
+            await asyncio.sleep(0.01)
+        return []
+
+    with patch.object(mcp_utils, "get_user_recent_workouts_async", side_effect=fetch):
+        result = asyncio.run(mcp_utils.get_recent_workouts_many_async(
+            [f"user-{i}" for i in range(10)], max_concurrency=2))
+
+    assert peak.peak == 2
+    assert len(result["results"]) == 10 and result["errors"] == {}
+
+
+def test_profiles_report_missing_users_and_read_failures(store):
+    user_ids = ["synthetic-user-0000", "missing-user", "synthetic-user-0000", ""]
+    result = mcp_utils.get_profiles(user_ids)
+    assert set(result["results"]) == {"synthetic-user-0000", "missing-user"}
+    assert result["results"]["missing-user"] is None
+    assert asyncio.run(mcp_utils.get_profiles_async(user_ids)) == result
+
+    mcp_utils.user_cache.clear()
+    with patch.object(FakeFirestore, "get_all", side_effect=Exception("deadline exceeded")):
+        failed = mcp_utils.get_profiles(["synthetic-user-0001"])
+    assert failed == {"results": {}, "errors": {"synthetic-user-0001": "deadline exceeded"}}
+
+    with pytest.raises(ValueError):
+        mcp_utils.get_profiles([f"user-{i}" for i in range(mcp_utils.MAX_BULK_USERS + 1)])
+
+
+def test_roster_overview_covers_every_user(store):
+    overview = asyncio.run(mcp_utils.get_roster_overview_async(["synthetic-user-0002", "missing-user"], 3))
+
+    assert overview["profiles"]["synthetic-user-0002"]["name"] == "Synthetic User 2"
+    assert overview["profiles"]["missing-user"] is None
+    assert len(overview["recent_workouts"]["synthetic-user-0002"]) <= 3
+    assert overview["recent_workouts"]["missing-user"] == []
+    assert overview["errors"] == {}
+
+
+def tool_result(payload):
+    return SimpleNamespace(isError=False, structuredContent={"result": payload}, content=[])
+
+
+def test_roster_endpoint_returns_partial_results():
+    payload = {
+        "profiles": {"u1": {"name": "A"}, "u2": None},
+        "recent_workouts": {"u1": [{"workout_id": "w1"}]},
+        "errors": {"u2": {"recent_workouts": "timeout"}},
+    }
+    with patch("app.services.coach_service.call_mcp_tool", new=AsyncMock(return_value=tool_result(payload))) as call:
+        response = client.post("/coach/roster", json={"user_ids": ["u1", "u2"], "workouts_limit": 3})
+
+    assert response.status_code == 200
+    assert response.json() == payload
+    call.assert_awaited_once_with("get_roster_overview_tool", {"user_ids": ["u1", "u2"], "workouts_limit": 3})
+
+
+def test_roster_endpoint_validates_and_reports_mcp_failures():
+    assert client.post("/coach/roster", json={"user_ids": []}).status_code == 422
+    assert client.post("/coach/roster", json={"user_ids": ["u1"], "workouts_limit": 51}).status_code == 422
+    assert client.post("/coach/roster", json={"user_ids": [f"u{i}" for i in range(201)]}).status_code == 422
+
+    error = SimpleNamespace(isError=True, content="tool crashed")
+    with patch("app.services.coach_service.call_mcp_tool", new=AsyncMock(return_value=error)):
+        assert client.post("/coach/roster", json={"user_ids": ["u1"]}).status_code == 502
+    with patch("app.services.coach_service.call_mcp_tool", new=AsyncMock(side_effect=ConnectionError("refused"))):
+        response = client.post("/coach/roster", json={"user_ids": ["u1"]})
+    assert response.status_code == 502 and response.json()["detail"] == "refused"
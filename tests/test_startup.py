@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# Only needed once a request reaches the Gemini client, the agent or an uploaded image
+LAZY_MODULES = ("google.genai", "langchain_google_genai", "langchain_core", "langgraph",
+                "langchain_mcp_adapters", "PIL")
+
+# Cumulative import time of app.main; override on slow machines
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+
+def import_profile(module="app.main"):
+    """Import ``module`` in a fresh interpreter under ``-X importtime``: {module: cumulative ms}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+        env={**os.environ, "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "test")},
+    )
+    assert result.returncode == 0, result.stderr
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        profile[name.strip()] = int(cumulative) / 1000
+    return profile
+
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    profile = import_profile()
+    loaded = sorted(name for name in profile
+                    if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES))
+    assert loaded == []
+
+
+def test_app_import_time_budget():
+    profile = import_profile()
+    assert profile["app.main"] < IMPORT_BUDGET_MS, f"import app.main took {profile['app.main']:.0f} ms"
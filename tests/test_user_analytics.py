@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils
+from fake_firestore import FakeStore
+from synthetic_data import populate
+from mcp_utils import (
+    EXERCISE_MAP,
+    summarize_nutrition_adherence,
+    summarize_sleep,
+    summarize_training_volume,
+)
+
+
+def exercise_with_muscle(muscle):
+    return next(ex for ex in EXERCISE_MAP.values() if ex["targetMuscles"] == [muscle])
+
+
+def test_training_volume_per_week_and_muscle():
+    chest = exercise_with_muscle("pectorals")["exerciseId"]
+    biceps = exercise_with_muscle("biceps")["exerciseId"]
+    workouts = [
+        {"endTime": "2025-09-08T10:00:00", "exercises": [{"exerciseId": chest, "sets": 4}]},
+        {"endTime": "2025-09-10T10:00:00", "exercises": [
+            {"exerciseId": chest, "sets": [{"reps": 8}, {"reps": 8, "completed": False}]},
+            {"exerciseId": biceps, "sets": 3},
+            {"exerciseId": "unknown", "sets": 3},
+        ]},
+        {"endTime": "2025-09-02T10:00:00", "exercises": [{"exerciseId": biceps, "sets": 2}]},
+        {"endTime": "2025-06-01T10:00:00", "exercises": [{"exerciseId": biceps, "sets": 9}]},
+    ]
+
+    summary = summarize_training_volume(workouts, weeks=2, today=date(2025, 9, 11))
+
+    assert summary["weeks"] == ["2025-09-01", "2025-09-08"]
+    assert summary["workouts_per_week"] == [1, 2]
+    assert summary["sets_per_week"] == [2, 8]
+    assert summary["sets_per_muscle_per_week"] == {"pectorals": [0, 5], "biceps": [2, 3]}
+    assert summary["unmatched_exercises"] == 1
+    assert len(json.dumps(summary)) < 500
+
+
+def test_sleep_means_and_trend():
+    sessions = [
+        {"createdAt_formatted": f"2025-09-{day:02d}T07:00:00+00:00", "totalDuration_hours": hours, "sleepQuality": quality}
+        for day, hours, quality in [(1, 6.0, "poor"), (2, 7.0, 3), (3, 8.0, "good"), (4, 9.0, None)]
+    ]
+    sessions.append({"createdAt_formatted": None, "totalDuration_hours": 5})
+
+    summary = summarize_sleep(sessions, window=2)
+
+    assert summary["sessions"] == 4
+    assert summary["mean_hours"] == 7.5
+    assert summary["rolling_mean_hours_2"] == 8.5
+    assert summary["trend_hours_per_week"] == 7.0
+    assert summary["nights_under_7h"] == 1
+    assert summary["mean_quality"] == 2.33
+    assert summarize_sleep([]) == {"sessions": 0}
+
+
+def test_nutrition_adherence_against_targets():
+    log = {
+        "2025-09-03": {"entries": [], "totals": {"calories": 2000, "protein": 150, "carbohydrates": 200, "fat": 70}},
+        "2025-09-02": {"entries": [], "totals": {"calories": 2500, "protein": 100, "carbohydrates": 300, "fat": 90}},
+        "2025-09-01": {"entries": [], "totals": {"calories": 1500, "protein": 140, "carbohydrates": 150, "fat": 50}},
+    }
+
+    summary = summarize_nutrition_adherence(log, days=7, targets={"calories": 2000, "protein": 140, "fat": None})
+
+    assert summary["days_logged"] == 3
+    assert summary["mean_daily"]["calories"] == 2000.0
+    assert summary["adherence"]["calories"] == {
+        "target": 2000, "mean_pct_of_target": 100.0, "days_on_target": 1, "days_over": 1, "days_under": 1,
+    }
+    assert summary["adherence"]["protein"]["days_on_target"] == 2
+    assert "fat" not in summary["adherence"]
+
+
+def test_repeated_sleep_summaries_hit_the_user_cache(monkeypatch):
+    store = FakeStore()
+    populate(store.client(), users=1, days=10, seed=2)
+    previous = (mcp_utils._db, mcp_utils._async_db)
+    mcp_utils.use_firestore_clients(store.client(), store.async_client())
+    monkeypatch.setattr(mcp_utils.user_cache, "listen", False)
+    try:
+        first = asyncio.run(mcp_utils.get_sleep_summary_async("synthetic-user-0000", days=30))
+        reads = store.stats()["reads"]
+        second = asyncio.run(mcp_utils.get_sleep_summary_async("synthetic-user-0000", days=30))
+    finally:
+        mcp_utils.use_firestore_clients(*previous)
+
+    assert second == first
+    assert store.stats()["reads"] == reads
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "mcp"))
+
+import mcp_utils
+from mcp_utils import UserDataCache, _cached
+
+TTLS = {"profile": 60, "workouts": 60, "sleep": 60, "food_log": 60}
+
+
+def test_hits_misses_and_ttl_expiry():
+    cache = UserDataCache(max_bytes=10_000, max_watched_users=10, ttls=TTLS, listen=False)
+    assert cache.get("u1", "profile", ()) == (False, None)
+
+    cache.put("u1", "profile", (), {"name": "A"})
+    assert cache.get("u1", "profile", ()) == (True, {"name": "A"})
+
+    with patch("mcp_utils.time.monotonic", return_value=10**9):
+        assert cache.get("u1", "profile", ()) == (False, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = UserDataCache(max_bytes=60, max_watched_users=10, ttls=TTLS, listen=False)
+    cache.put("u1", "workouts", (10,), ["x" * 20])
+    cache.put("u2", "workouts", (10,), ["y" * 20])
+    cache.get("u1", "workouts", (10,))
+    cache.put("u3", "workouts", (10,), ["z" * 20])
+
+    assert cache.get("u2", "workouts", (10,))[0] is False
+    assert cache.get("u1", "workouts", (10,))[0] is True
+    assert cache.stats()["evictions"] == 1
+    assert cache.bytes <= 60
+
+
+def test_snapshot_change_invalidates_only_that_kind():
+    cache = UserDataCache(max_bytes=10_000, max_watched_users=10, ttls=TTLS, listen=False)
+    cache.put("u1", "sleep", (10,), [1])
+    cache.put("u1", "profile", (), {"a": 1})
+    on_change = cache._listener("u1", "sleep")
+
+    on_change([], [], None)  # initial snapshot
+    assert cache.get("u1", "sleep", (10,))[0] is True
+
+    on_change([], [], None)
+    assert cache.get("u1", "sleep", (10,))[0] is False
+    assert cache.get("u1", "profile", ())[0] is True
+
+
+def test_cached_decorator_shares_entries_between_sync_and_async():
+    calls = []
+    cache = UserDataCache(max_bytes=10_000, max_watched_users=10, ttls=TTLS, listen=False)
+
+    @_cached("workouts")
+    def fetch(user_id, limit=10):
+        calls.append(limit)
+        return [limit]
+
+    @_cached("workouts")
+    async def fetch_async(user_id, limit=10):
+        calls.append(limit)
+        return [limit]
+
+    with patch.object(mcp_utils, "user_cache", cache), patch.object(mcp_utils, "USER_CACHE_ENABLED", True):
+        assert fetch("u1") == [10]
+        assert fetch("u1", limit=10) == [10]
+        assert asyncio.run(fetch_async("u1", 10)) == [10]
+        assert fetch("u1", 5) == [5]
+
+    assert calls == [10, 5]
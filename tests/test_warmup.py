@@ -0,0 +1,84 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.warmup import Readiness
+
+
+def test_components_warm_concurrently_and_report_timings():
+    def slow_client():
+        time.sleep(0.2)
+
+    async def slow_tools():
+        await asyncio.sleep(0.2)
+
+    readiness = Readiness({"client": slow_client, "tools": slow_tools}, required={"client", "tools"})
+    assert readiness.report()["status"] == "warming"
+
+    started = time.perf_counter()
+    asyncio.run(readiness.warm_up())
+    assert time.perf_counter() - started < 0.35
+
+    report = readiness.report()
+    assert report["status"] == "ready"
+    assert all(component["state"] == "ready" and component["duration_ms"] >= 150
+               for component in report["components"].values())
+
+
+def test_optional_failures_do_not_block_readiness():
+    def broken():
+        raise RuntimeError("MCP server unreachable")
+
+    async def hangs():
+        await asyncio.sleep(5)
+
+    optional = Readiness({"client": lambda: None, "tools": broken}, required={"client"})
+    asyncio.run(optional.warm_up())
+    assert optional.ready
+    assert optional.report()["components"]["tools"] == {
+        "state": "failed", "required": False, "duration_ms": optional.states["tools"].duration_ms,
+        "error": "MCP server unreachable",
+    }
+
+    required = Readiness({"client": hangs}, required={"client"}, timeout_seconds=0.05)
+    asyncio.run(required.warm_up())
+    assert not required.ready
+    assert required.report()["status"] == "failed"
+    assert "Timed out" in required.report()["components"]["client"]["error"]
+
+
+def test_failed_required_components_are_retried_until_warm():
+    attempts = []
+
+    def flaky():
+        attempts.append(time.perf_counter())
+        if len(attempts) < 3:
+            raise ConnectionError("DNS lookup failed")
+
+    readiness = Readiness({"client": flaky, "tools": lambda: 1 / 0}, required={"client"},
+                          retry_initial_seconds=0.02, retry_max_seconds=0.05)
+    asyncio.run(readiness.run())
+
+    assert readiness.ready and readiness.report()["components"]["client"]["error"] is None
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[1] >= 0.04  # backed off
+    # Optional components are left to retry on first use
+    assert readiness.report()["components"]["tools"]["state"] == "failed"
+
+
+def test_health_endpoints():
+    warming = Readiness({"client": lambda: None}, required={"client"})
+    with TestClient(app) as client:
+        assert client.get("/healthz").json() == {"status": "ok"}
+        # Warmup is disabled for the test suite, so components are created on first use
+        ready = client.get("/readyz")
+        assert ready.status_code == 200
+        assert ready.json()["components"]["gemini_client"]["state"] == "skipped"
+
+        with patch("app.routers.health.readiness", warming):
+            not_ready = client.get("/readyz")
+    assert not_ready.status_code == 503
+    assert not_ready.json()["status"] == "warming"